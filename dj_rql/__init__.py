@@ -1,3 +1,12 @@
 #
 #  Copyright © 2023 Ingram Micro Inc. All rights reserved.
 #
+
+from importlib.metadata import PackageNotFoundError, version
+
+
+try:
+    __version__ = version('django-rql')
+except PackageNotFoundError:
+    # Package is used from the source tree
+    __version__ = None
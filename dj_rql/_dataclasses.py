@@ -42,3 +42,246 @@ class FilterArgs:
         self.filter_lookup = kwargs.get('filter_lookup')
         self.django_lookup = kwargs.get('django_lookup')
         self.distinct = kwargs.get('distinct')
+
+
+class QueryPlan:
+    VERSION = 2
+
+    def __init__(
+        self,
+        query,
+        rql_ast=None,
+        q=None,
+        filtered_props=frozenset(),
+        ordering_fields=(),
+        select_data=None,
+        is_distinct=False,
+        search_rank=None,
+    ):
+        """
+        :param str query: RQL query, for which the plan is compiled
+        :param lark.Tree or None rql_ast: Parsed RQL query (None for empty query)
+        :param django.db.models.Q or None q: Filtering expression
+        :param frozenset filtered_props: Filter names used in query (needed for annotations)
+        :param tuple ordering_fields: Django ORM ordering expressions
+        :param dict or None select_data: Storage of selected/deselected fields (filters)
+        :param bool is_distinct: If True, `SELECT DISTINCT` must be executed
+        :param django.db.models.Expression or None search_rank: Relevance score of search results
+        """
+        self.query = query
+        self.rql_ast = rql_ast
+        self.q = q
+        self.filtered_props = filtered_props
+        self.ordering_fields = ordering_fields
+        self.select_data = select_data
+        self.is_distinct = is_distinct
+        self.search_rank = search_rank
+
+
+class FilterDescriptor:
+    """Filter, compiled for the hot path of filtering.
+
+    All properties are resolved once on filter class initialization, so that building
+    of a comparison doesn't require dict lookups and field type detection.
+    """
+
+    __slots__ = (
+        'name',
+        'items',
+        'multiple',
+        'field',
+        'filter_type',
+        'lookups',
+        'null_values',
+        'use_repr',
+        'distinct',
+        'subquery',
+        'custom',
+        'is_select_field',
+        'converter',
+    )
+
+    def __init__(
+        self,
+        name,
+        items,
+        multiple=False,
+        field=None,
+        filter_type=None,
+        lookups=frozenset(),
+        null_values=frozenset(),
+        use_repr=False,
+        distinct=False,
+        subquery=False,
+        custom=False,
+        is_select_field=False,
+        converter=None,
+    ):
+        """
+        :param str name: Full filter name (f.e. ns1.ns2.filter1)
+        :param tuple items: Filter items for all DB field sources
+        :param bool multiple: If True, filter has different DB field sources
+        :param django.db.models.Field or None field: Django model field of the filter
+        :param str or None filter_type: Filter type of the field
+        :param frozenset lookups: Available filter lookups
+        :param frozenset null_values: Values, that are interpreted as NULL
+        :param bool use_repr: If True, choices are filtered by their representations
+        :param bool distinct: If True, `SELECT DISTINCT` must be executed, when filter is used
+        :param bool subquery: If True, filter is checked in `EXISTS` subquery instead of joins
+        :param bool custom: If True, filter logic is implemented by the filter class
+        :param bool is_select_field: If True, filter can be used only in select()
+        :param callable or None converter: Converter of raw RQL values into typed DB values
+        """
+        for attr, value in (
+            ('name', name),
+            ('items', items),
+            ('multiple', multiple),
+            ('field', field),
+            ('filter_type', filter_type),
+            ('lookups', lookups),
+            ('null_values', null_values),
+            ('use_repr', use_repr),
+            ('distinct', distinct),
+            ('subquery', subquery),
+            ('custom', custom),
+            ('is_select_field', is_select_field),
+            ('converter', converter),
+        ):
+            object.__setattr__(self, attr, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} is immutable.'.format(self.__class__.__name__))
+
+
+class FilterSchema:
+    """Compiled filter class definition, that is built once per class and shared between
+    all its instances.
+
+    All containers are frozen recursively, so that they can't be changed by one request
+    and affect others. The only mutable containers are the private caches of annotation plans,
+    optimization plans and deferred fields, which are derived from the frozen data.
+    """
+
+    __slots__ = (
+        'filters',
+        'ordering_filters',
+        'search_filters',
+        'select_tree',
+        'default_exclusions',
+        'annotations',
+        'allowed_ordering_permutations',
+        'descriptors',
+        '_annotation_plans',
+        '_optimization_plans',
+        '_deferred_fields',
+    )
+
+    def __init__(
+        self,
+        filters,
+        ordering_filters,
+        search_filters,
+        select_tree,
+        default_exclusions,
+        annotations,
+        allowed_ordering_permutations=None,
+        descriptors=None,
+    ):
+        """
+        :param dict filters: Linear inner representation of filters by their full names
+        :param set ordering_filters: Names of filters, that can be used for ordering
+        :param set search_filters: Names of filters, that are used for search
+        :param dict select_tree: Detailed tree structure of filter items for select()
+        :param set default_exclusions: Names of filters, hidden by default
+        :param dict annotations: Lists of annotations, required by filters
+        :param set or None allowed_ordering_permutations: Allowed ordering permutations
+        :param dict or None descriptors: Compiled `FilterDescriptor` objects by filter names
+        """
+        for name, value in (
+            ('filters', filters),
+            ('ordering_filters', ordering_filters),
+            ('search_filters', search_filters),
+            ('select_tree', select_tree),
+            ('default_exclusions', default_exclusions),
+            ('annotations', annotations),
+            ('allowed_ordering_permutations', allowed_ordering_permutations),
+            ('descriptors', descriptors or {}),
+        ):
+            object.__setattr__(self, name, freeze(value))
+
+        object.__setattr__(self, '_annotation_plans', {})
+        object.__setattr__(self, '_optimization_plans', {})
+        object.__setattr__(self, '_deferred_fields', {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} is immutable.'.format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{0} is immutable.'.format(self.__class__.__name__))
+
+
+class ExecutionContext:
+    """State of a single filtering operation of the filter class instance."""
+
+    __slots__ = ('request', 'view', 'is_distinct', 'applied_annotations', 'search_ranks')
+
+    def __init__(self, request=None, view=None, is_distinct=False):
+        """
+        :param request: Request from API view
+        :param view: API view
+        :param bool is_distinct: If True, `SELECT DISTINCT` must be executed
+        """
+        self.request = request
+        self.view = view
+        self.is_distinct = is_distinct
+        self.applied_annotations = set()
+        self.search_ranks = []
+
+
+class FrozenDict(dict):
+    """Dictionary, that can't be changed after creation."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('{0} is immutable.'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class FrozenList(list):
+    """List, that can't be changed after creation."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('{0} is immutable.'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+
+    def __copy__(self):
+        return list(self)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+
+def freeze(value):
+    """Returns recursively frozen copy of dicts, lists and sets; other values are kept as is."""
+    if isinstance(value, (FrozenDict, FrozenList, frozenset)):
+        return value
+
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+
+    if isinstance(value, set):
+        return frozenset(value)
+
+    return value
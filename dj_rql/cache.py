@@ -0,0 +1,596 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import hashlib
+import sys
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import (
+    Field,
+    Model,
+    Prefetch,
+    QuerySet,
+)
+from py_rql.parser import RQLParser
+
+from dj_rql.qs import DBOptimization
+
+
+DEFAULT_AST_CACHE_SIZE = 1000
+
+
+class CacheStats:
+    def __init__(self, maxsize, currsize, hits, misses, evictions, memory):
+        """
+        :param int maxsize: Max number of stored items
+        :param int currsize: Current number of stored items
+        :param int hits: Number of successful lookups
+        :param int misses: Number of failed lookups
+        :param int evictions: Number of items, removed because of size limit or expiration
+        :param int memory: Estimated size of stored keys and values in bytes
+        """
+        self.maxsize = maxsize
+        self.currsize = currsize
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.memory = memory
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __add__(self, other):
+        return CacheStats(
+            self.maxsize + other.maxsize,
+            self.currsize + other.currsize,
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.evictions + other.evictions,
+            self.memory + other.memory,
+        )
+
+    def __repr__(self):
+        return (
+            'CacheStats(maxsize={0.maxsize}, currsize={0.currsize}, hits={0.hits}, '
+            'misses={0.misses}, evictions={0.evictions}, memory={0.memory})'.format(self)
+        )
+
+
+class StripedLock:
+    """Fixed set of locks, distributed between keys by their hashes.
+
+    Writes for different keys rarely contend on the same lock, while the number of locks
+    doesn't grow with the number of keys.
+    """
+
+    STRIPES = 32
+    """Default number of locks (default 32)."""
+
+    def __init__(self, stripes=None):
+        """
+        :param int or None stripes: Number of locks
+        """
+        self._locks = tuple(Lock() for _ in range(max(1, stripes or self.STRIPES)))
+
+    def __getitem__(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+
+class _BaseCache(ABC):
+    """Bounded thread-safe cache with statistics.
+
+    The cache is subscripted like a dict: a missing key raises `KeyError`. It can be used as
+    `QUERIES_CACHE_BACKEND` or `QUERY_PLANS_CACHE_BACKEND` of the filter class.
+    """
+
+    def __init__(self, maxsize):
+        """
+        :param int maxsize: Max number of stored items (0 disables storing)
+        """
+        self.maxsize = int(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._data = {}
+        self._lock = Lock()
+
+    @property
+    def currsize(self):
+        return len(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._get(key)
+            except KeyError:
+                self.misses += 1
+                raise
+
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            if key not in self._data:
+                while len(self._data) >= self.maxsize:
+                    self._evict()
+                    self.evictions += 1
+
+            self._set(key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Returns cache statistics.
+
+        Notes:
+            Memory estimation walks all stored items, so it's not intended for hot paths.
+
+        Returns:
+            CacheStats: Statistics snapshot.
+        """
+        with self._lock:
+            return CacheStats(
+                self.maxsize,
+                len(self),
+                self.hits,
+                self.misses,
+                self.evictions,
+                sum(_estimate_size(k) + _estimate_size(v) for k, v in self._items()),
+            )
+
+    @abstractmethod
+    def _get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _evict(self):
+        raise NotImplementedError
+
+    def _clear(self):
+        self._data.clear()
+
+    def _items(self):
+        return list(self._data.items())
+
+
+class LRUCache(_BaseCache):
+    """Cache, that evicts the least recently used items."""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+
+        self._data = OrderedDict()
+
+    def _get(self, key):
+        value = self._data[key]
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+    def _evict(self):
+        self._data.popitem(last=False)
+
+
+class LFUCache(_BaseCache):
+    """Cache, that evicts the least frequently used items (the oldest ones on ties)."""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+
+        self._frequencies = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_frequency = 0
+
+    def _get(self, key):
+        value = self._data[key]
+        self._touch(key)
+        return value
+
+    def _set(self, key, value):
+        if key in self._data:
+            self._touch(key)
+        else:
+            self._frequencies[key] = 1
+            self._buckets[1][key] = None
+            self._min_frequency = 1
+
+        self._data[key] = value
+
+    def _evict(self):
+        bucket = self._buckets[self._min_frequency]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self._buckets[self._min_frequency]
+
+        del self._data[key]
+        del self._frequencies[key]
+
+    def _touch(self, key):
+        frequency = self._frequencies[key]
+        bucket = self._buckets[frequency]
+        del bucket[key]
+
+        if not bucket:
+            del self._buckets[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency += 1
+
+        self._frequencies[key] = frequency + 1
+        self._buckets[frequency + 1][key] = None
+
+    def _clear(self):
+        super()._clear()
+        self._frequencies.clear()
+        self._buckets.clear()
+        self._min_frequency = 0
+
+
+class TTLCache(LRUCache):
+    """LRU cache, which items expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl=600, timer=monotonic):
+        """
+        :param int maxsize: Max number of stored items (0 disables storing)
+        :param float ttl: Time to live of stored items in seconds
+        :param callable timer: Function, returning current time in seconds
+        """
+        super().__init__(maxsize)
+
+        self.ttl = ttl
+        self._timer = timer
+        self._expirations = {}
+
+    def __contains__(self, key):
+        expiration = self._expirations.get(key)
+        return expiration is not None and expiration > self._timer()
+
+    def _get(self, key):
+        value = super()._get(key)
+
+        if self._expirations[key] <= self._timer():
+            self._pop(key)
+            self.evictions += 1
+            raise KeyError(key)
+
+        return value
+
+    def _set(self, key, value):
+        super()._set(key, value)
+        self._expirations[key] = self._timer() + self.ttl
+
+    def _evict(self):
+        key, _ = self._data.popitem(last=False)
+        del self._expirations[key]
+
+    def _pop(self, key):
+        del self._data[key]
+        del self._expirations[key]
+
+    def _clear(self):
+        super()._clear()
+        self._expirations.clear()
+
+
+class ShardedLRUCache:
+    """LRU cache, split into shards with separate locks to reduce contention between threads.
+
+    Notes:
+        LRU order and size limit are maintained per shard.
+    """
+
+    SHARDS = 16
+    """Default number of shards (default 16)."""
+
+    def __init__(self, maxsize, shards=None):
+        """
+        :param int maxsize: Max number of stored items (0 disables storing)
+        :param int or None shards: Number of shards
+        """
+        self.maxsize = int(maxsize)
+
+        shards_count = max(1, min(shards or self.SHARDS, self.maxsize or 1))
+        shard_size = -(-self.maxsize // shards_count)
+        self._shards = tuple(LRUCache(shard_size) for _ in range(shards_count))
+
+    def _get_shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    @property
+    def currsize(self):
+        return len(self)
+
+    @property
+    def hits(self):
+        return sum(shard.hits for shard in self._shards)
+
+    @property
+    def misses(self):
+        return sum(shard.misses for shard in self._shards)
+
+    @property
+    def evictions(self):
+        return sum(shard.evictions for shard in self._shards)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __contains__(self, key):
+        return key in self._get_shard(key)
+
+    def __getitem__(self, key):
+        return self._get_shard(key)[key]
+
+    def __setitem__(self, key, value):
+        self._get_shard(key)[key] = value
+
+    def get(self, key, default=None):
+        return self._get_shard(key).get(key, default)
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def stats(self):
+        """Returns cache statistics, aggregated over all shards.
+
+        Returns:
+            CacheStats: Statistics snapshot.
+        """
+        stats = CacheStats(0, 0, 0, 0, 0, 0)
+        for shard in self._shards:
+            stats += shard.stats()
+
+        stats.maxsize = self.maxsize
+        return stats
+
+
+def _estimate_size(obj, seen=None):
+    """Approximate deep size of the object in bytes."""
+    if seen is None:
+        seen = set()
+
+    obj_id = id(obj)
+    if obj_id in seen:
+        return 0
+
+    seen.add(obj_id)
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, (str, bytes, int, float, bool, type)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        return size + sum(_estimate_size(k, seen) + _estimate_size(v, seen) for k, v in obj.items())
+
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(_estimate_size(v, seen) for v in obj)
+
+    for attr in ('__dict__', 'children'):
+        value = getattr(obj, attr, None)
+        if isinstance(value, (dict, list)):
+            size += _estimate_size(value, seen)
+
+    return size
+
+
+class _ASTCache:
+    """Process-wide cache of parsed RQL queries, shared between all filter classes.
+
+    Notes:
+        The size is taken from the `RQL_AST_CACHE_SIZE` Django setting on first use
+        (default 1000, 0 disables caching).
+    """
+
+    CACHE = None
+
+    @classmethod
+    def get(cls):
+        if cls.CACHE is None:
+            size = getattr(settings, 'RQL_AST_CACHE_SIZE', DEFAULT_AST_CACHE_SIZE)
+            cls.CACHE = LRUCache(size)
+
+        return cls.CACHE
+
+    @classmethod
+    def clear(cls):
+        cls.CACHE = None
+
+
+def get_ast_cache():
+    """Returns the process-wide cache of parsed RQL queries.
+
+    Returns:
+        LRUCache: Cache instance with `hits` and `misses` counters.
+    """
+    return _ASTCache.get()
+
+
+def parse_query(query):
+    """Parses RQL query string into Lark AST, reusing previously parsed trees.
+
+    Args:
+        query (str): RQL query string.
+
+    Returns:
+        A Lark AST.
+
+    Raises:
+        RQLFilterParsingError: Query can't be parsed.
+    """
+    cache = _ASTCache.get()
+
+    try:
+        return cache[query]
+    except KeyError:
+        rql_ast = RQLParser.parse_query(query)
+        cache[query] = rql_ast
+        return rql_ast
+
+
+class DjangoCacheBackend:
+    """Dict-like adapter over Django cache framework for sharing cached data between processes.
+
+    It can be used as `QUERY_PLANS_CACHE_BACKEND` of the filter class: compiled query plans are
+    serializable, so all workers share them through any Django cache (locmem, file-based,
+    Redis, etc.). Settings are changed by subclassing:
+
+    ``` py3
+
+        class RQLPlansCache(DjangoCacheBackend):
+            CACHE_ALIAS = 'rql'
+            TIMEOUT = 3600
+    ```
+    """
+
+    CACHE_ALIAS = 'default'
+    """Alias of the cache from `CACHES` Django setting (default `default`)."""
+
+    TIMEOUT = 24 * 60 * 60
+    """Timeout of stored items in seconds (default 1 day, `None` for items, that don't expire)."""
+
+    KEY_PREFIX = 'dj_rql'
+    """Prefix for the keys in Django cache (default `dj_rql`)."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=None):
+        """
+        :param int or None maxsize: Not used, as size is controlled by the Django cache itself
+        """
+        self.maxsize = maxsize
+
+    @property
+    def cache(self):
+        return caches[self.CACHE_ALIAS]
+
+    def __getitem__(self, key):
+        try:
+            value = self.cache.get(self._make_key(key), self._MISSING)
+        except Exception:
+            # Unavailable cache servers and values, stored by incompatible code, are cache misses:
+            # query plans are compiled locally in such case
+            value = self._MISSING
+
+        if value is self._MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        try:
+            self.cache.set(self._make_key(key), value, timeout=self.TIMEOUT)
+        except Exception:
+            # Values, that can't be serialized or stored, are not shared
+            pass
+
+    def __contains__(self, key):
+        try:
+            return self._make_key(key) in self.cache
+        except Exception:
+            return False
+
+    def _make_key(self, key):
+        # Hashing keeps keys short and valid for memcached
+        return '{0}:{1}'.format(self.KEY_PREFIX, hashlib.sha1(str(key).encode()).hexdigest())
+
+
+def get_definition_hash(*definitions):
+    """Returns hash of the filter class definition, that is stable between processes.
+
+    Args:
+        definitions: Definition parts (filters, settings, etc.).
+
+    Returns:
+        str: Hex digest.
+    """
+    return hashlib.sha1(repr(_get_stable_definition(definitions)).encode()).hexdigest()
+
+
+def _get_stable_definition(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if isinstance(value, dict):
+        return sorted(
+            ((_get_stable_definition(k), _get_stable_definition(v)) for k, v in value.items()),
+            key=repr,
+        )
+
+    if isinstance(value, (list, tuple)):
+        return [_get_stable_definition(v) for v in value]
+
+    if isinstance(value, (set, frozenset)):
+        return sorted((_get_stable_definition(v) for v in value), key=repr)
+
+    if isinstance(value, type):
+        if issubclass(value, Model):
+            return value._meta.label
+
+        return '{0}.{1}'.format(value.__module__, value.__qualname__)
+
+    if isinstance(value, Field) and getattr(value, 'model', None):
+        return value.model._meta.label, value.name, _get_stable_definition(value.__class__)
+
+    if isinstance(value, QuerySet):
+        return value.model._meta.label, str(value.query)
+
+    if hasattr(value, 'deconstruct'):
+        return _get_stable_definition(value.deconstruct())
+
+    if isinstance(value, DBOptimization):
+        return (
+            _get_stable_definition(value.__class__),
+            _get_stable_definition(value.relations),
+            _get_stable_definition(value.extensions),
+        )
+
+    if isinstance(value, Prefetch):
+        return (
+            _get_stable_definition(value.__class__),
+            value.prefetch_through,
+            value.to_attr,
+            _get_stable_definition(value.queryset),
+        )
+
+    if callable(value) and hasattr(value, '__qualname__'):
+        return '{0}.{1}'.format(value.__module__, value.__qualname__)
+
+    # Other objects can be arbitrarily nested or cyclic, so only their classes are hashed
+    return _get_stable_definition(value.__class__)
@@ -110,3 +110,17 @@ class DjangoLookups:
             cls.LT,
             cls.LTE,
         }
+
+
+class SearchIndexes:
+    """Indexes, that can back searching filters (`search_index` option of filters)."""
+
+    TRIGRAM = 'trigram'
+    """Trigram index (f.e. PostgreSQL `gin_trgm_ops`), searching is done with `ILIKE`."""
+
+    CASE_FOLDED = 'case_folded'
+    """Index by `LOWER(column)`, searching is done with `LIKE` by lowercase values."""
+
+    @classmethod
+    def all(cls):
+        return {cls.TRIGRAM, cls.CASE_FOLDED}
@@ -0,0 +1,159 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from py_rql.constants import RQL_EMPTY
+
+from dj_rql.constants import FilterTypes
+
+
+def get_float_converter(filter_cls, django_field, filter_type, use_repr):
+    return float
+
+
+def get_decimal_converter(filter_cls, django_field, filter_type, use_repr):
+    return lambda value: filter_cls._convert_decimal_value(value, django_field)
+
+
+def get_date_converter(filter_cls, django_field, filter_type, use_repr):
+    return filter_cls._convert_date_value
+
+
+def get_datetime_converter(filter_cls, django_field, filter_type, use_repr):
+    return filter_cls._convert_datetime_value
+
+
+def get_boolean_converter(filter_cls, django_field, filter_type, use_repr):
+    return filter_cls._convert_boolean_value
+
+
+def get_common_converter(filter_cls, django_field, filter_type, use_repr):
+    is_int = filter_type == FilterTypes.INT
+
+    def convert(value):
+        if value == RQL_EMPTY:
+            return _convert_empty_value(django_field, is_int)
+
+        return int(value) if is_int else value
+
+    return convert
+
+
+def get_choices_converter(filter_cls, django_field, filter_type, use_repr):
+    """Choices are resolved with precomputed maps of representations (or DB values as strings)
+    to DB values, so that conversion doesn't scan them."""
+    choices = django_field.choices
+    is_int = filter_type == FilterTypes.INT
+    prepare = None
+
+    if type(choices).__name__ == 'Choices':
+        if use_repr:
+            mapping = _get_first_values_map(
+                (value_repr, db_value) for db_value, value_repr in choices
+            )
+        else:
+            mapping = {db_value: db_value for db_value, _ in choices}
+            prepare = int if is_int else None
+
+    elif isinstance(choices[0], tuple):
+        index = int(use_repr)
+        mapping = _get_first_values_map((str(choice[index]), choice[0]) for choice in choices)
+
+    else:
+        mapping = _get_first_values_map((choice, choice) for choice in choices)
+
+    def convert(value):
+        if value == RQL_EMPTY:
+            return _convert_empty_value(django_field, is_int)
+
+        try:
+            return mapping[prepare(value) if prepare else value]
+        except KeyError:
+            raise ValueError
+
+    return convert
+
+
+def _get_first_values_map(pairs):
+    mapping = {}
+    for key, value in pairs:
+        mapping.setdefault(key, value)
+
+    return mapping
+
+
+def _convert_empty_value(django_field, is_int):
+    if is_int or (not django_field.blank):
+        raise ValueError
+
+    return ''
+
+
+class ValueConverters:
+    """Registry of value converter factories.
+
+    A factory is called once per filter on filter class initialization as
+    `factory(filter_cls, django_field, filter_type, use_repr)` and returns a converter: callable,
+    that takes unquoted RQL value and returns typed DB value or raises `ValueError`/`TypeError`.
+
+    Factories, registered for field classes, take precedence over the ones for filter types.
+    Converters are registered in a subclass, that is set as `VALUE_CONVERTERS_CLS` of
+    the filter class, so that other filter classes are not affected:
+
+    ``` py3
+
+        class MyConverters(ValueConverters):
+            pass
+
+        @MyConverters.register(MoneyField)
+        def get_money_converter(filter_cls, django_field, filter_type, use_repr):
+            return lambda value: Money(value, django_field.default_currency)
+
+        class MyFilterClass(RQLFilterClass):
+            VALUE_CONVERTERS_CLS = MyConverters
+    ```
+    """
+
+    field_mapper = {}
+    """Mapping of Django field classes to converter factories."""
+
+    type_mapper = {
+        FilterTypes.FLOAT: get_float_converter,
+        FilterTypes.DECIMAL: get_decimal_converter,
+        FilterTypes.DATE: get_date_converter,
+        FilterTypes.DATETIME: get_datetime_converter,
+        FilterTypes.BOOLEAN: get_boolean_converter,
+    }
+    """Mapping of filter types to converter factories."""
+
+    @classmethod
+    def register(cls, field_cls, factory=None):
+        """Registers converter factory for the Django field class (and its subclasses).
+
+        Can be used as a decorator. Registrations of subclasses don't affect parent classes.
+        """
+
+        def decorator(f):
+            if 'field_mapper' not in cls.__dict__:
+                cls.field_mapper = dict(cls.field_mapper)
+
+            cls.field_mapper[field_cls] = f
+            return f
+
+        return decorator if factory is None else decorator(factory)
+
+    @classmethod
+    def get_factory(cls, django_field, filter_type):
+        for field_cls in type(django_field).__mro__:
+            factory = cls.field_mapper.get(field_cls)
+            if factory is not None:
+                return factory
+
+        factory = cls.type_mapper.get(filter_type)
+        if factory is not None:
+            return factory
+
+        if getattr(django_field, 'choices', None):
+            return get_choices_converter
+
+        return get_common_converter
@@ -2,8 +2,156 @@
 #  Copyright © 2023 Ingram Micro Inc. All rights reserved.
 #
 
+import datetime
+import decimal
+import uuid
 from urllib.parse import unquote
 
+from django.db.models import Field, Prefetch
+from django.db.models.expressions import BaseExpression, Col
+from django.db.models.lookups import Lookup
+from django.db.models.sql.where import NothingNode, WhereNode
+
+
+_PLAIN_VALUE_TYPES = (
+    str,
+    int,
+    float,
+    bool,
+    decimal.Decimal,
+    datetime.date,
+    datetime.datetime,
+    datetime.time,
+    datetime.timedelta,
+    uuid.UUID,
+    type(None),
+)
+
+
+class _NotFingerprintable(Exception):
+    pass
+
 
 def get_query(drf_request):
     return unquote(drf_request._request.META['QUERY_STRING'])
+
+
+def get_queryset_fingerprint(queryset):
+    """Returns hashable structural fingerprint of the queryset, that is cheap to compute.
+
+    Notes:
+        Fingerprint is built from the inner query structures (where-tree, joins, annotations,
+        ordering, etc.) without SQL compilation. If the queryset contains something that can't
+        be represented structurally (f.e. raw SQL or subqueries), compiled SQL is used instead.
+    """
+    try:
+        return _get_queryset_fingerprint(queryset)
+    except (_NotFingerprintable, AttributeError, TypeError):
+        # Database alias and row locking may be absent in SQL, compiled for the default database
+        return queryset._db, _get_locking_fingerprint(queryset.query), str(queryset.query)
+
+
+def _get_queryset_fingerprint(queryset):
+    query = queryset.query
+
+    if query.combinator or query.extra or query.extra_tables or query.extra_order_by:
+        raise _NotFingerprintable
+
+    fingerprint = (
+        query.model,
+        _get_value_fingerprint(query.where),
+        tuple(
+            (alias, _get_identity(join), join.join_type, getattr(join, 'nullable', None))
+            for alias, join in query.alias_map.items()
+        ),
+        tuple(
+            (alias, _get_value_fingerprint(annotation))
+            for alias, annotation in query.annotations.items()
+        ),
+        _get_value_fingerprint(query.annotation_select_mask),
+        _get_value_fingerprint(query.group_by),
+        _get_value_fingerprint(query.order_by),
+        query.default_ordering,
+        query.standard_ordering,
+        query.distinct,
+        _get_value_fingerprint(query.distinct_fields),
+        _get_value_fingerprint(query.select_related),
+        _get_value_fingerprint(query.values_select),
+        _get_value_fingerprint(query.deferred_loading),
+        query.low_mark,
+        query.high_mark,
+        _get_locking_fingerprint(query),
+        queryset._db,
+        queryset._iterable_class,
+        _get_value_fingerprint(queryset._fields),
+        _get_value_fingerprint(queryset._prefetch_related_lookups),
+    )
+    hash(fingerprint)
+    return fingerprint
+
+
+def _get_locking_fingerprint(query):
+    return (
+        query.select_for_update,
+        query.select_for_update_nowait,
+        query.select_for_update_skip_locked,
+        tuple(query.select_for_update_of),
+        query.select_for_no_key_update,
+    )
+
+
+def _get_value_fingerprint(value):
+    if isinstance(value, _PLAIN_VALUE_TYPES):
+        return value.__class__, value
+
+    if isinstance(value, (list, tuple)):
+        return tuple(_get_value_fingerprint(v) for v in value)
+
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_get_value_fingerprint(v) for v in value)
+
+    if isinstance(value, dict):
+        return tuple(sorted((k, _get_value_fingerprint(v)) for k, v in value.items()))
+
+    if isinstance(value, WhereNode):
+        return (
+            value.__class__,
+            value.connector,
+            value.negated,
+            tuple(_get_value_fingerprint(child) for child in value.children),
+        )
+
+    if isinstance(value, NothingNode):
+        return NothingNode
+
+    if isinstance(value, Lookup):
+        return (
+            value.__class__,
+            _get_value_fingerprint(value.lhs),
+            _get_value_fingerprint(value.rhs),
+        )
+
+    if isinstance(value, Col):
+        return Col, value.alias, value.target
+
+    if isinstance(value, Field):
+        return value
+
+    if isinstance(value, Prefetch):
+        return (
+            Prefetch,
+            value.prefetch_to,
+            value.to_attr,
+            None if value.queryset is None else _get_queryset_fingerprint(value.queryset),
+        )
+
+    if isinstance(value, BaseExpression):
+        return _get_identity(value)
+
+    raise _NotFingerprintable
+
+
+def _get_identity(obj):
+    identity = obj.identity
+    hash(identity)
+    return identity
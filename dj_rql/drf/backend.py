@@ -1,14 +1,10 @@
 #
 #  Copyright © 2023 Ingram Micro Inc. All rights reserved.
 #
-from threading import Lock
-
 from rest_framework.filters import BaseFilterBackend
 
-from dj_rql.drf._utils import get_query
-
-
-lock = Lock()
+from dj_rql.cache import StripedLock
+from dj_rql.drf._utils import get_query, get_queryset_fingerprint
 
 
 class _FilterClassCache:
@@ -45,11 +41,34 @@ class RQLFilterBackend(BaseFilterBackend):
                     return ModelDetailFilterClass
                 return ModelFilterClass
     ```
+
+    If `QUERIES_CACHE_BACKEND` is set for the filter class, the base queryset is a part of the
+    cache key. By default, it's a structural queryset fingerprint, but the view can supply
+    a cheaper discriminator (f.e. if base queryset depends only on the user):
+
+    ``` py3
+
+        class ViewSet(mixins.ListModelMixin, GenericViewSet):
+            filter_backends = (RQLFilterBackend,)
+            rql_filter_class = ModelFilterClass
+
+            def get_rql_cache_discriminator(self):
+                return self.request.user.pk
+    ```
+
+    Query caches are separate for every view and filter class pair. Cache reads are lock-free,
+    while writes to each cache are serialized by its own lock, taken from a fixed set of
+    striped locks, so that concurrent requests to different views rarely wait for each other.
+    Lock-free reads require the cache backend to tolerate reads, concurrent with writes.
+    `dj_rql.cache` backends synchronize internally, so they are recommended for threaded
+    servers; third-party backends, that reorder items on reads (f.e. `cachetools`), are not
+    guaranteed to be safe under heavy concurrency.
     """
 
     OPENAPI_RETRIEVE_SPECIFICATION = False
 
     _CACHES = {}
+    _LOCKS = StripedLock()
 
     def filter_queryset(self, request, queryset, view):
         """Return a filtered queryset."""
@@ -70,26 +89,31 @@ class RQLFilterBackend(BaseFilterBackend):
         if can_query_be_cached:
             # We must use the combination of queryset and query to make a cache key as
             #  queryset can already contain some filters (e.x. based on authentication)
-            cache_key = str(queryset.query) + query
+            cache_key = (self.get_queryset_cache_key(queryset, request, view), query)
 
+            qual_name = self._get_filter_cls_qual_name(view, filter_class)
             query_cache = self._get_or_init_cache(filter_class, view)
             try:
                 filters_result = query_cache[cache_key]
             except KeyError:
                 filters_result = filter_instance.apply_filters(query, request, view)
-                with lock:
+                with self._LOCKS[qual_name]:
                     query_cache[cache_key] = filters_result
 
         else:
             filters_result = filter_instance.apply_filters(query, request, view)
 
-        rql_ast, queryset = filters_result
+        rql_ast, filtered_queryset = filters_result
 
         request.rql_ast = rql_ast
-        if queryset.select_data:
-            request.rql_select = queryset.select_data
+        if filtered_queryset.select_data:
+            request.rql_select = filtered_queryset.select_data
+
+        if not can_query_be_cached and filtered_queryset is not queryset:
+            # Filtered queryset is a clone, that isn't shared with other requests
+            return filtered_queryset
 
-        return queryset.all()
+        return filtered_queryset.all()
 
     def get_schema_operation_parameters(self, view):
         spec = []
@@ -116,13 +140,49 @@ class RQLFilterBackend(BaseFilterBackend):
     def get_query(cls, filter_instance, request, view):
         return get_query(request)
 
+    @classmethod
+    def get_cache_stats(cls):
+        """Returns statistics of query caches, that support it (f.e. `dj_rql.cache` backends).
+
+        Returns:
+            dict: Mapping of `<view>+<filter class>` qualified names to `CacheStats`.
+        """
+        return {
+            qual_name: cache.stats()
+            for qual_name, cache in cls._CACHES.items()
+            if callable(getattr(cache, 'stats', None))
+        }
+
+    @classmethod
+    def get_queryset_cache_key(cls, queryset, request, view):
+        """Returns the part of query cache key, that discriminates base querysets.
+
+        If view has a `get_rql_cache_discriminator()` method, its result is used. Otherwise,
+        a structural fingerprint of the queryset is built without SQL compilation.
+        """
+        if hasattr(view, 'get_rql_cache_discriminator') and callable(
+            view.get_rql_cache_discriminator,
+        ):
+            return view.get_rql_cache_discriminator()
+
+        return get_queryset_fingerprint(queryset)
+
     @classmethod
     def _get_or_init_cache(cls, filter_class, view):
         qual_name = cls._get_filter_cls_qual_name(view, filter_class)
-        return cls._CACHES.setdefault(
-            qual_name,
-            filter_class.QUERIES_CACHE_BACKEND(int(filter_class.QUERIES_CACHE_SIZE)),
-        )
+        query_cache = cls._CACHES.get(qual_name)
+        if query_cache is not None:
+            return query_cache
+
+        with cls._LOCKS[qual_name]:
+            query_cache = cls._CACHES.get(qual_name)
+            if query_cache is None:
+                query_cache = filter_class.QUERIES_CACHE_BACKEND(
+                    int(filter_class.QUERIES_CACHE_SIZE),
+                )
+                cls._CACHES[qual_name] = query_cache
+
+        return query_cache
 
     @classmethod
     def _get_filter_instance(cls, filter_class, queryset, view):
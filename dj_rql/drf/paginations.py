@@ -4,10 +4,10 @@
 
 from lark.exceptions import LarkError
 from py_rql.exceptions import RQLFilterParsingError
-from py_rql.parser import RQLParser
 from rest_framework.pagination import LimitOffsetPagination, _positive_int
 from rest_framework.response import Response
 
+from dj_rql.cache import parse_query
 from dj_rql.drf._utils import get_query
 from dj_rql.transformer import RQLLimitOffsetTransformer
 
@@ -31,7 +31,7 @@ class RQLLimitOffsetPagination(LimitOffsetPagination):
         except AttributeError:
             query = get_query(request)
             if query:
-                rql_ast = RQLParser.parse_query(query)
+                rql_ast = parse_query(query)
 
         if rql_ast is not None:
             try:
@@ -0,0 +1,148 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import logging
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework.request import Request
+
+from dj_rql.drf.backend import RQLFilterBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUpReport:
+    def __init__(self, filter_classes=0, queries=0, errors=None):
+        """
+        :param int filter_classes: Number of initialized filter class instances
+        :param int queries: Number of replayed queries
+        :param list or None errors: `(target, exception)` pairs for failed views or queries
+        """
+        self.filter_classes = filter_classes
+        self.queries = queries
+        self.errors = errors or []
+
+    def __repr__(self):
+        return '{0}(filter_classes={1}, queries={2}, errors={3})'.format(
+            self.__class__.__name__,
+            self.filter_classes,
+            self.queries,
+            len(self.errors),
+        )
+
+
+def warm_up(urlconf=None, queries=()):
+    """Preloads RQL caches, so that first requests after start don't pay for their building.
+
+    All URL conf views with RQL filter backends are walked and their filter class instances
+    are initialized. Recorded hot queries are replayed through the backends to prime the
+    AST, query plans and queries caches. No SQL is executed.
+
+    Notes:
+        Process-local caches are warmed only in the calling process, so this function is
+        intended to be called from `AppConfig.ready()` or from a worker start hook (f.e.
+        `post_fork` of gunicorn). Base querysets, that depend on authenticated user, are built
+        for anonymous user. Failures are logged and reported, but not raised.
+
+    Args:
+        urlconf (str or None): URL conf module, `ROOT_URLCONF` by default.
+        queries (iterable): Recorded request paths with RQL queries, f.e. `/books/?eq(id,1)`.
+
+    Returns:
+        WarmUpReport: Numbers of warmed filter classes and queries with occurred errors.
+    """
+    report = WarmUpReport()
+    warmed_up = set()
+
+    for path, callback in _iter_url_callbacks(get_resolver(urlconf).url_patterns):
+        try:
+            for view, backend in _get_rql_views(callback, '/' + path):
+                filter_class = backend.get_filter_class(view)
+                if not filter_class:
+                    continue
+
+                qual_name = backend._get_filter_cls_qual_name(view, filter_class)
+                if qual_name not in warmed_up:
+                    backend._get_filter_instance(filter_class, None, view)
+                    warmed_up.add(qual_name)
+                    report.filter_classes += 1
+
+        except Exception as e:
+            _add_error(report, path, e)
+
+    for recorded_query in queries:
+        try:
+            _replay_query(recorded_query, urlconf)
+            report.queries += 1
+
+        except Exception as e:
+            _add_error(report, recorded_query, e)
+
+    return report
+
+
+def read_queries(path):
+    """Reads recorded queries from file: one `<path>?<query>` per line.
+
+    Empty lines and lines, starting with `#`, are skipped.
+    """
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def _iter_url_callbacks(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_url_callbacks(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield (prefix + str(pattern.pattern)).lstrip('^').rstrip('$'), pattern.callback
+
+
+def _get_rql_views(callback, path, query='', kwargs=None):
+    view_cls = getattr(callback, 'cls', None)
+    backend_classes = [
+        backend_cls
+        for backend_cls in getattr(view_cls, 'filter_backends', ())
+        if issubclass(backend_cls, RQLFilterBackend)
+    ]
+    if not backend_classes:
+        return []
+
+    view = view_cls(**getattr(callback, 'initkwargs', {}))
+    view.args = ()
+    view.kwargs = kwargs or {}
+    view.format_kwarg = None
+    view.request = _get_request(path, query)
+
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        view.action_map = actions
+        view.action = actions.get('get')
+
+    return [(view, backend_cls()) for backend_cls in backend_classes]
+
+
+def _get_request(path, query):
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.META['QUERY_STRING'] = query
+    request.GET = QueryDict(query)
+    return Request(request)
+
+
+def _replay_query(recorded_query, urlconf):
+    url = urlsplit(recorded_query)
+    match = resolve(url.path, urlconf)
+
+    for view, backend in _get_rql_views(match.func, url.path, url.query, match.kwargs):
+        backend.filter_queryset(view.request, view.get_queryset(), view)
+
+
+def _add_error(report, target, e):
+    logger.warning('RQL cache warm-up failed for %s: %r', target, e)
+    report.errors.append((target, e))
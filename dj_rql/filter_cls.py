@@ -3,18 +3,22 @@
 #
 import decimal
 import re
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from datetime import datetime
+from functools import lru_cache, reduce
 from itertools import chain
+from operator import add
 from typing import Set
-from uuid import uuid4
 
+import django
 from django.db.models import (
+    Exists,
     ForeignKey,
     ManyToManyField,
     Model,
     OneToOneField,
     OneToOneRel,
+    OuterRef,
     Q,
 )
 from django.utils.dateparse import parse_date, parse_datetime
@@ -25,8 +29,10 @@ from py_rql.constants import (
     RQL_ANY_SYMBOL,
     RQL_EMPTY,
     RQL_FALSE,
+    RQL_LIMIT_PARAM,
     RQL_MINUS,
     RQL_NULL,
+    RQL_OFFSET_PARAM,
     RQL_PLUS,
     RQL_SEARCH_PARAM,
     RQL_TRUE,
@@ -36,18 +42,130 @@ from py_rql.constants import (
     SearchOperators,
 )
 from py_rql.exceptions import RQLFilterLookupError, RQLFilterParsingError, RQLFilterValueError
-from py_rql.parser import RQLParser
 
-from dj_rql._dataclasses import FilterArgs, OptimizationArgs
-from dj_rql.constants import SUPPORTED_FIELD_TYPES, DjangoLookups, FilterTypes
+import dj_rql
+from dj_rql._dataclasses import (
+    ExecutionContext,
+    FilterArgs,
+    FilterDescriptor,
+    FilterSchema,
+    OptimizationArgs,
+    QueryPlan,
+    freeze,
+)
+from dj_rql.cache import StripedLock, get_definition_hash, parse_query
+from dj_rql.constants import (
+    SUPPORTED_FIELD_TYPES,
+    DjangoLookups,
+    FilterTypes,
+    SearchIndexes,
+)
+from dj_rql.converters import ValueConverters
 from dj_rql.fields import SelectField
+from dj_rql.lookups import CASE_FOLDED_LOOKUPS, TRIGRAM_LOOKUPS
 from dj_rql.openapi import RQLFilterClassSpecification
-from dj_rql.qs import NPR, NSR, Annotation
-from dj_rql.transformer import RQLToDjangoORMTransformer
+from dj_rql.q import _is_multi_valued_route, combine_q, simplify_q
+from dj_rql.qs import (
+    NPR,
+    NSR,
+    Annotation,
+    Chain,
+    PrefetchRelated,
+    SelectRelated,
+)
+from dj_rql.search import LookupSearchStrategy
+from dj_rql.transformer import RQLToDjangoORMTransformer, iter_filter_nodes
 
 
 iterable_types = (list, tuple)
 
+_FILTER_LOOKUPS_BY_OPERATOR = {
+    ComparisonOperators.EQ: FilterLookups.EQ,
+    ComparisonOperators.NE: FilterLookups.NE,
+    ComparisonOperators.LT: FilterLookups.LT,
+    ComparisonOperators.LE: FilterLookups.LE,
+    ComparisonOperators.GT: FilterLookups.GT,
+    ComparisonOperators.GE: FilterLookups.GE,
+    SearchOperators.LIKE: FilterLookups.LIKE,
+    SearchOperators.I_LIKE: FilterLookups.I_LIKE,
+}
+
+_DJANGO_LOOKUPS_BY_FILTER_LOOKUP = {
+    FilterLookups.EQ: DjangoLookups.EXACT,
+    FilterLookups.NE: DjangoLookups.EXACT,
+    FilterLookups.LT: DjangoLookups.LT,
+    FilterLookups.LE: DjangoLookups.LTE,
+    FilterLookups.GT: DjangoLookups.GT,
+    FilterLookups.GE: DjangoLookups.GTE,
+}
+
+
+_SEARCH_INDEX_LOOKUPS = {
+    SearchIndexes.TRIGRAM: TRIGRAM_LOOKUPS,
+    SearchIndexes.CASE_FOLDED: CASE_FOLDED_LOOKUPS,
+}
+
+
+_ANNOTATION_PLANS_CACHE_SIZE = 1000
+
+_AnnotationsPlanStep = namedtuple('_AnnotationsPlanStep', 'annotation sources source_ids')
+
+_OPTIMIZATION_PLANS_CACHE_SIZE = 1000
+
+_OptimizationPlan = namedtuple(
+    '_OptimizationPlan',
+    'annotated_filters optimizations select_related prefetch_related',
+)
+
+_EMPTY_OPTIMIZATION_PLAN = _OptimizationPlan(frozenset(), (), (), ())
+
+_LIKE_VALUES_CACHE_SIZE = 1000
+
+_DEFAULT_SEARCH_WEIGHT = 1
+
+_LIKE_TOKEN_PATTERN = re.compile(r'\\[\\*]|\*')
+
+
+@lru_cache(maxsize=_LIKE_VALUES_CACHE_SIZE)
+def _tokenize_like_value(value):
+    """Splits like/ilike value by `*` wildcards into literal fragments in a single pass:
+    escaped `\\*` and `\\\\` are unescaped to `*` and `\\`, other symbols are kept as is.
+
+    Notes:
+        Tokens are cached, so that a search value is parsed once for all search filters.
+    """
+    if '\\' not in value:
+        return tuple(value.split(RQL_ANY_SYMBOL))
+
+    fragments = []
+    parts = []
+    position = 0
+    for match in _LIKE_TOKEN_PATTERN.finditer(value):
+        parts.append(value[position:match.start()])
+        token = match.group()
+        if token == RQL_ANY_SYMBOL:
+            fragments.append(''.join(parts))
+            parts = []
+        else:
+            parts.append(token[1])
+
+        position = match.end()
+
+    parts.append(value[position:])
+    fragments.append(''.join(parts))
+    return tuple(fragments)
+
+
+class _QueryPlansCache:
+    CACHE = {}
+    VERSIONS = {}
+    LOCKS = StripedLock()
+
+    @classmethod
+    def clear(cls):
+        cls.CACHE = {}
+        cls.VERSIONS = {}
+
 
 class RQLFilterClass:
     """Base class for filter classes."""
@@ -61,18 +179,65 @@ class RQLFilterClass:
     EXTENDED_SEARCH_ORM_ROUTES = ()
     """List of additional Django ORM fields for search."""
 
+    DECOMPOSE_SEARCH_PATTERNS = False
+    """If True, `like` and `ilike` patterns with several wildcards (f.e. `a*b*c`), that are matched
+    with regular expressions, are also matched with indexable `startswith` lookup by the prefix
+    (or `contains` lookup by the longest fragment) of the pattern (default `False`)."""
+
+    SEARCH_STRATEGY_CLS = LookupSearchStrategy
+    """Class for building of Q objects for the `search` operator (default `LookupSearchStrategy`).
+    Full-text search can be done with subclasses of `SQLiteFTSSearchStrategy` or
+    `PostgreSQLSearchStrategy`."""
+
+    RANK_SEARCH_RESULTS = False
+    """If True, results of the `search` operator are annotated with relevance score, that is
+    built by the search strategy (f.e. weighted sum of search filters matches or full-text
+    search rank), and are ordered by it, if `ordering()` is not used (default `False`)."""
+
+    SEARCH_RANK_ANNOTATION = 'rql_search_rank'
+    """Name of the relevance score annotation (default `rql_search_rank`)."""
+
     MAX_ORDERING_LENGTH_IN_QUERY = 5
     """Max allowed number of provided ordering filters in query ordering expression."""
 
     ALLOWED_ORDERING_PERMUTATIONS_IN_QUERY = None
     """Property to specify a set of allowed ordering permutations (default `None`)."""
 
+    MAX_NODES_IN_QUERY = None
+    """Max allowed number of expressions (comparisons, lists, searches, logical operators,
+    tuples, ordering and select) in query (default `None`, not limited)."""
+
+    MAX_NESTING_DEPTH_IN_QUERY = None
+    """Max allowed nesting depth of logical operators and tuples in query
+    (default `None`, not limited)."""
+
+    MAX_LIST_LENGTH_IN_QUERY = None
+    """Max allowed number of values in `in()` and `out()` operations
+    (default `None`, not limited)."""
+
+    MAX_NAMESPACES_IN_QUERY = None
+    """Max allowed number of distinct namespaces (f.e. `author` and `author.publisher`)
+    of filters, used in query (default `None`, not limited)."""
+
     DISTINCT = False
     """If True, a `SELECT DISTINCT` will always be executed (default `False`)."""
 
     SELECT = False
     """If True, this FilterClass supports the `select` operator (default `False`)."""
 
+    DEFER_UNSELECTED_FIELDS = False
+    """If True, model fields of filters, that are excluded with `select` operator or hidden,
+    are not loaded from DB with `defer()` (default `False`). Fields of related models are deferred
+    only if relations are loaded with `select_related()`."""
+
+    IGNORE_UNKNOWN_FILTERS = True
+    """If False, queries with filters, that are not defined in the filter class, are failed with
+    `RQLFilterParsingError`, listing all unknown filters (default `True`)."""
+
+    SIMPLIFY_Q = True
+    """If True, Q objects of queries are flattened, deduplicated and range lookups are merged
+    before filtering (default `True`)."""
+
     OPENAPI_SPECIFICATION = RQLFilterClassSpecification
     """Class for OpenAPI specifications generation (default `RQLFilterClassSpecification`)."""
 
@@ -82,18 +247,30 @@ class RQLFilterClass:
     QUERIES_CACHE_SIZE = 20
     """Default number of cached queries (default 20)."""
 
+    QUERY_PLANS_CACHE_BACKEND = None
+    """Class for caching of compiled query plans, that are applied to any base queryset.
+    Must not be set if custom filtering logic depends on the request."""
+
+    QUERY_PLANS_CACHE_SIZE = 100
+    """Default number of cached query plans (default 100)."""
+
     Q_CLS = Q
     """Class for building nodes of the query, generated by django (default `Q`)."""
 
+    TRANSFORMER_CLS = RQLToDjangoORMTransformer
+    """Class for transformation of parsed RQL queries into Q objects
+    (default `RQLToDjangoORMTransformer`). `RQLToDjangoORMIterativeTransformer` can be used for
+    deeply nested queries, which exceed Python recursion limit."""
+
     FILTER_TYPES_CLS = FilterTypes
     """Class for the mapping of model field types to filter types (default `FilterTypes`)."""
 
+    VALUE_CONVERTERS_CLS = ValueConverters
+    """Registry of converters of raw RQL values into DB values (default `ValueConverters`)."""
+
     def __init__(self, queryset: Q, instance=None):
         self.queryset = queryset
-        self._is_distinct = self.DISTINCT
-        self._request = None
-        self._view = None
-        self._applied_annotations = set()
+        self._context = ExecutionContext(is_distinct=self.DISTINCT)
 
         if instance:
             self._init_from_class(instance)
@@ -101,6 +278,40 @@ class RQLFilterClass:
             self._validate_init()
             self._default_init(self._get_init_filters())
 
+    # State of filtering operation is kept in the execution context, these properties keep
+    # it available for subclasses under the former attribute names
+    @property
+    def _request(self):
+        return self._context.request
+
+    @_request.setter
+    def _request(self, value):
+        self._context.request = value
+
+    @property
+    def _view(self):
+        return self._context.view
+
+    @_view.setter
+    def _view(self, value):
+        self._context.view = value
+
+    @property
+    def _is_distinct(self):
+        return self._context.is_distinct
+
+    @_is_distinct.setter
+    def _is_distinct(self, value):
+        self._context.is_distinct = value
+
+    @property
+    def _applied_annotations(self):
+        return self._context.applied_annotations
+
+    @_applied_annotations.setter
+    def _applied_annotations(self, value):
+        self._context.applied_annotations = value
+
     @classmethod
     def _is_valid_model_cls(cls, model):
         return issubclass(model, Model)
@@ -118,6 +329,16 @@ class RQLFilterClass:
         e = 'Max ordering length must be integer.'
         assert isinstance(self.MAX_ORDERING_LENGTH_IN_QUERY, int), e
 
+        for limit_name in (
+            'MAX_NODES_IN_QUERY',
+            'MAX_NESTING_DEPTH_IN_QUERY',
+            'MAX_LIST_LENGTH_IN_QUERY',
+            'MAX_NAMESPACES_IN_QUERY',
+        ):
+            limit = getattr(self, limit_name)
+            e = '{0} must be a positive integer or None.'.format(limit_name)
+            assert limit is None or (isinstance(limit, int) and limit > 0), e
+
         perms = self.ALLOWED_ORDERING_PERMUTATIONS_IN_QUERY
         if perms:
             e = 'Allowed ordering permutations must be a set of tuples of string filter names.'
@@ -144,18 +365,68 @@ class RQLFilterClass:
         self._validate_and_store_allowed_ordering_permutations()
         self._extend_annotations()
 
-    def _init_from_class(self, instance):
-        copied_attributes = (
-            'filters',
-            'ordering_filters',
-            'search_filters',
-            'select_tree',
-            'default_exclusions',
-            'annotations',
-            'allowed_ordering_permutations',
+        filters = freeze(self.filters)
+        self._set_schema(
+            FilterSchema(
+                filters,
+                self.ordering_filters,
+                self.search_filters,
+                self.select_tree,
+                self.default_exclusions,
+                self.annotations,
+                self.allowed_ordering_permutations,
+                {
+                    filter_name: self._build_filter_descriptor(filter_name, filter_item)
+                    for filter_name, filter_item in filters.items()
+                },
+            ),
+        )
+
+    @classmethod
+    def _build_filter_descriptor(cls, filter_name, filter_item, base_item=None):
+        multiple = isinstance(filter_item, iterable_types)
+        items = tuple(filter_item) if multiple else (filter_item,)
+        if base_item is None:
+            base_item = items[0]
+
+        field = base_item.get('field')
+        filter_type, converter = None, None
+        if field is not None:
+            filter_type = cls.FILTER_TYPES_CLS.field_filter_type(field)
+
+            # Values are converted with `_convert_value()`, if it's overridden
+            if cls._convert_value.__func__ is RQLFilterClass._convert_value.__func__:
+                converter = cls._get_value_converter(
+                    field,
+                    use_repr=base_item.get('use_repr', False),
+                    filter_type=filter_type,
+                )
+
+        return FilterDescriptor(
+            filter_name,
+            items,
+            multiple=multiple,
+            field=field,
+            filter_type=filter_type,
+            lookups=frozenset(base_item.get('lookups', ())),
+            null_values=frozenset(base_item.get('null_values', ())),
+            use_repr=base_item.get('use_repr', False),
+            distinct=bool(base_item.get('distinct')),
+            subquery=bool(base_item.get('subquery')),
+            custom=bool(base_item.get('custom')),
+            is_select_field=isinstance(field, SelectField),
+            converter=converter,
         )
-        for attr in copied_attributes:
-            setattr(self, attr, getattr(instance, attr))
+
+    def _init_from_class(self, instance):
+        self._set_schema(instance._schema)
+
+    def _set_schema(self, schema):
+        """Compiled schema is immutable, so it's shared between instances without copying."""
+        self._schema = schema
+        for attr in FilterSchema.__slots__:
+            if not attr.startswith('_'):
+                setattr(self, attr, getattr(schema, attr))
 
     def build_q_for_custom_filter(self, data: FilterArgs) -> Q:
         """Django Q() builder for custom filter.
@@ -210,8 +481,8 @@ class RQLFilterClass:
 
     def apply_annotations(self, filter_names: Set[str], queryset: Q = None):
         """
-        This method is used from RQL Transformer to apply annotations before filtering on queryset,
-        but after it's understood which filters are used. Also, it's used to apply annotations
+        This method is used from query plan application to apply annotations before filtering on
+        queryset, but after it's understood which filters are used. Also, it's used to apply annotations
         for select() optimization.
 
         Args:
@@ -223,22 +494,27 @@ class RQLFilterClass:
         else:
             qs = queryset.all()
 
+        return self._apply_annotations(filter_names, qs)
+
+    def _apply_annotations(self, filter_names, queryset):
+        """Annotations are applied without cloning the queryset beforehand, so that only
+        `annotate()` calls clone it."""
+        qs = queryset
         if not self.SELECT:
             return qs
 
-        for filter_name in filter_names:
-            anno_list = self.annotations.get(filter_name)
-
-            if not anno_list:
-                continue
+        applied_annotations = self._context.applied_annotations
+        for step in self._get_annotations_plan(filter_names):
+            if applied_annotations.isdisjoint(step.source_ids):
+                qs = step.annotation.apply(qs)
+                applied_annotations.update(step.source_ids)
 
-            for anno in anno_list:
-                anno_id = id(anno)
-                if anno_id in self._applied_annotations:
-                    continue
-
-                self._applied_annotations.add(anno_id)
-                qs = anno.apply(qs)
+            elif not applied_annotations.issuperset(step.source_ids):
+                # Merged annotation is partially applied by previous calls
+                for source in step.sources:
+                    if id(source) not in applied_annotations:
+                        qs = source.apply(qs)
+                        applied_annotations.add(id(source))
 
         return qs
 
@@ -253,17 +529,66 @@ class RQLFilterClass:
         Returns:
             A Lark AST, Filtered QuerySet (could be None).
         """
-        self._request = request
-        self._view = view
+        self._context = ExecutionContext(request, view, self.DISTINCT)
 
-        rql_ast, qs, select_filters = None, self.queryset, []
-        qs.select_data = None
+        plan = self.get_query_plan(query)
+        qs = self.apply_query_plan(plan)
+
+        self.queryset = qs
+        self._context.request = None
+        self._context.view = None
+
+        return plan.rql_ast, qs
+
+    def get_query_plan(self, query: str) -> QueryPlan:
+        """Returns compiled query plan, using cache if `QUERY_PLANS_CACHE_BACKEND` is set.
+
+        Args:
+            query (str): RQL query string.
+
+        Returns:
+            A QueryPlan instance.
+        """
+        if not (self.QUERY_PLANS_CACHE_BACKEND and self.QUERY_PLANS_CACHE_SIZE):
+            return self.build_query_plan(query)
+
+        plans_cache = self._get_or_init_query_plans_cache()
+        cache_key = (self._get_query_plans_version(), query)
+        try:
+            return plans_cache[cache_key]
+        except KeyError:
+            plan = self.build_query_plan(query)
+            with _QueryPlansCache.LOCKS[self._get_qual_name()]:
+                plans_cache[cache_key] = plan
+
+            return plan
+
+    def build_query_plan(self, query: str) -> QueryPlan:
+        """Compiles RQL query into a plan, that doesn't depend on the filtered queryset.
+
+        Notes:
+            Plan can be cached and applied to any base queryset of the filter class model
+            with `apply_query_plan()`, unless custom filtering logic depends on the request.
+
+        Args:
+            query (str): RQL query string.
+
+        Returns:
+            A QueryPlan instance.
+        """
+        self._context.is_distinct = self.DISTINCT
+        self._context.search_ranks = []
+
+        rql_ast, q, filtered_props, ordering_fields, select_filters = None, None, (), (), []
 
         if query:
-            rql_ast = RQLParser.parse_query(query)
-            rql_transformer = RQLToDjangoORMTransformer(self)
+            rql_ast = parse_query(query)
+            rql_transformer = self.TRANSFORMER_CLS(
+                self,
+                skipped_nodes=self._get_unknown_filter_nodes(rql_ast),
+            )
             try:
-                qs = rql_transformer.transform(rql_ast)
+                q = rql_transformer.transform(rql_ast)
             except LarkError as e:
                 # Lark reraises it's errors, but the original ones are needed
                 original_error = e.orig_exc
@@ -272,27 +597,69 @@ class RQLFilterClass:
 
                 raise RQLFilterParsingError()
 
-            qs = self._apply_ordering(qs, rql_transformer.ordering_filters)
+            if self.SIMPLIFY_Q:
+                q = simplify_q(q, model=self.MODEL)
+
+            filtered_props = rql_transformer.filtered_props
+            ordering_fields = self._get_ordering_fields(rql_transformer.ordering_filters)
             select_filters = rql_transformer.select_filters
 
-            if self._is_distinct:
+        select_data = None
+        if self.SELECT:
+            select_data = self._build_select_data(select_filters)
+
+        search_ranks = self._context.search_ranks
+        return QueryPlan(
+            query,
+            rql_ast=rql_ast,
+            q=q,
+            filtered_props=frozenset(filtered_props),
+            ordering_fields=tuple(ordering_fields),
+            select_data=select_data,
+            is_distinct=bool(query) and self._context.is_distinct,
+            search_rank=reduce(add, search_ranks) if search_ranks else None,
+        )
+
+    def apply_query_plan(self, plan: QueryPlan, queryset=None):
+        """Applies compiled query plan to the queryset.
+
+        Args:
+            plan (QueryPlan): Plan, compiled with `build_query_plan()`.
+            queryset (QuerySet): A Queryset for filtering (filter class queryset, if None).
+
+        Returns:
+            Filtered QuerySet.
+        """
+        qs = self.queryset if queryset is None else queryset
+        qs.select_data = None
+        self._context.applied_annotations = set()
+
+        # Every operation of the plan is one chained call, as each call clones the queryset
+        if plan.rql_ast is not None:
+            qs = self._apply_annotations(plan.filtered_props, qs).filter(plan.q)
+
+            if plan.search_rank is not None:
+                qs = self._apply_search_rank(qs, plan)
+
+            if plan.ordering_fields:
+                qs = qs.order_by(*plan.ordering_fields)
+
+            if plan.is_distinct:
                 qs = qs.distinct()
 
             qs.select_data = None
 
         if self.SELECT:
-            select_data = self._build_select_data(select_filters)
-            qs = self._apply_optimizations(qs, select_data)
+            qs = self._apply_optimizations(qs, plan.select_data)
+            if self.DEFER_UNSELECTED_FIELDS:
+                qs = self._apply_deferred_fields(qs, plan.select_data)
+
             qs.select_data = {
                 'depth': 0,
-                'select': select_data,
+                'select': plan.select_data,
             }
 
-        self.queryset = qs
-        self._request = None
-        self._view = None
-
-        return rql_ast, qs
+        return qs
 
     def build_q_for_filter(self, data: FilterArgs) -> Q:
         """Django Q() builder for extracted from query RQL expression.
@@ -318,15 +685,14 @@ class RQLFilterClass:
         if filter_name == RQL_SEARCH_PARAM:
             return self._build_q_for_search(operator, str_value)
 
-        base_item = self.get_filter_base_item(filter_name)
-        if not base_item:
+        descriptor = self._get_filter_descriptor(filter_name)
+        if not descriptor:
             return self.Q_CLS()
 
-        if base_item.get('distinct'):
-            self._is_distinct = True
+        if descriptor.distinct and not descriptor.subquery:
+            self._context.is_distinct = True
 
-        filter_item = self.filters[filter_name]
-        available_lookups = base_item.get('lookups', set())
+        available_lookups = descriptor.lookups
         if list_operator:
             if list_operator == ListOperators.IN:
                 list_filter_lookup = FilterLookups.IN
@@ -342,7 +708,7 @@ class RQLFilterClass:
                     )
                 )
 
-        null_values = base_item.get('null_values', set())
+        null_values = descriptor.null_values
         filter_lookup = self._get_filter_lookup(
             filter_name,
             operator,
@@ -350,8 +716,7 @@ class RQLFilterClass:
             available_lookups,
             null_values,
         )
-        django_field = base_item.get('field')
-        if django_field and isinstance(django_field, SelectField):
+        if descriptor.is_select_field:
             raise RQLFilterLookupError(
                 **self._get_error_details(
                     filter_name,
@@ -362,22 +727,21 @@ class RQLFilterClass:
 
         django_lookup = self._get_django_lookup(filter_lookup, str_value, null_values)
 
-        use_repr = base_item.get('use_repr', False)
-
         typed_value = None
-        if django_field is not None:
+        if descriptor.field is not None:
             typed_value = self._get_typed_value(
                 filter_name,
                 filter_lookup,
                 str_value,
-                django_field,
-                use_repr,
+                descriptor.field,
+                descriptor.use_repr,
                 null_values,
                 django_lookup,
+                converter=descriptor.converter,
             )
 
-        if base_item.get('custom'):
-            return self.build_q_for_custom_filter(
+        if descriptor.custom:
+            q = self.build_q_for_custom_filter(
                 FilterArgs(
                     filter_name,
                     operator,
@@ -388,24 +752,251 @@ class RQLFilterClass:
                 ),
             )
 
-        if not isinstance(filter_item, iterable_types):
-            return self._build_django_q(filter_item, django_lookup, filter_lookup, typed_value)
+        elif not descriptor.multiple:
+            q = self._build_django_q_for_pattern(
+                descriptor.items[0],
+                django_lookup,
+                filter_lookup,
+                typed_value,
+                str_value,
+            )
 
-        # filter has different DB field 'sources'
+        else:
+            # filter has different DB field 'sources'
+            q = self.Q_CLS()
+            for item in descriptor.items:
+                item_q = self._build_django_q_for_pattern(
+                    item,
+                    django_lookup,
+                    filter_lookup,
+                    typed_value,
+                    str_value,
+                )
+                if filter_lookup == FilterLookups.NE:
+                    q &= item_q
+                else:
+                    q |= item_q
+
+        if descriptor.subquery:
+            return self._build_q_for_subquery(q)
+
+        return q
+
+    def build_q_for_list_filter(self, filter_name: str, list_operator: str, str_values) -> Q:
+        """Django Q() builder for in() and out() RQL expressions, that uses a single `__in` lookup
+        for all non-null values, instead of a chain of per-value comparisons.
+
+        Notes:
+            Custom filters, filters with several DB field sources and filter classes with
+            overridden Q building use per-value comparisons, so None is returned for them.
+
+        Args:
+            filter_name (str): Full filter name.
+            list_operator (str): `in` or `out`.
+            str_values (list): Raw values from RQL query.
+
+        Returns:
+            A Q instance or None.
+        """
+        descriptor = self._get_filter_descriptor(filter_name)
+        if not (
+            descriptor
+            and descriptor.field is not None
+            and not (descriptor.custom or descriptor.multiple or descriptor.is_select_field)
+            and self._is_list_filter_collapsible()
+        ):
+            return None
+
+        if list_operator == ListOperators.IN:
+            list_filter_lookup, operator = FilterLookups.IN, ComparisonOperators.EQ
+        else:
+            list_filter_lookup, operator = FilterLookups.OUT, ComparisonOperators.NE
+
+        available_lookups, null_values = descriptor.lookups, descriptor.null_values
+        if list_filter_lookup not in available_lookups:
+            raise RQLFilterLookupError(
+                **self._get_error_details(
+                    filter_name,
+                    list_filter_lookup,
+                    str_values[0] if str_values else '',
+                )
+            )
+
+        typed_values, has_null = [], False
+        for str_value in str_values:
+            filter_lookup = self._get_filter_lookup(
+                filter_name,
+                operator,
+                str_value,
+                available_lookups,
+                null_values,
+            )
+
+            if str_value in null_values:
+                has_null = True
+                continue
+
+            typed_values.append(
+                self._get_typed_value(
+                    filter_name,
+                    filter_lookup,
+                    str_value,
+                    descriptor.field,
+                    descriptor.use_repr,
+                    null_values,
+                    DjangoLookups.EXACT,
+                    converter=descriptor.converter,
+                ),
+            )
+
+        if descriptor.distinct and not descriptor.subquery:
+            self._context.is_distinct = True
+
+        orm_route = descriptor.items[0]['orm_route']
         q = self.Q_CLS()
-        for item in filter_item:
-            item_q = self._build_django_q(item, django_lookup, filter_lookup, typed_value)
-            if filter_lookup == FilterLookups.NE:
-                q &= item_q
-            else:
-                q |= item_q
+        if len(typed_values) == 1:
+            q = self.Q_CLS(**{'{0}__{1}'.format(orm_route, DjangoLookups.EXACT): typed_values[0]})
+        elif typed_values:
+            q = self.Q_CLS(**{'{0}__{1}'.format(orm_route, DjangoLookups.IN): typed_values})
+
+        if has_null:
+            q |= self.Q_CLS(**{'{0}__{1}'.format(orm_route, DjangoLookups.NULL): True})
+
+        if operator == ComparisonOperators.NE and q:
+            q = ~q
+
+        if descriptor.subquery:
+            return self._build_q_for_subquery(q)
+
         return q
 
     def get_filter_base_item(self, filter_name: str):
+        """Returns filter item, that defines lookups, field and other settings of the filter.
+        Compiled filter descriptors are not used for filtering, if this method is overridden.
+
+        Args:
+            filter_name (str): Full filter name.
+
+        Returns:
+            A dict or None, if filter is unknown.
+        """
         filter_item = self.filters.get(filter_name)
         if filter_item:
             return filter_item[0] if isinstance(filter_item, iterable_types) else filter_item
 
+    def _get_filter_descriptor(self, filter_name):
+        if type(self).get_filter_base_item is RQLFilterClass.get_filter_base_item:
+            return self.descriptors.get(filter_name)
+
+        base_item = self.get_filter_base_item(filter_name)
+        if not base_item:
+            return None
+
+        return self._build_filter_descriptor(
+            filter_name,
+            self.filters.get(filter_name, base_item),
+            base_item=base_item,
+        )
+
+    def _get_unknown_filter_nodes(self, rql_ast):
+        """Resolves all filter names of the query at once. Nodes of unknown filters are
+        skipped on transformation, as they result in empty Q objects, unless Q building
+        is overridden."""
+        unknown_nodes, unknown_names = set(), set()
+        for tree, filter_name in iter_filter_nodes(rql_ast):
+            if self._get_filter_descriptor(filter_name) is not None:
+                continue
+
+            if filter_name.rsplit('.', 1)[-1] == RQL_SEARCH_PARAM:
+                continue
+
+            unknown_nodes.add(id(tree))
+            unknown_names.add(filter_name)
+
+        if not self.IGNORE_UNKNOWN_FILTERS:
+            unknown_names -= {RQL_LIMIT_PARAM, RQL_OFFSET_PARAM}
+            if unknown_names:
+                raise RQLFilterParsingError(
+                    details={
+                        'error': 'Unknown filters: {0}.'.format(', '.join(sorted(unknown_names))),
+                    },
+                )
+
+        if type(self).build_q_for_filter is not RQLFilterClass.build_q_for_filter:
+            return set()
+
+        return unknown_nodes
+
+    def _get_annotations_plan(self, filter_names):
+        """Annotations of filters are deduplicated and non-aggregate ones are merged into the
+        smallest number of `annotate()` calls. Plans are cached in the shared schema per set of
+        filter names."""
+        plans = self._schema._annotation_plans
+        key = frozenset(filter_names)
+        plan = plans.get(key)
+        if plan is not None:
+            return plan
+
+        plan = self._build_annotations_plan(key)
+        if len(plans) < _ANNOTATION_PLANS_CACHE_SIZE:
+            plans[key] = plan
+
+        return plan
+
+    def _build_annotations_plan(self, filter_names):
+        annotations = []
+        seen = set()
+        for filter_name in sorted(filter_names):
+            for annotation in self.annotations.get(filter_name) or ():
+                if id(annotation) not in seen:
+                    seen.add(id(annotation))
+                    annotations.append(annotation)
+
+        plan, sources, kwargs = [], [], {}
+        for annotation in annotations:
+            is_mergeable = self._is_annotation_mergeable(annotation)
+            if sources and not (is_mergeable and kwargs.keys().isdisjoint(annotation.extensions)):
+                plan.append(self._get_annotations_plan_step(sources, kwargs))
+                sources, kwargs = [], {}
+
+            sources.append(annotation)
+            if not is_mergeable:
+                plan.append(self._get_annotations_plan_step(sources, kwargs))
+                sources, kwargs = [], {}
+            else:
+                kwargs.update(annotation.extensions)
+
+        if sources:
+            plan.append(self._get_annotations_plan_step(sources, kwargs))
+
+        return tuple(plan)
+
+    @staticmethod
+    def _is_annotation_mergeable(annotation):
+        """Aggregates are applied in separate `annotate()` calls, as merging them changes
+        joins and grouping of the query."""
+        return type(annotation).apply is Annotation.apply and not any(
+            getattr(expression, 'contains_aggregate', False)
+            for expression in annotation.extensions.values()
+        )
+
+    @staticmethod
+    def _get_annotations_plan_step(sources, kwargs):
+        annotation = sources[0] if len(sources) == 1 else Annotation(**kwargs)
+        return _AnnotationsPlanStep(
+            annotation,
+            tuple(sources),
+            frozenset(id(source) for source in sources),
+        )
+
+    def _is_list_filter_collapsible(self):
+        """Lists are built with per-value comparisons, if Q building logic is overridden."""
+        cls = type(self)
+        return (
+            cls.build_q_for_filter is RQLFilterClass.build_q_for_filter
+            and cls._build_django_q is RQLFilterClass._build_django_q
+        )
+
     def _build_select_data(self, select):
         select_data = {}
 
@@ -523,48 +1114,295 @@ class RQLFilterClass:
         if not unquoted_value:
             return self.Q_CLS()
 
-        if not unquoted_value.startswith(RQL_ANY_SYMBOL):
-            unquoted_value = '*' + unquoted_value
-
-        if not unquoted_value.endswith(RQL_ANY_SYMBOL):
-            unquoted_value += '*'
+        strategy = self.SEARCH_STRATEGY_CLS(self)
+        q = strategy.build_q(unquoted_value)
 
-        q = self._build_q_for_extended_search(unquoted_value)
-        for filter_name in self.search_filters:
-            q |= self.build_q_for_filter(
-                FilterArgs(
-                    filter_name,
-                    SearchOperators.I_LIKE,
-                    unquoted_value,
-                ),
-            )
+        if self.RANK_SEARCH_RESULTS:
+            rank = strategy.build_rank(unquoted_value)
+            if rank is not None:
+                self._context.search_ranks.append(rank)
 
         return q
 
-    def _build_q_for_extended_search(self, str_value):
-        q = self.Q_CLS()
-        extended_search_filter_lookup = FilterLookups.I_LIKE
+    def _apply_search_rank(self, queryset, plan):
+        """Search results are ordered by relevance score (the highest first) and then by
+        the current ordering of the queryset, if `ordering()` is not used."""
+        rank_annotation = self.SEARCH_RANK_ANNOTATION
+        qs = queryset.annotate(**{rank_annotation: plan.search_rank})
 
-        for django_orm_route in self.EXTENDED_SEARCH_ORM_ROUTES:
-            django_lookup = self._get_searching_django_lookup(
-                extended_search_filter_lookup,
-                str_value,
+        if not plan.ordering_fields:
+            qs = qs.order_by(
+                '-{0}'.format(rank_annotation),
+                *(qs.query.order_by or qs.model._meta.ordering),
             )
+
+        return qs
+
+    def _build_weighted_q_for_search(self, str_value):
+        """Builds Q objects with search weights for `ilike` search by extended search ORM routes
+        and search filters. Each Q object is returned with its weight and a flag, whether it
+        joins to-many relations (`distinct` filters are considered as such).
+
+        Notes:
+            Lookup and typed value are computed once for the value and shared by all ORM routes.
+            Custom filters and filter classes with overridden Q building are checked
+            with `build_q_for_filter`.
+        """
+        filter_lookup = FilterLookups.I_LIKE
+        django_lookup = self._get_searching_django_lookup(filter_lookup, str_value)
+        try:
             typed_value = self._get_searching_typed_value(django_lookup, str_value)
-            q |= self._build_django_q(
-                {'orm_route': django_orm_route},
+        except ValueError:
+            typed_value = None
+
+        def build_q_for_item(filter_name, filter_item):
+            if typed_value is None:
+                raise RQLFilterValueError(
+                    **self._get_error_details(filter_name, filter_lookup, str_value),
+                )
+
+            return self._build_django_q_for_pattern(
+                filter_item,
                 django_lookup,
-                extended_search_filter_lookup,
+                filter_lookup,
                 typed_value,
+                str_value,
             )
 
-        return q
+        weighted_q_objects = []
+        for django_orm_route in self.EXTENDED_SEARCH_ORM_ROUTES:
+            weighted_q_objects.append(
+                (
+                    build_q_for_item(RQL_SEARCH_PARAM, {'orm_route': django_orm_route}),
+                    _DEFAULT_SEARCH_WEIGHT,
+                    _is_multi_valued_route(self.MODEL, django_orm_route),
+                ),
+            )
+
+        is_q_building_overridden = (
+            type(self).build_q_for_filter is not RQLFilterClass.build_q_for_filter
+        )
+        for filter_name in self.search_filters:
+            descriptor = self._get_filter_descriptor(filter_name)
+            weight = _DEFAULT_SEARCH_WEIGHT
+            if descriptor:
+                weight = descriptor.items[0].get('search_weight', _DEFAULT_SEARCH_WEIGHT)
+
+            if (
+                is_q_building_overridden
+                or not descriptor
+                or descriptor.custom
+                or descriptor.field is None
+                or descriptor.is_select_field
+                or filter_lookup not in descriptor.lookups
+                or str_value in descriptor.null_values
+                or str_value == RQL_EMPTY
+            ):
+                weighted_q_objects.append(
+                    (
+                        self.build_q_for_filter(
+                            FilterArgs(filter_name, SearchOperators.I_LIKE, str_value),
+                        ),
+                        weight,
+                        self._is_multi_valued_filter(descriptor),
+                    ),
+                )
+                continue
+
+            if descriptor.distinct and not descriptor.subquery:
+                self._context.is_distinct = True
+
+            filter_q = combine_q(
+                (build_q_for_item(filter_name, item) for item in descriptor.items),
+                Q.OR,
+                q_cls=self.Q_CLS,
+            )
+
+            if descriptor.subquery:
+                filter_q = self._build_q_for_subquery(filter_q)
+
+            weighted_q_objects.append((filter_q, weight, self._is_multi_valued_filter(descriptor)))
+
+        return weighted_q_objects
+
+    def _is_multi_valued_filter(self, descriptor):
+        if not descriptor or descriptor.subquery:
+            return False
+
+        return descriptor.distinct or any(
+            _is_multi_valued_route(self.MODEL, item['orm_route'])
+            for item in descriptor.items
+            if 'orm_route' in item
+        )
 
     def _apply_optimizations(self, queryset, select_data):
-        return self.__apply_optimizations(
-            OptimizationArgs(queryset, select_data, self.select_tree),
+        if type(self).optimize_field is not RQLFilterClass.optimize_field:
+            # Custom optimizations depend on the queryset, so the tree is walked every time
+            return self.__apply_optimizations(
+                OptimizationArgs(queryset, select_data, self.select_tree),
+            )
+
+        plan = self._get_optimization_plan(select_data)
+        if plan is _EMPTY_OPTIMIZATION_PLAN:
+            return queryset
+
+        qs = queryset
+        if plan.annotated_filters:
+            qs = self._apply_annotations(plan.annotated_filters, qs)
+
+        for optimization in plan.optimizations:
+            qs = optimization.apply(qs)
+
+        if plan.select_related:
+            qs = qs.select_related(*plan.select_related)
+
+        if plan.prefetch_related:
+            qs = qs.prefetch_related(*plan.prefetch_related)
+
+        return qs
+
+    def _get_optimization_plan(self, select_data):
+        """Optimizations of selected tree nodes are collected into one `select_related()` and
+        one `prefetch_related()` call. Plans are cached in the shared schema per select data."""
+        plans = self._schema._optimization_plans
+        key = frozenset(select_data.items())
+        plan = plans.get(key)
+        if plan is not None:
+            return plan
+
+        plan = self._build_optimization_plan(select_data)
+        if len(plans) < _OPTIMIZATION_PLANS_CACHE_SIZE:
+            plans[key] = plan
+
+        return plan
+
+    def _build_optimization_plan(self, select_data):
+        annotated_filters, optimizations, select_related, prefetch_related = set(), [], [], []
+
+        stack = [iter(self.select_tree.values())]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+
+            filter_path = node['path']
+            if not select_data.get(filter_path, True):
+                continue
+
+            optimization = node['qs']
+            if isinstance(optimization, Annotation):
+                annotated_filters.add(filter_path)
+            elif optimization:
+                self._collect_optimizations(
+                    optimization, optimizations, select_related, prefetch_related,
+                )
+
+            if node['fields']:
+                stack.append(iter(node['fields'].values()))
+
+        if not (annotated_filters or optimizations or select_related or prefetch_related):
+            return _EMPTY_OPTIMIZATION_PLAN
+
+        return _OptimizationPlan(
+            frozenset(annotated_filters),
+            tuple(optimizations),
+            tuple(self._unique_relations(select_related)),
+            tuple(self._unique_relations(prefetch_related)),
+        )
+
+    @classmethod
+    def _collect_optimizations(cls, optimization, optimizations, select_related, prefetch_related):
+        apply = type(optimization).apply
+        if apply is Chain.apply:
+            for chained_optimization in optimization.relations:
+                cls._collect_optimizations(
+                    chained_optimization, optimizations, select_related, prefetch_related,
+                )
+
+        elif apply is SelectRelated.apply:
+            select_related.extend(optimization.relations)
+
+        elif apply is PrefetchRelated.apply:
+            prefetch_related.extend(optimization.relations)
+
+        else:
+            optimizations.append(optimization)
+
+    @staticmethod
+    def _unique_relations(relations):
+        seen = set()
+        for relation in relations:
+            if not isinstance(relation, str):
+                yield relation
+            elif relation not in seen:
+                seen.add(relation)
+                yield relation
+
+    def _apply_deferred_fields(self, queryset, select_data):
+        select_related = queryset.query.select_related
+        deferred_fields = [
+            orm_route
+            for orm_route in self._get_deferred_fields(select_data)
+            if self._is_route_selected_related(select_related, orm_route)
+        ]
+        if not deferred_fields:
+            return queryset
+
+        return queryset.defer(*deferred_fields)
+
+    def _get_deferred_fields(self, select_data):
+        """ORM routes of model fields, that are used only by unselected filters.
+        Routes are cached in the shared schema per select data."""
+        deferred_fields_cache = self._schema._deferred_fields
+        key = frozenset(select_data.items())
+        deferred_fields = deferred_fields_cache.get(key)
+        if deferred_fields is not None:
+            return deferred_fields
+
+        selected, unselected = set(), set()
+        for filter_name, descriptor in self._schema.descriptors.items():
+            is_selected = self._is_filter_selected(filter_name, select_data)
+
+            for item in descriptor.items:
+                field = item.get('field')
+                if self._is_deferrable_field(field):
+                    (selected if is_selected else unselected).add(item['orm_route'])
+
+        deferred_fields = tuple(sorted(unselected - selected))
+        if len(deferred_fields_cache) < _OPTIMIZATION_PLANS_CACHE_SIZE:
+            deferred_fields_cache[key] = deferred_fields
+
+        return deferred_fields
+
+    @staticmethod
+    def _is_filter_selected(filter_name, select_data):
+        filter_path = None
+        for part in filter_name.split('.'):
+            filter_path = '{0}.{1}'.format(filter_path, part) if filter_path else part
+            if not select_data.get(filter_path, True):
+                return False
+
+        return True
+
+    @staticmethod
+    def _is_deferrable_field(field):
+        return (
+            getattr(field, 'model', None) is not None
+            and field.concrete
+            and not (field.is_relation or field.primary_key)
         )
 
+    @staticmethod
+    def _is_route_selected_related(select_related, orm_route):
+        for relation in orm_route.split('__')[:-1]:
+            if not isinstance(select_related, dict) or relation not in select_related:
+                return False
+
+            select_related = select_related[relation]
+
+        return True
+
     def __apply_optimizations(self, data: OptimizationArgs):
         qs, select_data, filter_tree = data.queryset, data.select_data, data.filter_tree
 
@@ -598,9 +1436,60 @@ class RQLFilterClass:
             OptimizationArgs(qs, select_data, node['fields']),
         )
 
-    def _apply_ordering(self, qs, properties):
+    @classmethod
+    def get_query_plans_cache_stats(cls):
+        """Returns statistics of query plans cache, if it's initialized and supports it.
+
+        Returns:
+            CacheStats or None: Statistics snapshot.
+        """
+        cache = _QueryPlansCache.CACHE.get(cls._get_qual_name())
+        if callable(getattr(cache, 'stats', None)):
+            return cache.stats()
+
+    @classmethod
+    def _get_or_init_query_plans_cache(cls):
+        qual_name = cls._get_qual_name()
+        plans_cache = _QueryPlansCache.CACHE.get(qual_name)
+        if plans_cache is not None:
+            return plans_cache
+
+        with _QueryPlansCache.LOCKS[qual_name]:
+            plans_cache = _QueryPlansCache.CACHE.get(qual_name)
+            if plans_cache is None:
+                plans_cache = cls.QUERY_PLANS_CACHE_BACKEND(int(cls.QUERY_PLANS_CACHE_SIZE))
+                _QueryPlansCache.CACHE[qual_name] = plans_cache
+
+        return plans_cache
+
+    def _get_query_plans_version(self):
+        """Version of query plans is a hash of filter class definition and versions of
+        the library and Django, so that plans, shared between processes, are invalidated
+        on filter class changes and upgrades."""
+        qual_name = self._get_qual_name()
+        version = _QueryPlansCache.VERSIONS.get(qual_name)
+
+        if version is None:
+            settings = {name: getattr(self, name) for name in dir(self) if name.isupper()}
+            version = get_definition_hash(
+                qual_name,
+                QueryPlan.VERSION,
+                dj_rql.__version__,
+                django.VERSION,
+                self._get_init_filters(),
+                settings,
+            )
+            _QueryPlansCache.VERSIONS[qual_name] = version
+
+        return version
+
+    @classmethod
+    def _get_qual_name(cls):
+        return '{0}.{1}'.format(cls.__module__, cls.__name__)
+
+    def _get_ordering_fields(self, properties):
         if len(properties) == 0:
-            return qs
+            return []
 
         if len(properties) > 1:
             raise RQLFilterParsingError(
@@ -635,7 +1524,7 @@ class RQLFilterClass:
                 filters = [filters]
             for filter_item in filters:
                 if filter_item.get('distinct'):
-                    self._is_distinct = True
+                    self._context.is_distinct = True
 
                 ordering_name = self._get_filter_ordering_name(filter_item, filter_name)
                 ordering_fields.append('{0}{1}'.format(sign, ordering_name))
@@ -648,7 +1537,7 @@ class RQLFilterClass:
                 },
             )
 
-        return qs.order_by(*ordering_fields)
+        return ordering_fields
 
     @staticmethod
     def _get_filter_name_with_sign_for_ordering(prop):
@@ -675,6 +1564,7 @@ class RQLFilterClass:
         select_tree = kwargs.get('select_tree')
         parent_qs = kwargs.get('parent_qs')
         distinct = kwargs.get('distinct', False)
+        subquery = kwargs.get('subquery', False)
 
         _model = orm_model or self.MODEL
 
@@ -689,7 +1579,7 @@ class RQLFilterClass:
                 field = self._get_field(_model, item)
                 self._add_filter_item(
                     field_filter_route,
-                    self._build_mapped_item(field, field_orm_route),
+                    self._build_mapped_item(field, field_orm_route, subquery=subquery),
                 )
                 self._fill_select_tree(item, field_filter_route, select_tree, parent_qs=parent_qs)
                 continue
@@ -734,6 +1624,7 @@ class RQLFilterClass:
                     select_tree=tree,
                     parent_qs=p_qs,
                     distinct=item.get('distinct', distinct),
+                    subquery=item.get('subquery', subquery),
                 )
                 continue
 
@@ -765,6 +1656,7 @@ class RQLFilterClass:
                 orm_route,
                 _model,
                 distinct,
+                subquery,
             )
 
     def _build_filters_for_common_item(
@@ -774,14 +1666,24 @@ class RQLFilterClass:
         orm_route,
         orm_model,
         distinct,
+        subquery=False,
     ):
         filter_name = item['filter']
         field = item.get('field')
         kwargs = {
             prop: item.get(prop)
-            for prop in ('lookups', 'use_repr', 'null_values', 'openapi', 'hidden')
+            for prop in (
+                'lookups',
+                'use_repr',
+                'null_values',
+                'openapi',
+                'hidden',
+                'search_index',
+                'search_weight',
+            )
         }
         kwargs['distinct'] = item.get('distinct', distinct)
+        kwargs['subquery'] = item.get('subquery', subquery)
 
         if 'sources' in item:
             items = []
@@ -934,7 +1836,10 @@ class RQLFilterClass:
         use_repr = kwargs.get('use_repr')
         null_values = kwargs.get('null_values')
         distinct = kwargs.get('distinct')
+        subquery = kwargs.get('subquery')
         openapi = kwargs.get('openapi')
+        search_index = kwargs.get('search_index')
+        search_weight = kwargs.get('search_weight')
         hidden = kwargs.get('hidden')
 
         possible_lookups = lookups or cls.FILTER_TYPES_CLS.default_field_filter_lookups(field)
@@ -956,6 +1861,15 @@ class RQLFilterClass:
         if openapi is not None:
             result['openapi'] = openapi
 
+        if subquery:
+            result['subquery'] = True
+
+        if search_index is not None:
+            result['search_index'] = search_index
+
+        if search_weight is not None:
+            result['search_weight'] = search_weight
+
         return result
 
     @staticmethod
@@ -1003,36 +1917,25 @@ class RQLFilterClass:
         if cls._is_searching_lookup(filter_lookup):
             return cls._get_searching_django_lookup(filter_lookup, str_value)
 
-        mapper = {
-            FilterLookups.EQ: DjangoLookups.EXACT,
-            FilterLookups.NE: DjangoLookups.EXACT,
-            FilterLookups.LT: DjangoLookups.LT,
-            FilterLookups.LE: DjangoLookups.LTE,
-            FilterLookups.GT: DjangoLookups.GT,
-            FilterLookups.GE: DjangoLookups.GTE,
-        }
-        return mapper[filter_lookup]
+        return _DJANGO_LOOKUPS_BY_FILTER_LOOKUP[filter_lookup]
 
     @classmethod
     def _get_searching_django_lookup(cls, filter_lookup, str_value):
-        val, _ = cls._reflect_like_value(str_value)
+        fragments = cls._tokenize_like_value(str_value)
 
         prefix = 'I_' if filter_lookup == FilterLookups.I_LIKE else ''
 
         pattern = 'REGEX'
-        if RQL_ANY_SYMBOL not in val:
+        wildcards_count = len(fragments) - 1
+        if wildcards_count == 0:
             pattern = 'EXACT'
-        elif val == RQL_ANY_SYMBOL:
-            pattern = 'REGEX'
-        else:
-            sep_count = val.count(RQL_ANY_SYMBOL)
-            if sep_count == 1:
-                if val[0] == RQL_ANY_SYMBOL:
-                    pattern = 'ENDSWITH'
-                elif val[-1] == RQL_ANY_SYMBOL:
-                    pattern = 'STARTSWITH'
-            elif sep_count == 2 and val[0] == RQL_ANY_SYMBOL == val[-1]:
-                pattern = 'CONTAINS'
+        elif wildcards_count == 1:
+            if not fragments[0] and fragments[1]:
+                pattern = 'ENDSWITH'
+            elif fragments[0] and not fragments[1]:
+                pattern = 'STARTSWITH'
+        elif wildcards_count == 2 and not fragments[0] and not fragments[2]:
+            pattern = 'CONTAINS'
 
         return getattr(DjangoLookups, '{0}{1}'.format(prefix, pattern))
 
@@ -1046,6 +1949,7 @@ class RQLFilterClass:
         use_repr,
         null_values,
         django_lookup,
+        converter=None,
     ):
         if str_value in null_values:
             return True
@@ -1054,6 +1958,9 @@ class RQLFilterClass:
             if cls._is_searching_lookup(filter_lookup):
                 return cls._get_searching_typed_value(django_lookup, str_value)
 
+            if converter is not None:
+                return converter(str_value)
+
             typed_value = cls._convert_value(django_field, str_value, use_repr=use_repr)
             return typed_value
         except (ValueError, TypeError, decimal.InvalidOperation):
@@ -1066,37 +1973,30 @@ class RQLFilterClass:
             )
 
     @classmethod
-    def _reflect_like_value(cls, str_value):
-        star_replacer = uuid4().hex
-        return (
-            '\\'.join(
-                v.replace(r'\{0}'.format(RQL_ANY_SYMBOL), star_replacer)
-                for v in cls.remove_quotes(str_value).split(r'\\')
-            ),
-            star_replacer,
-        )
+    def _tokenize_like_value(cls, str_value):
+        """Returns literal fragments of like/ilike value, that are separated by wildcards."""
+        return _tokenize_like_value(cls.remove_quotes(str_value))
 
     @classmethod
     def _get_searching_typed_value(cls, django_lookup, str_value):
-        val, star_replacer = cls._reflect_like_value(str_value)
+        fragments = cls._tokenize_like_value(str_value)
 
-        if '{0}{1}'.format(RQL_ANY_SYMBOL, RQL_ANY_SYMBOL) in val:
+        if '' in fragments[1:-1]:
             raise ValueError
 
         if django_lookup not in (DjangoLookups.REGEX, DjangoLookups.I_REGEX):
-            return val.replace(RQL_ANY_SYMBOL, '').replace(star_replacer, RQL_ANY_SYMBOL)
+            return ''.join(fragments)
 
         any_symbol_regex = '(.*)'
-        if val == RQL_ANY_SYMBOL:
+        if fragments == ('', ''):
             return any_symbol_regex
 
-        new_val = cls._escape_regex_special_symbols(val)
-        new_val = new_val[1:] if val[0] == RQL_ANY_SYMBOL else '^{0}'.format(new_val)
-        new_val = new_val[:-1] if val[-1] == RQL_ANY_SYMBOL else '{0}$'.format(new_val)
-        return new_val.replace(RQL_ANY_SYMBOL, any_symbol_regex).replace(
-            star_replacer,
-            RQL_ANY_SYMBOL,
+        new_val = any_symbol_regex.join(
+            cls._escape_regex_special_symbols(fragment) for fragment in fragments
         )
+        new_val = new_val[len(any_symbol_regex):] if not fragments[0] else '^{0}'.format(new_val)
+        new_val = new_val[:-len(any_symbol_regex)] if not fragments[-1] else '{0}$'.format(new_val)
+        return new_val
 
     @staticmethod
     def _escape_regex_special_symbols(str_value):
@@ -1111,37 +2011,27 @@ class RQLFilterClass:
 
     @classmethod
     def _convert_value(cls, django_field, str_value, use_repr=False):
-        ft_cls = cls.FILTER_TYPES_CLS
-        val = cls.remove_quotes(str_value)
-        filter_type = ft_cls.field_filter_type(django_field)
-
-        if filter_type == ft_cls.FLOAT:
-            return float(val)
-
-        elif filter_type == ft_cls.DECIMAL:
-            return cls._convert_decimal_value(val, django_field)
-
-        elif filter_type == ft_cls.DATE:
-            return cls._convert_date_value(val)
+        return cls._get_value_converter(django_field, use_repr=use_repr)(str_value)
 
-        elif filter_type == ft_cls.DATETIME:
-            return cls._convert_datetime_value(val)
-
-        elif filter_type == ft_cls.BOOLEAN:
-            return cls._convert_boolean_value(val)
-
-        if val == RQL_EMPTY:
-            if (filter_type == ft_cls.INT) or (not django_field.blank):
-                raise ValueError
-            return ''
-
-        choices = getattr(django_field, 'choices', None)
-        if not choices:
-            if filter_type == ft_cls.INT:
-                return int(val)
-            return val
+    @classmethod
+    def _get_value_converter(cls, django_field, use_repr=False, filter_type=None):
+        """Returns a converter of raw RQL values into typed values for the field.
 
-        return cls._get_choices_field_db_value(val, choices, filter_type, use_repr)
+        Notes:
+            Converter is selected from `VALUE_CONVERTERS_CLS` registry once, so that
+            the returned callable doesn't depend on field type detection.
+        """
+        if filter_type is None:
+            filter_type = cls.FILTER_TYPES_CLS.field_filter_type(django_field)
+
+        converter = cls.VALUE_CONVERTERS_CLS.get_factory(django_field, filter_type)(
+            cls,
+            django_field,
+            filter_type,
+            use_repr,
+        )
+        remove_quotes = cls.remove_quotes
+        return lambda str_value: converter(remove_quotes(str_value))
 
     @classmethod
     def _convert_decimal_value(cls, value, field):
@@ -1179,60 +2069,74 @@ class RQLFilterClass:
             raise ValueError
         return value == RQL_TRUE
 
-    @classmethod
-    def _get_choices_field_db_value(cls, value, choices, filter_type, use_repr):
-        if type(choices).__name__ == 'Choices':
-            return cls._get_choice_class_db_value(value, choices, filter_type, use_repr)
-
-        # `use_repr=True` makes it possible to map choice representations to real db values
-        # F.e.: `choices=((0, 'v0'), (1, 'v1'))` can be filtered by 'v1' if `use_repr=True` or
-        # by '1' if `use_repr=False`
-        if isinstance(choices[0], tuple):
-            iterator = iter(choice[0] for choice in choices if str(choice[int(use_repr)]) == value)
-        else:
-            iterator = iter(choice for choice in choices if choice == value)
-        try:
-            db_value = next(iterator)
-            return db_value
-        except StopIteration:
-            raise ValueError
+    def _build_q_for_subquery(self, q):
+        """Filter is checked in correlated `EXISTS` subquery, so that joins of to-many relations
+        don't multiply rows of the queryset and `SELECT DISTINCT` is not needed."""
+        if not q:
+            return q
 
-    @classmethod
-    def _get_choice_class_db_value(cls, value, choices, filter_type, use_repr):
-        if use_repr:
-            try:
-                db_value = next(db_value for db_value, value_repr in choices if value_repr == value)
-                return db_value
-            except StopIteration:
-                raise ValueError
+        return self.Q_CLS(Exists(self.MODEL._base_manager.filter(q, pk=OuterRef('pk'))))
 
-        if filter_type == cls.FILTER_TYPES_CLS.INT:
-            db_value = int(value)
-        else:
-            db_value = value
-
-        if db_value not in choices:
-            raise ValueError
+    def _build_django_q(self, filter_item, django_lookup, filter_lookup, typed_value):
+        search_index = filter_item.get('search_index')
+        if search_index is not None and django_lookup in _SEARCH_INDEX_LOOKUPS[search_index]:
+            if search_index == SearchIndexes.CASE_FOLDED:
+                typed_value = typed_value.lower()
 
-        return db_value
+            django_lookup = _SEARCH_INDEX_LOOKUPS[search_index][django_lookup]
 
-    def _build_django_q(self, filter_item, django_lookup, filter_lookup, typed_value):
         q = self.Q_CLS(**{'{0}__{1}'.format(filter_item['orm_route'], django_lookup): typed_value})
         return ~q if filter_lookup == FilterLookups.NE else q
 
+    def _build_django_q_for_pattern(
+        self,
+        filter_item,
+        django_lookup,
+        filter_lookup,
+        typed_value,
+        str_value,
+    ):
+        q = self._build_django_q(filter_item, django_lookup, filter_lookup, typed_value)
+        if not (
+            self.DECOMPOSE_SEARCH_PATTERNS
+            and django_lookup in (DjangoLookups.REGEX, DjangoLookups.I_REGEX)
+        ):
+            return q
+
+        prefilter = self._get_searching_prefilter(django_lookup, str_value)
+        if prefilter is None:
+            return q
+
+        prefilter_lookup, prefilter_value = prefilter
+        return self._build_django_q(
+            filter_item,
+            prefilter_lookup,
+            filter_lookup,
+            prefilter_value,
+        ) & q
+
+    @classmethod
+    def _get_searching_prefilter(cls, django_lookup, str_value):
+        """Regular expressions can't be served by common indexes, so patterns are matched
+        with `startswith` by their prefix or `contains` by their longest fragment first."""
+        fragments = cls._tokenize_like_value(str_value)
+
+        prefix = 'I_' if django_lookup == DjangoLookups.I_REGEX else ''
+        if fragments[0]:
+            pattern, fragment = 'STARTSWITH', fragments[0]
+        else:
+            pattern, fragment = 'CONTAINS', max(fragments, key=len)
+            if not fragment:
+                return None
+
+        return (
+            getattr(DjangoLookups, '{0}{1}'.format(prefix, pattern)),
+            fragment,
+        )
+
     @staticmethod
     def _get_filter_lookup_by_operator(grammar_operator):
-        mapper = {
-            ComparisonOperators.EQ: FilterLookups.EQ,
-            ComparisonOperators.NE: FilterLookups.NE,
-            ComparisonOperators.LT: FilterLookups.LT,
-            ComparisonOperators.LE: FilterLookups.LE,
-            ComparisonOperators.GT: FilterLookups.GT,
-            ComparisonOperators.GE: FilterLookups.GE,
-            SearchOperators.LIKE: FilterLookups.LIKE,
-            SearchOperators.I_LIKE: FilterLookups.I_LIKE,
-        }
-        return mapper[grammar_operator]
+        return _FILTER_LOOKUPS_BY_OPERATOR[grammar_operator]
 
     @staticmethod
     def _get_error_details(filter_name, filter_lookup, str_value):
@@ -1279,6 +2183,9 @@ class RQLFilterClass:
             e = "{0}: dynamic filters must have 'field' set.".format(filter_name)
             assert field is not None, e
 
+            e = "{0}: dynamic filters can't be checked in subquery.".format(filter_name)
+            assert not filter_item.get('subquery'), e
+
         else:
             e = "{0}: common filters can't have 'field' set.".format(filter_name)
             assert not filter_item.get('custom', False) and field is None, e
@@ -1291,6 +2198,29 @@ class RQLFilterClass:
         e = "{0}: 'search' can be applied only to text filters.".format(filter_name)
         assert not (filter_item.get('search') and is_non_string_field_type), e
 
+        search_index = filter_item.get('search_index')
+        if search_index is not None:
+            e = "{0}: 'search_index' must be one of: {1}.".format(
+                filter_name,
+                ', '.join(sorted(SearchIndexes.all())),
+            )
+            assert search_index in SearchIndexes.all(), e
+
+            e = "{0}: 'search_index' can be applied only to text filters.".format(filter_name)
+            assert not is_non_string_field_type, e
+
+        search_weight = filter_item.get('search_weight')
+        if search_weight is not None:
+            e = "{0}: 'search_weight' must be a positive number.".format(filter_name)
+            assert (
+                isinstance(search_weight, (int, float))
+                and not isinstance(search_weight, bool)
+                and search_weight > 0
+            ), e
+
+            e = "{0}: 'search_weight' can be set only for search filters.".format(filter_name)
+            assert filter_item.get('search'), e
+
 
 class AutoRQLFilterClass(RQLFilterClass):
     """Filter class that automatically collects filters for simple model fields."""
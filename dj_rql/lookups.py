@@ -0,0 +1,74 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from django.db.models import Field, Lookup
+from django.db.models.functions import Lower
+from django.db.models.lookups import (
+    IContains,
+    IEndsWith,
+    IExact,
+    IStartsWith,
+)
+
+from dj_rql.constants import DjangoLookups
+
+
+class _ILikeMixin:
+    """Case-insensitive pattern lookup, that is compiled to `column ILIKE pattern` on PostgreSQL,
+    so that it can be served by trigram (`gin_trgm_ops`) indexes. Django lookups are compiled to
+    `UPPER(column::text) LIKE UPPER(pattern)`, which can't use them. On other databases
+    lookups work as the Django ones.
+    """
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, params = Lookup.process_lhs(self, compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        params.extend(rhs_params)
+        return '{0} ILIKE {1}'.format(lhs_sql, rhs_sql), params
+
+
+class TrigramIExact(_ILikeMixin, IExact):
+    pass
+
+
+class TrigramIContains(_ILikeMixin, IContains):
+    pass
+
+
+class TrigramIStartsWith(_ILikeMixin, IStartsWith):
+    pass
+
+
+class TrigramIEndsWith(_ILikeMixin, IEndsWith):
+    pass
+
+
+CASE_FOLD_TRANSFORM = 'rql_casefold'
+
+TRIGRAM_LOOKUPS = {
+    DjangoLookups.I_EXACT: 'rql_trigram_iexact',
+    DjangoLookups.I_CONTAINS: 'rql_trigram_icontains',
+    DjangoLookups.I_STARTSWITH: 'rql_trigram_istartswith',
+    DjangoLookups.I_ENDSWITH: 'rql_trigram_iendswith',
+}
+
+CASE_FOLDED_LOOKUPS = {
+    DjangoLookups.I_EXACT: '{0}__{1}'.format(CASE_FOLD_TRANSFORM, DjangoLookups.EXACT),
+    DjangoLookups.I_CONTAINS: '{0}__{1}'.format(CASE_FOLD_TRANSFORM, DjangoLookups.CONTAINS),
+    DjangoLookups.I_STARTSWITH: '{0}__{1}'.format(CASE_FOLD_TRANSFORM, DjangoLookups.STARTSWITH),
+    DjangoLookups.I_ENDSWITH: '{0}__{1}'.format(CASE_FOLD_TRANSFORM, DjangoLookups.ENDSWITH),
+}
+
+
+_TRIGRAM_LOOKUP_CLASSES = {
+    DjangoLookups.I_EXACT: TrigramIExact,
+    DjangoLookups.I_CONTAINS: TrigramIContains,
+    DjangoLookups.I_STARTSWITH: TrigramIStartsWith,
+    DjangoLookups.I_ENDSWITH: TrigramIEndsWith,
+}
+
+# Lookups are registered under names, that don't clash with lookups of Django and other apps
+Field.register_lookup(Lower, lookup_name=CASE_FOLD_TRANSFORM)
+for _django_lookup, _lookup_name in TRIGRAM_LOOKUPS.items():
+    Field.register_lookup(_TRIGRAM_LOOKUP_CLASSES[_django_lookup], lookup_name=_lookup_name)
@@ -0,0 +1,42 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from django.core.management import BaseCommand
+
+from dj_rql.drf.warmup import read_queries, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Initializes filter classes of all views with RQL filter backends and replays '
+        'recorded hot queries. Only caches, shared between processes (f.e. query plans cached '
+        'with DjangoCacheBackend), outlive the command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-u',
+            '--urlconf',
+            type=str,
+            help='URL conf module to walk: ROOT_URLCONF by default.',
+        )
+        parser.add_argument(
+            '-q',
+            '--queries',
+            type=str,
+            help='File with recorded queries: one "<path>?<query>" per line.',
+        )
+
+    def handle(self, *args, **options):
+        queries = read_queries(options['queries']) if options['queries'] else ()
+        report = warm_up(urlconf=options['urlconf'], queries=queries)
+
+        for target, e in report.errors:
+            self.stderr.write('{0}: {1!r}'.format(target, e))
+
+        return 'Warmed up {0} filter classes and {1} queries, {2} errors.'.format(
+            report.filter_classes,
+            report.queries,
+            len(report.errors),
+        )
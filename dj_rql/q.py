@@ -0,0 +1,261 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.hashable import make_hashable
+from django.utils.tree import Node
+
+from dj_rql.constants import DjangoLookups
+
+
+_GTE_SUFFIX = '__{0}'.format(DjangoLookups.GTE)
+_LTE_SUFFIX = '__{0}'.format(DjangoLookups.LTE)
+_RANGE_SUFFIX = '__range'
+
+
+def simplify_q(q, model=None):
+    """Returns simplified equivalent of Django Q object.
+
+    Notes:
+        Nested nodes with the same connector (and nodes with one child) are flattened,
+        empty nodes and duplicated children are dropped and pairs of `gte` and `lte` lookups
+        for the same ORM route under AND connector are merged into one `range` lookup.
+        Source Q object is not changed.
+
+        Nodes inside negated nodes are not flattened and ranges are not merged there, as
+        Django excludes multi-valued relations with subqueries per lookup. If the model is
+        passed, ranges are merged only for ORM routes without to-many relations.
+
+    Args:
+        q (Q): Django Q object.
+        model (django.db.models.Model or None): Model of the filtered queryset.
+
+    Returns:
+        Q: Simplified Q object of the same class.
+    """
+    if not isinstance(q, Node):
+        return q
+
+    return _Simplifier(model).simplify(q)
+
+
+def combine_q(q_objects, connector, q_cls=Q):
+    """Returns Django Q object, that combines Q objects with the connector.
+
+    Notes:
+        Result is equal to the chain of `&` or `|` operations, but accumulated node is not
+        copied on every operation. Empty Q objects are skipped.
+
+    Args:
+        q_objects (iterable): Django Q objects.
+        connector (str): `Q.AND` or `Q.OR`.
+        q_cls (type): Class of the result, if there are no Q objects to combine.
+
+    Returns:
+        Q: Combined Q object.
+    """
+    q_objects = [q for q in q_objects if q]
+    if not q_objects:
+        return q_cls()
+
+    if len(q_objects) == 1:
+        return q_objects[0]
+
+    combined_q = type(q_objects[0])(_connector=connector)
+    for q in q_objects:
+        combined_q.add(q, connector)
+
+    return combined_q
+
+
+class _Simplifier:
+    """Tree is walked with explicit stack, so that depth of Q objects is not limited by
+    Python recursion limit. Children are compared by integer keys, that are assigned to
+    distinct subtrees once, so that duplicates search doesn't rehash nested nodes on every level.
+    """
+
+    def __init__(self, model=None):
+        self._model = model
+        self._keys = {}
+        self._node_keys = {}
+
+    def simplify(self, q):
+        stack = [(q, iter(q.children), [], q.negated)]
+
+        while True:
+            node, children_iterator, children, is_negated = stack[-1]
+            for child in children_iterator:
+                if isinstance(child, Node):
+                    stack.append(
+                        (child, iter(child.children), [], is_negated or child.negated),
+                    )
+                    break
+
+                children.append(child)
+
+            else:
+                stack.pop()
+                simplified = self._simplify_node(node, children, is_negated)
+                if not stack:
+                    return simplified
+
+                stack[-1][2].append(simplified)
+
+    def _simplify_node(self, node, simplified_children, is_negated):
+        children = self._merge_children(node, simplified_children, is_negated)
+        if (
+            len(children) == 1
+            and isinstance(children[0], Node)
+            and not (node.negated or is_negated)
+        ):
+            return children[0]
+
+        connector = node.connector if len(children) > 1 else node.default
+        simplified = _create_node(type(node), children, connector, node.negated)
+        self._node_keys[id(simplified)] = self._get_key(
+            (type(node), connector, node.negated, tuple(self._get_child_key(c) for c in children)),
+        )
+        return simplified
+
+    def _merge_children(self, node, simplified_children, is_negated):
+        children = []
+        seen = set()
+
+        for child in simplified_children:
+            if isinstance(child, Node):
+                if not child.children:
+                    continue
+
+                if (not (child.negated or is_negated)) and (
+                    child.connector == node.connector or len(child.children) == 1
+                ):
+                    grandchildren = child.children
+                else:
+                    grandchildren = (child,)
+
+            else:
+                grandchildren = (child,)
+
+            for grandchild in grandchildren:
+                key = self._get_child_key(grandchild)
+                if key not in seen:
+                    seen.add(key)
+                    children.append(grandchild)
+
+        if node.connector == node.AND and not is_negated:
+            children = _merge_ranges(children, self._model)
+
+        return children
+
+    def _get_child_key(self, child):
+        if isinstance(child, Node):
+            return self._node_keys[id(child)]
+
+        if not (isinstance(child, tuple) and _is_plain_value(child[1])):
+            # Equality of expressions and querysets doesn't guarantee the same SQL
+            return self._get_key(object())
+
+        try:
+            return self._get_key(make_hashable(child))
+        except TypeError:
+            return self._get_key(object())
+
+    def _get_key(self, value):
+        return self._keys.setdefault(value, len(self._keys))
+
+
+def _is_plain_value(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all(_is_plain_value(v) for v in value)
+
+    return not (hasattr(value, 'resolve_expression') or hasattr(value, 'query'))
+
+
+def _create_node(node_cls, children, connector, negated):
+    # `Node.create()` is added in Django 4.2, earlier versions have `_new_instance()`
+    create = getattr(node_cls, 'create', None) or node_cls._new_instance
+    return create(children, connector, negated)
+
+
+@lru_cache(maxsize=1000)
+def _is_multi_valued_route(model, orm_route):
+    """Returns True, if ORM route is known to go through to-many relations."""
+    for part in orm_route.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+
+        if not field.is_relation:
+            return False
+
+        if field.many_to_many or field.one_to_many:
+            return True
+
+        model = field.related_model
+
+    return False
+
+
+@lru_cache(maxsize=1000)
+def _is_single_valued_route(model, orm_route):
+    """Returns True, if ORM route doesn't go through to-many relations."""
+    for part in orm_route.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # Annotations can aggregate any relations
+            return False
+
+        if not field.is_relation:
+            # The rest of the route is transforms of the field
+            return True
+
+        if field.many_to_many or field.one_to_many:
+            return False
+
+        model = field.related_model
+
+    return True
+
+
+def _merge_ranges(children, model=None):
+    bounds = {}
+    for index, child in enumerate(children):
+        if not isinstance(child, tuple):
+            continue
+
+        lookup, value = child
+        if (value is None) or hasattr(value, 'resolve_expression'):
+            continue
+
+        if lookup.endswith(_GTE_SUFFIX):
+            bounds.setdefault(lookup[: -len(_GTE_SUFFIX)], ([], []))[0].append(index)
+        elif lookup.endswith(_LTE_SUFFIX):
+            bounds.setdefault(lookup[: -len(_LTE_SUFFIX)], ([], []))[1].append(index)
+
+    merged = {}
+    for orm_route, (lower_indexes, upper_indexes) in bounds.items():
+        if model is not None and not _is_single_valued_route(model, orm_route):
+            continue
+
+        if len(lower_indexes) == 1 and len(upper_indexes) == 1:
+            lower_index, upper_index = lower_indexes[0], upper_indexes[0]
+            merged[min(lower_index, upper_index)] = (
+                orm_route + _RANGE_SUFFIX,
+                (children[lower_index][1], children[upper_index][1]),
+            )
+            merged[max(lower_index, upper_index)] = None
+
+    if not merged:
+        return children
+
+    return [
+        merged[index] if index in merged else child
+        for index, child in enumerate(children)
+        if merged.get(index, child) is not None
+    ]
@@ -0,0 +1,223 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import re
+from functools import reduce
+from operator import add
+
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from py_rql.constants import RQL_ANY_SYMBOL
+
+from dj_rql.q import combine_q
+
+
+_TERM_PATTERN = re.compile(r'\w+')
+
+
+class SearchStrategy:
+    """Base class of strategies, that build Q objects for the `search` operator."""
+
+    def __init__(self, filter_instance):
+        """
+        :param RQLFilterClass filter_instance: Filter class instance, that filters the queryset
+        """
+        self.filter_instance = filter_instance
+
+    def build_q(self, str_value: str) -> Q:
+        """Builds Q object for searching.
+
+        Args:
+            str_value (str): Unquoted non-empty search value.
+
+        Returns:
+            A Q instance.
+        """
+        raise NotImplementedError
+
+    def build_rank(self, str_value):
+        """Builds relevance score of search results, that is used, if `RANK_SEARCH_RESULTS`
+        is set for the filter class (the higher score, the more relevant result).
+
+        Args:
+            str_value (str): Unquoted non-empty search value.
+
+        Returns:
+            A Django expression or None, if results are not ranked by the strategy.
+        """
+        return None
+
+    @staticmethod
+    def get_terms(str_value):
+        """Returns words of the search value, wildcards and other special symbols are dropped.
+
+        Args:
+            str_value (str): Unquoted search value.
+
+        Returns:
+            list: Words of the value.
+        """
+        return _TERM_PATTERN.findall(str_value)
+
+
+class LookupSearchStrategy(SearchStrategy):
+    """Default strategy: `ilike` lookups by all search filters and extended search ORM routes
+    are combined with OR, value is matched as a substring, if it has no wildcards.
+
+    Relevance score is a sum of `search_weight` of matched search filters (1 by default
+    and for extended search ORM routes). Matching by to-many relations is scored in `EXISTS`
+    subqueries, so that rows, joined for filtering, don't get different scores.
+    """
+
+    def __init__(self, filter_instance):
+        super().__init__(filter_instance)
+        self._weighted_q_objects = {}
+
+    def build_q(self, str_value):
+        return combine_q(
+            (q for q, _, _ in self._get_weighted_q_objects(str_value)),
+            Q.OR,
+            q_cls=self.filter_instance.Q_CLS,
+        )
+
+    def build_rank(self, str_value):
+        ranks = []
+        for q, weight, is_multi_valued in self._get_weighted_q_objects(str_value):
+            if not q:
+                continue
+
+            if is_multi_valued:
+                q = self.filter_instance._build_q_for_subquery(q)
+
+            ranks.append(
+                Case(
+                    When(q, then=Value(float(weight))),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                ),
+            )
+
+        return reduce(add, ranks) if ranks else None
+
+    def _get_weighted_q_objects(self, str_value):
+        """Q objects are built once for the value, if both Q object and score are needed."""
+        try:
+            return self._weighted_q_objects[str_value]
+        except KeyError:
+            pass
+
+        search_value = str_value
+        if not search_value.startswith(RQL_ANY_SYMBOL):
+            search_value = '*' + search_value
+
+        if not search_value.endswith(RQL_ANY_SYMBOL):
+            search_value += '*'
+
+        weighted_q_objects = self.filter_instance._build_weighted_q_for_search(search_value)
+        self._weighted_q_objects[str_value] = weighted_q_objects
+        return weighted_q_objects
+
+
+class SQLiteFTSSearchStrategy(SearchStrategy):
+    """Full-text search by prefixes of all words of the value in SQLite FTS5 table, that is
+    maintained for the filter class model (f.e. as an external content table with triggers).
+
+    Notes:
+        Search filters and extended search ORM routes are not used, searched columns
+        are defined by the FTS table. Relevance score is the inverted built-in `rank` (BM25)
+        of FTS table, it's correlated with the model table, so ranked querysets can't be
+        used as subqueries.
+    """
+
+    TABLE = None
+    """Name of FTS5 virtual table."""
+
+    ORM_ROUTE = 'pk'
+    """ORM route of the filter class model field, that matches `rowid` of FTS table
+    (default `pk`)."""
+
+    def build_q(self, str_value):
+        terms = self.get_terms(str_value)
+        if not terms:
+            return self.filter_instance.Q_CLS()
+
+        return self.filter_instance.Q_CLS(
+            **{
+                '{0}__in'.format(self.ORM_ROUTE): RawSQL(
+                    'SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(self.TABLE),
+                    (self.get_match_query(terms),),
+                ),
+            },
+        )
+
+    def build_rank(self, str_value):
+        terms = self.get_terms(str_value)
+        if not terms:
+            return None
+
+        meta = self.filter_instance.MODEL._meta
+        field = meta.pk if self.ORM_ROUTE == 'pk' else meta.get_field(self.ORM_ROUTE)
+        return RawSQL(
+            'SELECT -rank FROM {0} WHERE {0} MATCH %s AND rowid = "{1}"."{2}"'.format(
+                self.TABLE,
+                meta.db_table,
+                field.column,
+            ),
+            (self.get_match_query(terms),),
+            output_field=FloatField(),
+        )
+
+    @staticmethod
+    def get_match_query(terms):
+        return ' '.join('"{0}"*'.format(term) for term in terms)
+
+
+class PostgreSQLSearchStrategy(SearchStrategy):
+    """Full-text search by prefixes of all words of the value in `SearchVectorField`, that is
+    maintained for the filter class model (f.e. by a trigger or a generated column) and
+    is covered by GIN index.
+
+    Notes:
+        Search filters and extended search ORM routes are not used, searched columns
+        are defined by the vector field. Relevance score is `ts_rank` of the vector.
+        Requires `django.contrib.postgres`.
+    """
+
+    VECTOR_ORM_ROUTE = None
+    """ORM route of `SearchVectorField` of the filter class model."""
+
+    CONFIG = None
+    """Text search configuration of the vector (f.e. `english`, default `None`)."""
+
+    def build_q(self, str_value):
+        terms = self.get_terms(str_value)
+        if not terms:
+            return self.filter_instance.Q_CLS()
+
+        return self.filter_instance.Q_CLS(**{self.VECTOR_ORM_ROUTE: self.get_search_query(terms)})
+
+    def build_rank(self, str_value):
+        from django.contrib.postgres.search import SearchRank
+
+        terms = self.get_terms(str_value)
+        if not terms:
+            return None
+
+        return SearchRank(F(self.VECTOR_ORM_ROUTE), self.get_search_query(terms))
+
+    def get_search_query(self, terms):
+        from django.contrib.postgres.search import SearchQuery
+
+        return SearchQuery(
+            ' & '.join('{0}:*'.format(term) for term in terms),
+            config=self.CONFIG,
+            search_type='raw',
+        )
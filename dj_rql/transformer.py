@@ -3,6 +3,7 @@
 #
 
 from lark import Tree
+from lark.visitors import Discard
 from py_rql.constants import (
     RQL_LIMIT_PARAM,
     RQL_OFFSET_PARAM,
@@ -10,6 +11,7 @@ from py_rql.constants import (
     ListOperators,
     LogicalOperators,
 )
+from py_rql.exceptions import RQLFilterParsingError
 from py_rql.transformer import BaseRQLTransformer
 
 from dj_rql._dataclasses import FilterArgs
@@ -24,14 +26,21 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
         Transform collects ordering filters, but doesn't apply them.
         They are applied later in FilterCls. This is done on purpose, because transformer knows
         nothing about the mappings between filter names and orm fields.
+
+        The result of transformation is a Q object, that doesn't depend on the filtered queryset,
+        so it can be reused as a part of compiled query plan.
     """
 
     NAMESPACE_PROVIDERS = ('comp', 'listing')
     NAMESPACE_FILLERS = ('prop',)
     NAMESPACE_ACTIVATORS = ('tuple',)
 
-    def __init__(self, filter_cls_instance):
+    LIMITED_NODES = ('comp', 'listing', 'searching', 'logical', 'tuple', 'ordering', 'select')
+    NESTING_NODES = ('logical', 'tuple')
+
+    def __init__(self, filter_cls_instance, skipped_nodes=()):
         self._filter_cls_instance = filter_cls_instance
+        self._skipped_nodes = skipped_nodes
 
         self._ordering = []
         self._select = []
@@ -40,6 +49,14 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
         self._namespace = []
         self._active_namespace = 0
 
+        self._max_nodes = filter_cls_instance.MAX_NODES_IN_QUERY
+        self._max_depth = filter_cls_instance.MAX_NESTING_DEPTH_IN_QUERY
+        self._max_list_length = filter_cls_instance.MAX_LIST_LENGTH_IN_QUERY
+        self._max_namespaces = filter_cls_instance.MAX_NAMESPACES_IN_QUERY
+        self._nodes_count = 0
+        self._depth = 0
+        self._filtered_namespaces = set()
+
         self.__visit_tokens__ = False
 
     @property
@@ -66,11 +83,73 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
         return self._namespace[: self._active_namespace]
 
     def _transform_tree(self, tree):
+        if id(tree) in self._skipped_nodes:
+            return self._skip_node(tree)
+
+        self._enter_node(tree)
         self._push_namespace(tree)
         ret_value = super()._transform_tree(tree)
         self._pop_namespace(tree)
+        self._exit_node(tree)
         return ret_value
 
+    def _enter_node(self, tree):
+        # Limits are checked before children are transformed to fail as early as possible
+        if tree.data not in self.LIMITED_NODES:
+            return
+
+        self._nodes_count += 1
+        if self._max_nodes is not None and self._nodes_count > self._max_nodes:
+            self._raise_limit_error('number of nodes', self._max_nodes)
+
+        if tree.data in self.NESTING_NODES:
+            self._depth += 1
+            if self._max_depth is not None and self._depth > self._max_depth:
+                self._raise_limit_error('nesting depth', self._max_depth)
+
+        if tree.data == 'listing' and self._max_list_length is not None:
+            if len(tree.children) - 2 > self._max_list_length:
+                self._raise_limit_error('number of list values', self._max_list_length)
+
+    def _exit_node(self, tree):
+        if tree.data in self.NESTING_NODES:
+            self._depth -= 1
+
+    def _skip_node(self, tree):
+        """Skipped nodes are not transformed, but they are counted by query limits."""
+        self._enter_node(tree)
+        self._check_namespaces(
+            '.'.join(self._get_current_namespace() + [_get_token_value(_get_prop_tree(tree))]),
+        )
+        self._exit_node(tree)
+        return self._q()
+
+    def _add_filtered_prop(self, prop):
+        self._filtered_props.add(prop)
+        self._check_namespaces(prop)
+
+    def _check_namespaces(self, prop):
+        if self._max_namespaces is None:
+            return
+
+        parts = prop.split('.')
+        for index in range(1, len(parts)):
+            self._filtered_namespaces.add('.'.join(parts[:index]))
+
+        if len(self._filtered_namespaces) > self._max_namespaces:
+            self._raise_limit_error('number of namespaces', self._max_namespaces)
+
+    @staticmethod
+    def _raise_limit_error(limit_name, max_value):
+        raise RQLFilterParsingError(
+            details={
+                'error': 'Query is too complex: max allowed {0} is {1}.'.format(
+                    limit_name,
+                    max_value,
+                ),
+            },
+        )
+
     def _get_value(self, obj):
         while isinstance(obj, Tree):
             obj = obj.children[0]
@@ -88,10 +167,19 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
     def select_filters(self):
         return self._select
 
+    @property
+    def filtered_props(self):
+        return self._filtered_props
+
     def start(self, args):
-        qs = self._filter_cls_instance.apply_annotations(self._filtered_props)
+        """Returns Q object of the query.
 
-        return qs.filter(args[0])
+        Notes:
+            Transformation returned the filtered queryset before query plans were added.
+            Annotations, ordering and distinct are applied by `RQLFilterClass.apply_query_plan()`
+            now, so querysets are filtered with `RQLFilterClass.apply_filters()`.
+        """
+        return args[0]
 
     def comp(self, args):
         prop, operation, value = self._extract_comparison(args)
@@ -103,7 +191,7 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
                 return ~value
 
         filter_args = FilterArgs(prop, operation, value, namespace=self._get_current_namespace())
-        self._filtered_props.add(filter_args.filter_name)
+        self._add_filtered_prop(filter_args.filter_name)
         return self._filter_cls_instance.build_q_for_filter(filter_args)
 
     def tuple(self, args):
@@ -128,13 +216,22 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
         return q
 
     def listing(self, args):
-        # Django __in lookup is not used, because of null() values
         operation, prop = self._get_value(args[0]), self._get_value(args[1])
+        values = [self._get_value(value_tree) for value_tree in args[2:]]
+        namespace = self._get_current_namespace()
+        filter_name = '.'.join(namespace + [prop])
+        self._add_filtered_prop(filter_name)
+
+        if not any(isinstance(value, self._q) for value in values):
+            q = self._filter_cls_instance.build_q_for_list_filter(filter_name, operation, values)
+            if q is not None:
+                return q
+
+        # Per-value expressions are used, if list can't be expressed with Django __in lookup
         f_op = ComparisonOperators.EQ if operation == ListOperators.IN else ComparisonOperators.NE
 
         q = self._q()
-        for value_tree in args[2:]:
-            value = self._get_value(value_tree)
+        for value in values:
             if isinstance(value, self._q):
                 if f_op == ComparisonOperators.EQ:
                     field_q = value
@@ -147,6 +244,7 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
                         f_op,
                         value,
                         list_operator=operation,
+                        namespace=namespace,
                     ),
                 )
             if operation == ListOperators.IN:
@@ -154,15 +252,13 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
             else:
                 q &= field_q
 
-        self._filtered_props.add(prop)
-
         return q
 
     def searching(self, args):
         # like, ilike
         operation, prop, val = tuple(self._get_value(args[index]) for index in range(3))
         filter_args = FilterArgs(prop, operation, val, namespace=self._get_current_namespace())
-        self._filtered_props.add(filter_args.filter_name)
+        self._add_filtered_prop(filter_args.filter_name)
         return self._filter_cls_instance.build_q_for_filter(filter_args)
 
     def ordering(self, args):
@@ -171,7 +267,7 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
 
         if props:
             for prop in props:
-                self._filtered_props.add(prop.replace('-', '').replace('+', ''))
+                self._add_filtered_prop(prop.replace('-', '').replace('+', ''))
 
         return self._q()
 
@@ -184,11 +280,113 @@ class RQLToDjangoORMTransformer(BaseRQLTransformer):
         if props:
             for prop in props:
                 if not prop.startswith('-'):
-                    self._filtered_props.add(prop.replace('+', ''))
+                    self._add_filtered_prop(prop.replace('+', ''))
 
         return self._q()
 
 
+class RQLToDjangoORMIterativeTransformer(RQLToDjangoORMTransformer):
+    """Parsed RQL AST tree transformer to Django ORM Query, that uses explicit stack
+    instead of recursion.
+
+    Notes:
+        The result of transformation is the same, as for `RQLToDjangoORMTransformer`, but
+        the depth of transformed queries is not limited by Python recursion limit.
+    """
+
+    _ENTER, _EXIT, _VALUE = range(3)
+
+    def transform(self, tree):
+        stack = [(self._ENTER, tree)]
+        results = [[]]
+
+        while stack:
+            action, obj = stack.pop()
+
+            if action == self._VALUE:
+                results[-1].append(obj)
+
+            elif id(obj) in self._skipped_nodes:
+                results[-1].append(self._skip_node(obj))
+
+            elif action == self._ENTER:
+                self._enter_node(obj)
+                self._push_namespace(obj)
+
+                results.append([])
+                stack.append((self._EXIT, obj))
+                for child in reversed(obj.children):
+                    stack.append((self._ENTER if isinstance(child, Tree) else self._VALUE, child))
+
+            else:
+                children = results.pop()
+                try:
+                    results[-1].append(self._call_userfunc(obj, children))
+                except Discard:
+                    pass
+
+                self._pop_namespace(obj)
+                self._exit_node(obj)
+
+        return results[0][0]
+
+
+def iter_filter_nodes(rql_ast):
+    """Yields `(tree, filter_name)` pairs for all comparison, listing and searching nodes
+    of parsed RQL AST tree, that are applied to filters (not to namespaces).
+
+    Notes:
+        Filter names are full: namespaces of tuples are prepended, like on transformation.
+    """
+    stack = [(rql_ast, ())]
+
+    while stack:
+        tree, namespace = stack.pop()
+
+        if tree.data == 'comp':
+            prop = _get_token_value(_get_prop_tree(tree))
+            value = tree.children[-1].children[0]
+
+            if isinstance(value, Tree) and value.data == 'tuple':
+                stack.append((value, namespace + (prop,)))
+            else:
+                yield tree, '.'.join(namespace + (prop,))
+
+        elif tree.data == 'listing':
+            prop = _get_token_value(_get_prop_tree(tree))
+            tuples = [
+                value_tree.children[0]
+                for value_tree in tree.children[2:]
+                if isinstance(value_tree.children[0], Tree)
+                and value_tree.children[0].data == 'tuple'
+            ]
+            if tuples:
+                stack.extend((t, namespace + (prop,)) for t in tuples)
+            else:
+                yield tree, '.'.join(namespace + (prop,))
+
+        elif tree.data == 'searching':
+            yield tree, '.'.join(namespace + (_get_token_value(_get_prop_tree(tree)),))
+
+        elif tree.data not in ('ordering', 'select'):
+            stack.extend((child, namespace) for child in tree.children if isinstance(child, Tree))
+
+
+def _get_prop_tree(tree):
+    """Returns property subtree of comparison, listing or searching node."""
+    if tree.data == 'comp':
+        return next(child for child in tree.children if child.data == 'prop')
+
+    return tree.children[1]
+
+
+def _get_token_value(tree):
+    while isinstance(tree, Tree):
+        tree = tree.children[0]
+
+    return tree.value
+
+
 class RQLLimitOffsetTransformer(BaseRQLTransformer):
     """Parsed RQL AST tree transformer to (limit, offset) tuple for limit offset pagination."""
 
@@ -0,0 +1,32 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Performance benchmarks.
+
+Benchmarks are not collected by pytest and are run as modules, f.e.:
+
+    python -m tests.benchmarks.bench_queryset_cache_key
+"""
+
+import os
+import timeit
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.dj_rf.settings')
+
+    import django
+
+    django.setup()
+
+
+def measure(func, number=1000, repeat=5):
+    """Returns the best time of one `func` call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def report(title, results):
+    print(title)
+    width = max(len(name) for name, _ in results)
+    for name, value in results:
+        print('  {0:<{1}}  {2:>10.2f} us'.format(name, width, value))
@@ -0,0 +1,75 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Measures building of Django Q objects for queries with many comparisons."""
+
+from tests.benchmarks import measure, report, setup_django
+
+
+COMPARISONS = (
+    'id=1',
+    'title=abc',
+    'ge(current_price,5.5)',
+    'written=2020-01-01',
+    'status=planning',
+    'author.email=a@example.com',
+    'published.at=2020-01-01T10:00:00Z',
+    'rating.blog=low',
+    'rating.blog_int=1',
+    'url="https://example.com"',
+    'd_id=5',
+    'author.is_male=true',
+    'page.number=10',
+)
+
+
+def main():
+    from py_rql.constants import ComparisonOperators
+
+    from dj_rql._dataclasses import FilterArgs
+    from dj_rql.cache import parse_query
+    from dj_rql.transformer import RQLToDjangoORMTransformer
+    from tests.dj_rf.filters import BooksFilterClass
+    from tests.dj_rf.models import Book
+
+    instance = BooksFilterClass(Book.objects.none())
+
+    results = []
+    for count in (13, 52, 104):
+        comparisons = (COMPARISONS * (count // len(COMPARISONS) + 1))[:count]
+        rql_ast = parse_query('&'.join(comparisons))
+
+        results.append(
+            (
+                '{0} comparisons'.format(count),
+                measure(
+                    lambda rql_ast=rql_ast: RQLToDjangoORMTransformer(instance).transform(
+                        rql_ast,
+                    ),
+                    number=100,
+                ),
+            ),
+        )
+
+    report('Transformation of parsed query into Q', results)
+
+    filter_args = []
+    for comparison in COMPARISONS:
+        if '=' in comparison:
+            filter_name, value = comparison.split('=', 1)
+            filter_args.append(FilterArgs(filter_name, ComparisonOperators.EQ, value))
+
+    def build_q():
+        for _ in range(4):
+            for args in filter_args:
+                instance.build_q_for_filter(args)
+
+    report(
+        'Building of Q for filters',
+        [('{0} comparisons'.format(len(filter_args) * 4), measure(build_q, number=200))],
+    )
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
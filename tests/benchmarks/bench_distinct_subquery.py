@@ -0,0 +1,119 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Measures filtering by a to-many relation with `SELECT DISTINCT` over joins and with
+`EXISTS` subqueries on an in-memory SQLite fixture with 1M pages (100K books with 10 pages).
+
+Fixture size can be changed with arguments, f.e.:
+
+    python -m tests.benchmarks.bench_distinct_subquery 10000 10
+"""
+
+import sys
+
+from tests.benchmarks import measure, report, setup_django
+
+
+QUERIES = (
+    'page.number=1',
+    'in(page.number,(1,2,3))',
+    'ne(page.number,1)',
+)
+
+
+def get_filter_classes():
+    from dj_rql.filter_cls import RQLFilterClass
+    from tests.dj_rf.models import Book
+
+    class DistinctFilterClass(RQLFilterClass):
+        MODEL = Book
+        FILTERS = (
+            'id',
+            {
+                'namespace': 'page',
+                'source': 'pages',
+                'filters': (
+                    {
+                        'filter': 'number',
+                        'distinct': True,
+                    },
+                ),
+            },
+        )
+
+    class SubqueryFilterClass(RQLFilterClass):
+        MODEL = Book
+        FILTERS = (
+            'id',
+            {
+                'namespace': 'page',
+                'source': 'pages',
+                'subquery': True,
+                'filters': ('number',),
+            },
+        )
+
+    return DistinctFilterClass, SubqueryFilterClass
+
+
+def create_fixture(books_count, pages_per_book):
+    from django.db import connection
+
+    from tests.dj_rf.models import Book, Page
+
+    connection.creation.create_test_db(verbosity=0)
+
+    batch_size = 10000
+    for start in range(0, books_count, batch_size):
+        Book.objects.bulk_create(
+            Book(title='book{0}'.format(index))
+            for index in range(start, min(start + batch_size, books_count))
+        )
+
+    book_ids = list(Book.objects.values_list('id', flat=True))
+    pages = (
+        Page(book_id=book_id, number=number)
+        for book_id in book_ids
+        for number in range(pages_per_book)
+    )
+    while True:
+        batch = [page for _, page in zip(range(batch_size), pages)]
+        if not batch:
+            break
+
+        Page.objects.bulk_create(batch)
+
+
+def main(books_count=100000, pages_per_book=10):
+    from tests.dj_rf.models import Book
+
+    create_fixture(books_count, pages_per_book)
+    print('Fixture: {0} books, {1} pages'.format(books_count, books_count * pages_per_book))
+
+    filter_classes = get_filter_classes()
+    queryset = Book.objects.order_by('id')
+
+    for query in QUERIES:
+        results = []
+        for filter_cls in filter_classes:
+            _, qs = filter_cls(queryset).apply_filters(query)
+
+            results.extend(
+                (
+                    (
+                        '{0}, count()'.format(filter_cls.__name__),
+                        measure(qs.count, number=1, repeat=3),
+                    ),
+                    (
+                        '{0}, first 100 rows'.format(filter_cls.__name__),
+                        measure(lambda qs=qs: list(qs[:100]), number=1, repeat=3),
+                    ),
+                ),
+            )
+
+        report('Filtering with {0}'.format(query), results)
+
+
+if __name__ == '__main__':
+    setup_django()
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,77 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Measures compilation of WHERE clauses for deeply nested queries with and without
+simplification of Q objects."""
+
+from tests.benchmarks import measure, report, setup_django
+
+
+def get_nested_query(depth):
+    query = 'and(ge(id,1),le(id,1000))'
+    for level in range(depth):
+        operator = 'and' if level % 2 else 'or'
+        query = '{0}(and({1},ne(id,{2})),and(ne(id,{2}),ge(id,{2}),le(id,{3})))'.format(
+            operator,
+            query,
+            level,
+            level + 100,
+        )
+
+    return query
+
+
+def count_nodes(q):
+    return 1 + sum(count_nodes(child) for child in q.children if hasattr(child, 'children'))
+
+
+def main():
+    from django.db import connection
+
+    from dj_rql.cache import parse_query
+    from dj_rql.q import simplify_q
+    from dj_rql.transformer import RQLToDjangoORMTransformer
+    from tests.dj_rf.filters import BooksFilterClass
+    from tests.dj_rf.models import Book
+
+    instance = BooksFilterClass(Book.objects.none())
+    queryset = Book.objects.all()
+
+    def compile_where(q):
+        return queryset.filter(q).query.get_compiler(connection=connection).as_sql()
+
+    compilation_results, simplification_results = [], []
+    for depth in (5, 20, 50):
+        q = RQLToDjangoORMTransformer(instance).transform(parse_query(get_nested_query(depth)))
+        simplified_q = simplify_q(q)
+
+        print(
+            'Depth {0}: {1} Q nodes, {2} SQL chars -> {3} Q nodes, {4} SQL chars'.format(
+                depth,
+                count_nodes(q),
+                len(compile_where(q)[0]),
+                count_nodes(simplified_q),
+                len(compile_where(simplified_q)[0]),
+            ),
+        )
+
+        compilation_results.extend(
+            (
+                ('depth {0}'.format(depth), measure(lambda q=q: compile_where(q), number=20)),
+                (
+                    'depth {0}, simplified'.format(depth),
+                    measure(lambda q=simplified_q: compile_where(q), number=20),
+                ),
+            ),
+        )
+        simplification_results.append(
+            ('depth {0}'.format(depth), measure(lambda q=q: simplify_q(q), number=20)),
+        )
+
+    report('Filtering and compilation of WHERE clause', compilation_results)
+    report('Simplification of Q', simplification_results)
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
@@ -0,0 +1,41 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Compares strategies of building base queryset part of RQLFilterBackend cache key."""
+
+from tests.benchmarks import measure, report, setup_django
+
+
+def main():
+    from django.db.models import Count, F, Q
+
+    from dj_rql.drf._utils import get_queryset_fingerprint
+    from tests.dj_rf.models import Book
+
+    simple_qs = Book.objects.all()
+    complex_qs = (
+        Book.objects.select_related('author__publisher')
+        .prefetch_related('pages')
+        .filter(
+            Q(author__publisher__name='p') | Q(author__name__startswith='a'),
+            pages__number__gte=10,
+            status__in=['planning', 'writing'],
+        )
+        .exclude(author__fk1__isnull=True)
+        .annotate(pages_count=Count('pages'), price=F('current_price') * 2)
+        .order_by('-published_at', 'id')
+    )
+
+    for title, qs in (('Simple queryset', simple_qs), ('Complex queryset', complex_qs)):
+        report(
+            title,
+            [
+                ('str(queryset.query)', measure(lambda qs=qs: str(qs.query))),
+                ('get_queryset_fingerprint', measure(lambda qs=qs: get_queryset_fingerprint(qs))),
+            ],
+        )
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
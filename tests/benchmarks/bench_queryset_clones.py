@@ -0,0 +1,117 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Counts queryset clones and measures time of filtering for a filter class with 20 select
+optimizations, when optimizations of the query plan are collected into one chained call per
+operation and when they are applied per select tree node (as for overridden `optimize_field()`).
+"""
+
+from unittest import mock
+
+from tests.benchmarks import measure, report, setup_django
+
+
+QUERY = 'title=abc&author.email=a@example.com&ordering(-published.at)&select(pages)'
+
+
+def get_filter_class():
+    from django.db.models import F, IntegerField, Value
+
+    from dj_rql.filter_cls import RQLFilterClass
+    from dj_rql.qs import (
+        AN,
+        NSR,
+        PR,
+        SR,
+    )
+    from tests.dj_rf.models import Book
+
+    filters = [
+        {
+            'filter': 'title',
+        },
+        {
+            'filter': 'published.at',
+            'source': 'published_at',
+            'ordering': True,
+        },
+        {
+            'namespace': 'author',
+            'qs': SR('author'),
+            'filters': (
+                'email',
+                {
+                    'namespace': 'publisher',
+                    'qs': NSR('publisher'),
+                    'filters': ('id',),
+                },
+            ),
+        },
+        {
+            'namespace': 'pages',
+            'source': 'pages',
+            'hidden': True,
+            'qs': PR('pages'),
+            'filters': ('number',),
+        },
+    ]
+    filters.extend(
+        {
+            'filter': 'anno{0}'.format(index),
+            'dynamic': True,
+            'field': IntegerField(),
+            'qs': AN(**{'anno{0}'.format(index): Value(index, IntegerField()) + F('id')}),
+        }
+        for index in range(17)
+    )
+
+    class BenchFilterClass(RQLFilterClass):
+        MODEL = Book
+        SELECT = True
+        FILTERS = filters
+
+    return BenchFilterClass
+
+
+def main():
+    from django.db.models import QuerySet
+
+    from tests.dj_rf.models import Book
+
+    filter_class = get_filter_class()
+
+    class PerNodeFilterClass(filter_class):
+        def optimize_field(self, data):
+            return None
+
+    queryset = Book.objects.all()
+
+    def get_filter_func(cls):
+        instance = cls(Book.objects.none())
+
+        def filter_queryset():
+            _, qs = cls(queryset, instance=instance).apply_filters(QUERY)
+            return qs
+
+        return filter_queryset
+
+    results, clones = [], []
+    for name, func in (
+        ('Call per tree node', get_filter_func(PerNodeFilterClass)),
+        ('Call per operation', get_filter_func(filter_class)),
+    ):
+        func()
+
+        with mock.patch.object(QuerySet, '_clone', autospec=True, side_effect=QuerySet._clone) as m:
+            func()
+            clones.append('{0}: {1} clones'.format(name, m.call_count))
+
+        results.append((name, measure(func, number=100)))
+
+    print('\n'.join(clones))
+    report('Filtering with 20 select optimizations', results)
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
@@ -0,0 +1,63 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Measures building of Q objects for `search` by 30 search filters with a lookup and
+a typed value, that are computed once per value and with a full per-filter build."""
+
+from tests.benchmarks import measure, report, setup_django
+
+
+FILTERS_COUNT = 30
+
+VALUES = ('python', 'py*thon', '"*fluent*py*"')
+
+
+def get_filter_classes():
+    from dj_rql.filter_cls import RQLFilterClass
+    from tests.dj_rf.models import Book
+
+    class SearchFilterClass(RQLFilterClass):
+        MODEL = Book
+        FILTERS = tuple(
+            {
+                'filter': 'title{0}'.format(index),
+                'source': 'title',
+                'search': True,
+            }
+            for index in range(FILTERS_COUNT)
+        )
+
+    class PerFilterSearchFilterClass(SearchFilterClass):
+        def build_q_for_filter(self, data):
+            # Overridden Q building disables sharing of search lookups and values
+            return super().build_q_for_filter(data)
+
+    return SearchFilterClass, PerFilterSearchFilterClass
+
+
+def main():
+    from tests.dj_rf.models import Book
+
+    results = []
+    for value in VALUES:
+        for filter_cls in get_filter_classes():
+            instance = filter_cls(Book.objects.none())
+            results.append(
+                (
+                    '{0}, search={1}'.format(filter_cls.__name__, value),
+                    measure(
+                        lambda instance=instance, value=value: instance._build_q_for_search(
+                            'eq',
+                            value,
+                        ),
+                        number=200,
+                    ),
+                ),
+            )
+
+    report('Search by {0} filters'.format(FILTERS_COUNT), results)
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
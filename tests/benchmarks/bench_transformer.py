@@ -0,0 +1,68 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+"""Measures per-node overhead of recursive and iterative transformation of deeply nested
+queries into Q."""
+
+from tests.benchmarks import measure, setup_django
+
+
+def get_nested_query(depth):
+    query = 'eq(id,1)'
+    for level in range(depth):
+        query = '{0}({1},ne(id,{2}))'.format('and' if level % 2 else 'or', query, level)
+
+    return query
+
+
+def count_nodes(tree):
+    return 1 + sum(count_nodes(child) for child in tree.children if hasattr(child, 'children'))
+
+
+def main():
+    import sys
+
+    from dj_rql.cache import parse_query
+    from dj_rql.transformer import RQLToDjangoORMIterativeTransformer, RQLToDjangoORMTransformer
+    from tests.dj_rf.filters import BooksFilterClass
+    from tests.dj_rf.models import Book
+
+    instance = BooksFilterClass(Book.objects.none())
+
+    # AST nodes are counted recursively
+    sys.setrecursionlimit(10000)
+
+    print('Transformation of parsed query into Q, per AST node')
+    for depth in (10, 100, 500):
+        rql_ast = parse_query(get_nested_query(depth))
+        nodes = count_nodes(rql_ast)
+
+        for transformer_cls in (RQLToDjangoORMTransformer, RQLToDjangoORMIterativeTransformer):
+            sys.setrecursionlimit(1000)
+            try:
+                value = '{0:>10.3f} us'.format(
+                    measure(
+                        lambda cls=transformer_cls, rql_ast=rql_ast: cls(instance).transform(
+                            rql_ast,
+                        ),
+                        number=10,
+                    ) / nodes,
+                )
+            except RecursionError:
+                value = 'RecursionError'
+            finally:
+                sys.setrecursionlimit(10000)
+
+            print(
+                '  depth {0:<4} ({1:>5} nodes)  {2:<35}  {3}'.format(
+                    depth,
+                    nodes,
+                    transformer_cls.__name__,
+                    value,
+                ),
+            )
+
+
+if __name__ == '__main__':
+    setup_django()
+    main()
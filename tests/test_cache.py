@@ -0,0 +1,367 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from threading import Thread
+
+import pytest
+from django.db.models import CharField, F, IntegerField
+from py_rql.exceptions import RQLFilterParsingError
+
+from dj_rql.cache import (
+    DjangoCacheBackend,
+    LFUCache,
+    LRUCache,
+    ShardedLRUCache,
+    TTLCache,
+    _ASTCache,
+    _BaseCache,
+    get_ast_cache,
+    get_definition_hash,
+    parse_query,
+)
+from dj_rql.drf import RQLFilterBackend
+from dj_rql.drf.paginations import RQLLimitOffsetPagination
+from dj_rql.filter_cls import RQLFilterClass, _QueryPlansCache
+from dj_rql.qs import AN, SR
+from tests.dj_rf.filters import BooksFilterClass
+from tests.dj_rf.models import Author, Book
+
+
+@pytest.fixture
+def clear_ast_cache():
+    _ASTCache.clear()
+    yield
+    _ASTCache.clear()
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1
+
+    cache['c'] = 3
+    assert cache.currsize == 2
+    assert 'a' in cache
+    assert 'b' not in cache
+
+    with pytest.raises(KeyError):
+        cache['b']
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_lru_cache_zero_size():
+    cache = LRUCache(0)
+    cache['a'] = 1
+    assert len(cache) == 0
+    assert cache.get('a') is None
+
+
+def test_lru_cache_clear():
+    cache = LRUCache(1)
+    cache['a'] = 1
+    cache.get('a')
+    cache.clear()
+    assert (cache.currsize, cache.hits, cache.misses) == (0, 0, 0)
+
+
+def test_lru_cache_threads():
+    cache = LRUCache(50)
+
+    def worker(shift):
+        for i in range(500):
+            key = (i + shift) % 100
+            if cache.get(key) is None:
+                cache[key] = key
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.currsize == 50
+    assert cache.hits + cache.misses == 8 * 500
+
+
+def test_parse_query_cached(clear_ast_cache):
+    rql_ast = parse_query('eq(id,1)')
+    assert parse_query('eq(id,1)') is rql_ast
+
+    cache = get_ast_cache()
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.maxsize == 1000
+
+
+def test_parse_query_error_not_cached(clear_ast_cache):
+    for _ in range(2):
+        with pytest.raises(RQLFilterParsingError):
+            parse_query('q=')
+
+    assert get_ast_cache().currsize == 0
+
+
+def test_ast_cache_size_setting(clear_ast_cache, settings):
+    settings.RQL_AST_CACHE_SIZE = 0
+
+    parse_query('eq(id,1)')
+    parse_query('eq(id,1)')
+
+    cache = get_ast_cache()
+    assert cache.currsize == 0
+    assert cache.misses == 2
+
+
+def test_ast_cache_shared_between_filter_classes(clear_ast_cache):
+    class Cls1(RQLFilterClass):
+        MODEL = Book
+        FILTERS = ('id',)
+
+    class Cls2(Cls1):
+        FILTERS = ('id', 'title')
+
+    query = 'eq(id,1)'
+    ast1, _ = Cls1(Book.objects.all()).apply_filters(query)
+    ast2, _ = Cls2(Book.objects.all()).apply_filters(query)
+
+    assert ast1 is ast2
+    assert get_ast_cache().hits == 1
+
+
+def test_pagination_uses_ast_cache(clear_ast_cache, mocker):
+    query = 'limit=10,offset=5'
+    rql_ast = parse_query(query)
+
+    request = mocker.MagicMock(spec=['_request', 'query_params'])
+    request._request.META = {'QUERY_STRING': query}
+
+    pagination = RQLLimitOffsetPagination()
+    pagination.paginate_queryset(range(100), request)
+
+    assert (pagination.limit, pagination.offset) == (10, 5)
+    assert get_ast_cache().hits == 1
+    assert get_ast_cache()[query] is rql_ast
+
+
+def test_django_cache_backend(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache = DjangoCacheBackend(10)
+
+    with pytest.raises(KeyError):
+        cache[('v', 'q')]
+
+    cache[('v', 'q')] = {'a': 1}
+    assert cache[('v', 'q')] == {'a': 1}
+    assert ('v', 'q') in cache
+    assert ('v', 'q2') not in cache
+
+    cache[('v', 'q2')] = lambda: None
+    assert ('v', 'q2') not in cache
+
+
+def test_django_cache_backend_timeout(settings, mocker):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache = DjangoCacheBackend(10)
+    set_spy = mocker.spy(cache.cache, 'set')
+
+    cache[('v', 'q')] = {'a': 1}
+
+    assert set_spy.call_args[1]['timeout'] == 24 * 60 * 60
+
+
+def test_django_cache_backend_errors(settings, mocker):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache = DjangoCacheBackend(10)
+    for method in ('get', 'set', 'has_key'):
+        mocker.patch.object(cache.cache, method, side_effect=ConnectionError)
+
+    cache[('v', 'q')] = {'a': 1}
+    with pytest.raises(KeyError):
+        cache[('v', 'q')]
+
+    assert ('v', 'q') not in cache
+
+
+def test_definition_hash_of_unknown_objects():
+    class Unknown:
+        def __init__(self, value):
+            self.value = value
+            self.itself = self
+
+    assert get_definition_hash([Unknown(1)]) == get_definition_hash([Unknown(2)])
+    assert get_definition_hash([Unknown(1)]) != get_definition_hash([object()])
+
+
+def test_definition_hash():
+    filters = [{'filter': 'title', 'lookups': {'eq', 'ne'}}, {'namespace': 'author', 'qs': SR('a')}]
+    same_filters = [{'lookups': {'ne', 'eq'}, 'filter': 'title'}, {'namespace': 'author', 'qs': SR('a')}]
+
+    assert get_definition_hash(filters, Book) == get_definition_hash(same_filters, Book)
+    assert get_definition_hash(filters, Book) != get_definition_hash(filters, Author)
+    assert get_definition_hash([{'field': IntegerField()}]) != get_definition_hash(
+        [{'field': CharField()}],
+    )
+    assert get_definition_hash([AN(x=F('id'))]) != get_definition_hash([AN(x=F('pk'))])
+    assert get_definition_hash(Book._meta.get_field('title')) != get_definition_hash(
+        Book._meta.get_field('status'),
+    )
+
+
+def test_incomplete_cache_backend():
+    class IncompleteCache(_BaseCache):
+        def _get(self, key):
+            return self._data[key]
+
+        def _set(self, key, value):
+            self._data[key] = value
+
+    with pytest.raises(TypeError):
+        IncompleteCache(10)
+
+
+def test_lfu_cache_eviction():
+    cache = LFUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['a']
+    cache['a']
+    cache['b']
+
+    cache['c'] = 3
+    assert 'b' not in cache
+    assert cache['c'] == 3
+
+    cache['d'] = 4
+    assert 'c' not in cache
+    assert set(cache._data) == {'a', 'd'}
+    assert cache.evictions == 2
+
+
+def test_lfu_cache_update():
+    cache = LFUCache(2)
+    cache['a'] = 1
+    cache['a'] = 2
+    cache['b'] = 3
+    cache['c'] = 4
+
+    assert cache['a'] == 2
+    assert 'b' not in cache
+
+
+def test_ttl_cache():
+    now = [0]
+    cache = TTLCache(2, ttl=10, timer=lambda: now[0])
+    cache['a'] = 1
+    assert cache['a'] == 1
+
+    now[0] = 10
+    assert 'a' not in cache
+    with pytest.raises(KeyError):
+        cache['a']
+
+    assert cache.currsize == 0
+    assert cache.evictions == 1
+
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['c'] = 3
+    assert set(cache._data) == {'b', 'c'}
+    assert set(cache._expirations) == {'b', 'c'}
+
+    cache.clear()
+    assert cache.currsize == 0
+
+
+def test_sharded_lru_cache():
+    cache = ShardedLRUCache(100, shards=4)
+    for i in range(200):
+        cache[i] = i
+
+    assert cache.currsize == 100
+    assert cache.evictions == 100
+    assert cache.get(199) == 199
+    assert cache.get(0) is None
+    assert 199 in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    stats = cache.stats()
+    assert (stats.maxsize, stats.currsize, stats.evictions) == (100, 100, 100)
+
+    cache.clear()
+    assert cache.currsize == 0
+
+
+def test_sharded_lru_cache_threads():
+    cache = ShardedLRUCache(64)
+
+    def worker(shift):
+        for i in range(1000):
+            key = (i + shift) % 128
+            if cache.get(key) is None:
+                cache[key] = key
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert stats.hits + stats.misses == 8 * 1000
+    assert stats.currsize <= 64
+
+
+@pytest.mark.parametrize('cache_cls', [LRUCache, LFUCache, TTLCache, ShardedLRUCache])
+def test_cache_stats(cache_cls):
+    cache = cache_cls(10)
+    cache['a'] = 'x' * 1000
+    cache['a']
+    cache.get('b')
+
+    stats = cache.stats()
+    assert (stats.maxsize, stats.currsize, stats.hits, stats.misses) == (10, 1, 1, 1)
+    assert stats.hit_rate == 0.5
+    assert stats.memory > 1000
+    assert 'hits=1' in repr(stats)
+
+
+def test_cache_stats_empty():
+    assert LRUCache(1).stats().hit_rate == 0
+
+
+@pytest.mark.django_db
+def test_backend_cache_stats(mocker):
+    class Cls(RQLFilterClass):
+        MODEL = Book
+        FILTERS = ('id',)
+        QUERIES_CACHE_BACKEND = LFUCache
+        QUERY_PLANS_CACHE_BACKEND = ShardedLRUCache
+
+    class View:
+        rql_filter_class = Cls
+
+    class CachetoolsView:
+        rql_filter_class = BooksFilterClass
+
+    request = mocker.MagicMock(method='GET')
+    request._request.META = {'QUERY_STRING': 'id=1'}
+    mocker.patch.object(RQLFilterBackend, '_CACHES', {})
+    mocker.patch.object(_QueryPlansCache, 'CACHE', {})
+
+    for _ in range(3):
+        RQLFilterBackend().filter_queryset(request, Book.objects.all(), View())
+        RQLFilterBackend().filter_queryset(request, Book.objects.all(), CachetoolsView())
+
+    stats = RQLFilterBackend.get_cache_stats()
+    assert list(stats.keys()) == ['tests.test_cache.View+tests.test_cache.Cls']
+    assert (stats['tests.test_cache.View+tests.test_cache.Cls'].hits, stats[
+        'tests.test_cache.View+tests.test_cache.Cls'
+    ].misses) == (2, 1)
+
+    plans_stats = Cls.get_query_plans_cache_stats()
+    assert (plans_stats.hits, plans_stats.misses) == (0, 1)
+    assert BooksFilterClass.get_query_plans_cache_stats() is None
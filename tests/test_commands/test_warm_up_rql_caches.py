@@ -0,0 +1,31 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from dj_rql.drf import RQLFilterBackend
+from dj_rql.drf.backend import _FilterClassCache
+
+
+def test_warm_up_rql_caches(tmp_path):
+    _FilterClassCache.clear()
+    RQLFilterBackend._CACHES = {}
+
+    path = tmp_path / 'queries.txt'
+    path.write_text('/books/?title=abc\n/books/?eq((\n')
+    stderr = StringIO()
+
+    result = call_command('warm_up_rql_caches', queries=str(path), stderr=stderr)
+
+    assert result == 'Warmed up 6 filter classes and 1 queries, 1 errors.'
+    assert '/books/?eq((' in stderr.getvalue()
+    assert len(RQLFilterBackend._CACHES) == 1
+
+
+def test_warm_up_rql_caches_without_queries():
+    assert call_command('warm_up_rql_caches', urlconf='tests.dj_rf.urls') == (
+        'Warmed up 6 filter classes and 0 queries, 0 errors.'
+    )
@@ -0,0 +1,100 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+from decimal import Decimal
+
+import pytest
+from django.db.models import CharField, DecimalField, IntegerField
+
+from dj_rql.constants import FilterTypes
+from dj_rql.converters import ValueConverters
+from dj_rql.filter_cls import RQLFilterClass
+from tests.dj_rf.models import Book
+
+
+def get_converter(field, use_repr=False, filter_cls=RQLFilterClass):
+    return filter_cls._get_value_converter(field, use_repr=use_repr)
+
+
+@pytest.mark.parametrize(
+    'field_name,use_repr,value,expected',
+    (
+        ('blog_rating', False, '1', 1),
+        ('blog_rating', True, 'high', 1),
+        ('status', False, 'writing', 'writing'),
+        ('int_choice_field', False, '2', 2),
+        ('int_choice_field', True, 'II', 2),
+        ('str_choice_field', False, 'two', 'two'),
+        ('str_choice_field', True, 'II', 'two'),
+    ),
+)
+def test_choices_converter(field_name, use_repr, value, expected):
+    assert get_converter(Book._meta.get_field(field_name), use_repr)(value) == expected
+
+
+@pytest.mark.parametrize(
+    'field_name,use_repr,value',
+    (
+        ('blog_rating', False, 'high'),
+        ('blog_rating', True, '1'),
+        ('status', False, 'unknown'),
+        ('int_choice_field', False, '3'),
+        ('int_choice_field', False, 'one'),
+        ('int_choice_field', True, '1'),
+        ('str_choice_field', True, 'two'),
+        ('str_choice_field', False, 'empty()'),
+    ),
+)
+def test_choices_converter_error(field_name, use_repr, value):
+    with pytest.raises(ValueError):
+        get_converter(Book._meta.get_field(field_name), use_repr)(value)
+
+
+def test_choices_converter_first_choice_wins():
+    field = IntegerField(choices=((1, 'a'), (2, 'a')))
+    assert get_converter(field, use_repr=True)('a') == 1
+
+
+def test_common_converters():
+    assert get_converter(IntegerField())('"5"') == 5
+    assert get_converter(CharField(blank=True))('empty()') == ''
+    assert get_converter(DecimalField(decimal_places=2))('1.239') == Decimal('1.23')
+
+    with pytest.raises(ValueError):
+        get_converter(IntegerField())('empty()')
+
+
+def test_register_converter():
+    class UpperCharField(CharField):
+        pass
+
+    class Converters(ValueConverters):
+        pass
+
+    @Converters.register(CharField)
+    def get_upper_converter(filter_cls, django_field, filter_type, use_repr):
+        assert filter_type == FilterTypes.STRING
+        return str.upper
+
+    class Cls(RQLFilterClass):
+        VALUE_CONVERTERS_CLS = Converters
+
+    assert Converters.field_mapper == {CharField: get_upper_converter}
+    assert ValueConverters.field_mapper == {}
+
+    assert get_converter(UpperCharField(), filter_cls=Cls)('abc') == 'ABC'
+    assert get_converter(IntegerField(), filter_cls=Cls)('1') == 1
+    assert get_converter(UpperCharField())('abc') == 'abc'
+
+
+def test_register_converter_overrides_type_converter():
+    class Converters(ValueConverters):
+        pass
+
+    Converters.register(DecimalField, lambda *args: float)
+
+    class Cls(RQLFilterClass):
+        VALUE_CONVERTERS_CLS = Converters
+
+    assert get_converter(DecimalField(decimal_places=2), filter_cls=Cls)('1.239') == 1.239
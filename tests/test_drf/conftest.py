@@ -6,6 +6,7 @@ import pytest
 from rest_framework.test import APIClient
 
 from dj_rql.drf.backend import RQLFilterBackend, _FilterClassCache
+from dj_rql.filter_cls import _QueryPlansCache
 
 
 @pytest.fixture
@@ -19,3 +20,4 @@ def api_client():
 def clear_cache():
     _FilterClassCache.clear()
     RQLFilterBackend._CACHES = {}
+    _QueryPlansCache.clear()
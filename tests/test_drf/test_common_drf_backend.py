@@ -1,15 +1,24 @@
 #
 #  Copyright © 2023 Ingram Micro Inc. All rights reserved.
 #
+from threading import Thread
+
 import pytest
 from cachetools import LFUCache, LRUCache
 from django.db import connection
+from django.db.models import IntegerField, QuerySet, Value
+from django.db.models.sql.compiler import SQLCompiler
 from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
 from rest_framework.reverse import reverse
 from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+from rest_framework.test import APIRequestFactory
 
+from dj_rql import cache as dj_rql_cache
 from dj_rql.drf import RQLFilterBackend
+from dj_rql.drf._utils import get_queryset_fingerprint
 from dj_rql.drf.backend import _FilterClassCache
+from tests.dj_rf.filters import BooksFilterClass
 from tests.dj_rf.models import Book
 
 
@@ -228,3 +237,199 @@ def test_list_filtering_for_auto(api_client, clear_cache):
     response = api_client.get('{0}?{1}'.format(reverse('auto-list'), query))
     assert response.status_code == HTTP_200_OK
     assert response.data == [{'id': books[0].pk}]
+
+
+@pytest.mark.django_db
+def test_query_cache_key_without_sql_compilation(api_client, clear_cache, mocker):
+    books = [Book.objects.create(title='F'), Book.objects.create(title='G')]
+    api_client.get('{0}?{1}'.format(reverse('book-list'), 'title=F'))
+
+    as_sql_spy = mocker.spy(SQLCompiler, 'as_sql')
+    response = api_client.get('{0}?{1}'.format(reverse('book-list'), 'title=F'))
+    assert response.data == [{'id': books[0].pk}]
+
+    # Only the count and data queries are compiled
+    assert as_sql_spy.call_count == 2
+
+
+def test_queryset_fingerprint():
+    base_qs = Book.objects.select_related('author').filter(author__name='a', title__in=['b'])
+
+    assert get_queryset_fingerprint(base_qs) == get_queryset_fingerprint(base_qs.all())
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(
+        Book.objects.select_related('author').filter(author__name='b', title__in=['b']),
+    )
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(base_qs.order_by('id'))
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(
+        base_qs.prefetch_related('pages'),
+    )
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(
+        base_qs.annotate(anno=Value(1, IntegerField())),
+    )
+    assert get_queryset_fingerprint(Book.objects.none()) != get_queryset_fingerprint(
+        Book.objects.all(),
+    )
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(base_qs.using('other'))
+    assert get_queryset_fingerprint(base_qs) != get_queryset_fingerprint(
+        base_qs.select_for_update(),
+    )
+    assert get_queryset_fingerprint(base_qs.select_for_update()) != get_queryset_fingerprint(
+        base_qs.select_for_update(skip_locked=True),
+    )
+
+
+def test_queryset_fingerprint_fallback():
+    qs = Book.objects.filter(pk__in=Book.objects.filter(title='a').values('pk'))
+    assert get_queryset_fingerprint(qs)[-1] == str(qs.query)
+
+    qs = Book.objects.extra(where=['1=1'])
+    assert get_queryset_fingerprint(qs)[-1] == str(qs.query)
+    assert get_queryset_fingerprint(qs) != get_queryset_fingerprint(qs.using('other'))
+    assert get_queryset_fingerprint(qs) != get_queryset_fingerprint(qs.select_for_update())
+
+
+@pytest.mark.django_db
+def test_query_cache_view_discriminator(clear_cache, mocker):
+    class View:
+        rql_filter_class = BooksFilterClass
+
+        def __init__(self, discriminator):
+            self.discriminator = discriminator
+
+        def get_rql_cache_discriminator(self):
+            return self.discriminator
+
+    request = mocker.MagicMock(method='GET')
+    request._request.META = {'QUERY_STRING': 'title=F'}
+    fingerprint_patch = mocker.patch('dj_rql.drf.backend.get_queryset_fingerprint')
+
+    book = Book.objects.create(title='F')
+    backend = RQLFilterBackend()
+    for discriminator in (1, 2, 1):
+        qs = backend.filter_queryset(request, Book.objects.all(), View(discriminator))
+        assert list(qs) == [book]
+
+    cache = RQLFilterBackend._CACHES[
+        'tests.test_drf.test_common_drf_backend.View+tests.dj_rf.filters.BooksFilterClass'
+    ]
+    assert cache.currsize == 2
+    assert (1, 'title=F') in cache
+    fingerprint_patch.assert_not_called()
+
+
+class _NotCachedFilterClass(BooksFilterClass):
+    QUERIES_CACHE_BACKEND = None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('filter_class,clones', ((_NotCachedFilterClass, 2), (BooksFilterClass, 3)))
+def test_filtered_queryset_clones(clear_cache, mocker, filter_class, clones):
+    class View:
+        rql_filter_class = filter_class
+
+    request = mocker.MagicMock(method='GET')
+    request._request.META = {'QUERY_STRING': 'title=F&ordering(-d_id)'}
+    book = Book.objects.create(title='F')
+    queryset = Book.objects.all()
+    clone_spy = mocker.spy(QuerySet, '_clone')
+
+    qs = RQLFilterBackend().filter_queryset(request, queryset, View())
+
+    assert clone_spy.call_count == clones
+    assert qs is not queryset
+    assert list(qs) == [book]
+    assert queryset._result_cache is None
+
+
+@pytest.mark.django_db
+def test_not_filtered_queryset_is_cloned(mocker):
+    class View:
+        rql_filter_class = _NotCachedFilterClass
+
+    request = mocker.MagicMock(method='GET')
+    request._request.META = {'QUERY_STRING': ''}
+    queryset = Book.objects.all()
+
+    assert RQLFilterBackend().filter_queryset(request, queryset, View()) is not queryset
+
+
+class _StressFilterClass(BooksFilterClass):
+    QUERIES_CACHE_BACKEND = dj_rql_cache.LRUCache
+    QUERIES_CACHE_SIZE = 8
+
+
+class _StressShardedFilterClass(BooksFilterClass):
+    QUERIES_CACHE_BACKEND = dj_rql_cache.ShardedLRUCache
+    QUERIES_CACHE_SIZE = 100
+
+
+class _StressView:
+    rql_filter_class = _StressFilterClass
+
+
+class _StressOtherView:
+    rql_filter_class = _StressFilterClass
+
+
+class _StressShardedView:
+    rql_filter_class = _StressShardedFilterClass
+
+
+def test_query_cache_concurrent_filtering(clear_cache):
+    queries = ['title=T{0}'.format(i) for i in range(12)] + ['status=planning', 'ordering(-d_id)']
+    views = (_StressView(), _StressOtherView(), _StressShardedView())
+    requests = {q: Request(APIRequestFactory().get('/?' + q)) for q in queries}
+
+    expected = {
+        (view.__class__, query): str(
+            RQLFilterBackend().filter_queryset(request, Book.objects.all(), view).query,
+        )
+        for view in views
+        for query, request in requests.items()
+    }
+    RQLFilterBackend._CACHES = {}
+
+    errors = []
+
+    def worker(shift):
+        backend = RQLFilterBackend()
+        try:
+            for i in range(100):
+                view = views[(i + shift) % len(views)]
+                query = queries[(i * 7 + shift) % len(queries)]
+                qs = backend.filter_queryset(requests[query], Book.objects.all(), view)
+                assert str(qs.query) == expected[(view.__class__, query)]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+
+    stats = RQLFilterBackend.get_cache_stats()
+    assert len(stats) == 3
+    for cache_stats in stats.values():
+        assert cache_stats.currsize <= cache_stats.maxsize
+        assert cache_stats.hits > 0
+
+
+def test_query_cache_lock_free_reads(clear_cache, mocker):
+    request = Request(APIRequestFactory().get('/?title=F'))
+    backend = RQLFilterBackend()
+    backend.filter_queryset(request, Book.objects.all(), _StressView())
+
+    locks = mocker.patch.object(RQLFilterBackend, '_LOCKS', mocker.MagicMock())
+    for _ in range(3):
+        backend.filter_queryset(request, Book.objects.all(), _StressView())
+
+    locks.__getitem__.assert_not_called()
+
+    backend.filter_queryset(request, Book.objects.all(), _StressOtherView())
+    locks.__getitem__.assert_called_with(
+        'tests.test_drf.test_common_drf_backend._StressOtherView'
+        '+tests.test_drf.test_common_drf_backend._StressFilterClass',
+    )
@@ -0,0 +1,70 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from py_rql.exceptions import RQLFilterParsingError
+from rest_framework.reverse import reverse
+
+from dj_rql.cache import get_ast_cache
+from dj_rql.drf import RQLFilterBackend
+from dj_rql.drf.backend import _FilterClassCache
+from dj_rql.drf.warmup import read_queries, warm_up
+from tests.dj_rf.models import Book
+
+
+def test_warm_up_filter_classes(clear_cache):
+    report = warm_up()
+
+    assert report.filter_classes == 6
+    assert report.queries == 0
+    assert report.errors == []
+    assert set(_FilterClassCache.CACHE.keys()) == {
+        'tests.dj_rf.view.DRFViewSet+tests.dj_rf.filters.BooksFilterClass',
+        'tests.dj_rf.view.DjangoFiltersViewSet+tests.dj_rf.filters.BooksFilterClass',
+        'tests.dj_rf.view.SelectViewSet+tests.dj_rf.filters.SelectBooksFilterClass',
+        'tests.dj_rf.view.AutoViewSet+tests.dj_rf.view.Cls',
+        'tests.dj_rf.view.DynamicFilterClsViewSet+tests.dj_rf.filters.SelectBooksFilterClass',
+        'tests.dj_rf.view.DynamicFilterClsViewSet'
+        '+tests.dj_rf.filters.SelectDetailedBooksFilterClass',
+    }
+    assert RQLFilterBackend._CACHES == {}
+
+
+@pytest.mark.django_db
+def test_warm_up_queries(api_client, clear_cache):
+    book = Book.objects.create(title='abc')
+
+    with CaptureQueriesContext(connection) as context:
+        report = warm_up(queries=['/books/?title=abc', '/select/?select(author)'])
+
+    assert context.captured_queries == []
+    assert (report.queries, report.errors) == (2, [])
+
+    cache = RQLFilterBackend._CACHES[
+        'tests.dj_rf.view.DRFViewSet+tests.dj_rf.filters.BooksFilterClass'
+    ]
+    assert cache.currsize == 1
+
+    response = api_client.get('{0}?{1}'.format(reverse('book-list'), 'title=abc'))
+    assert response.data == [{'id': book.pk}]
+    assert cache.currsize == 1
+    assert get_ast_cache().get('title=abc') is not None
+
+
+def test_warm_up_errors(clear_cache):
+    report = warm_up(queries=['/unknown/?title=abc', '/books/?eq((', '/books/?title=abc'])
+
+    assert report.queries == 1
+    assert [target for target, _ in report.errors] == ['/unknown/?title=abc', '/books/?eq((']
+    assert isinstance(report.errors[1][1], RQLFilterParsingError)
+    assert 'errors=2' in repr(report)
+
+
+def test_read_queries(tmp_path):
+    path = tmp_path / 'queries.txt'
+    path.write_text('# hot queries\n/books/?title=abc\n\n  /select/?select(author)  \n')
+
+    assert read_queries(str(path)) == ['/books/?title=abc', '/select/?select(author)']
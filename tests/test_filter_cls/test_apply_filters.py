@@ -11,9 +11,16 @@ from django.utils.timezone import now
 from py_rql.constants import RQL_NULL, FilterLookups, ListOperators
 from py_rql.exceptions import RQLFilterLookupError, RQLFilterParsingError, RQLFilterValueError
 
+from dj_rql.constants import SearchIndexes
 from dj_rql.filter_cls import RQLFilterClass
+from dj_rql.transformer import RQLToDjangoORMIterativeTransformer, RQLToDjangoORMTransformer
 from tests.dj_rf.filters import BooksFilterClass
-from tests.dj_rf.models import Author, Book, Publisher
+from tests.dj_rf.models import (
+    Author,
+    Book,
+    Page,
+    Publisher,
+)
 from tests.test_filter_cls.utils import book_qs
 
 
@@ -59,6 +66,32 @@ def test_searching(searching_tpl):
     assert apply_filters(searching_tpl.format(title)) == [books[0]]
 
 
+@pytest.mark.parametrize(
+    'query,expected_q',
+    (
+        ('like(title,ab)', Q(title__exact='ab')),
+        ('like(title,ab*)', Q(title__startswith='ab')),
+        ('ilike(title,*ab)', Q(title__iendswith='ab')),
+        ('like(title,*ab*)', Q(title__contains='ab')),
+        ('like(title,*)', Q(title__regex='(.*)')),
+        ('like(title,a*b)', Q(title__regex='^a(.*)b$')),
+        ('ilike(title,*a*b*)', Q(title__iregex='a(.*)b')),
+        ('like(title,"a\\*b")', Q(title__exact='a*b')),
+        ('like(title,"\\**")', Q(title__startswith='*')),
+        ('like(title,"*a.\\\\*")', Q(title__contains='a.\\')),
+        ('like(title,"*a.\\\\\\*")', Q(title__endswith='a.\\*')),
+        ('like(title,"a\\b*.c")', Q(title__regex='^a\\\\b(.*)\\.c$')),
+    ),
+)
+def test_searching_values(query, expected_q):
+    assert BooksFilterClass(book_qs).build_query_plan(query).q == expected_q
+
+
+def test_searching_double_wildcard():
+    with pytest.raises(RQLFilterValueError):
+        apply_filters('like(title,*a**b*)')
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize('operator', ['&', ','])
 def test_and(operator):
@@ -291,6 +324,89 @@ def test_null_with_in_or(generate_books):
     assert apply_filters('or(title=eq={0},eq(title,{1}))'.format(title, RQL_NULL)) == books
 
 
+class PerValueListingBooksFilterClass(BooksFilterClass):
+    def _is_list_filter_collapsible(self):
+        return False
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('operator', (ListOperators.IN, ListOperators.OUT))
+@pytest.mark.parametrize(
+    'filter_name,values',
+    (
+        ('id', ('{book0.pk}',)),
+        ('id', ('{book0.pk}', '{book1.pk}', '100500')),
+        ('title', ('t0', RQL_NULL)),
+        ('title', (RQL_NULL,)),
+        ('author.email', ('author0@example.com', 'author2@example.com')),
+        ('status', ('planning', 'writing')),
+        ('rating.blog', ('low', 'high')),
+        ('published.at', ('2020-01-01T10:00:00Z', RQL_NULL)),
+        ('page.id', ('{page0.uuid}', '{page1.uuid}')),
+        ('d_id', ('{book0.pk}', '{book1.pk}')),
+    ),
+)
+def test_listing_equivalent_to_per_value_comparisons(
+    generate_books,
+    operator,
+    filter_name,
+    values,
+):
+    books = generate_books(3)
+    books[0].title = 't0'
+    books[0].blog_rating = Book.HIGH_RATING
+    books[0].save()
+    pages = [Page.objects.create(book=books[0]), Page.objects.create(book=books[1])]
+
+    query = '{0}({1},({2}))'.format(
+        operator,
+        filter_name,
+        ','.join(v.format(book0=books[0], book1=books[1], page0=pages[0], page1=pages[1]) for v in values),
+    )
+    _, qs = BooksFilterClass(book_qs).apply_filters(query)
+    _, expected_qs = PerValueListingBooksFilterClass(book_qs).apply_filters(query)
+
+    assert list(qs) == list(expected_qs)
+    assert list(qs.values_list('id', flat=True).distinct().order_by('id')) == list(
+        expected_qs.values_list('id', flat=True).distinct().order_by('id'),
+    )
+
+
+@pytest.mark.django_db
+def test_listing_uses_in_lookup():
+    _, qs = BooksFilterClass(book_qs).apply_filters('in(id,(1,2,3))')
+    assert ' IN (1, 2, 3)' in str(qs.query)
+
+    _, qs = BooksFilterClass(book_qs).apply_filters('out(title,(a,b,null()))')
+    assert 'IN (a, b)' in str(qs.query)
+    assert 'IS NULL' in str(qs.query)
+
+    _, qs = BooksFilterClass(book_qs).apply_filters('in(d_id,(1,2))')
+    assert ' IN (' not in str(qs.query)
+
+
+@pytest.mark.parametrize(
+    'query,error',
+    (
+        ('in(page.number,(1,2))', RQLFilterLookupError),
+        ('in(id,(1,abc))', RQLFilterValueError),
+        ('in(status,(planning,unknown))', RQLFilterValueError),
+    ),
+)
+def test_listing_errors_equivalent_to_per_value_comparisons(query, error):
+    for filter_cls in (BooksFilterClass, PerValueListingBooksFilterClass):
+        with pytest.raises(error) as e:
+            filter_cls(book_qs).apply_filters(query)
+
+        assert e.value.details
+
+
+@pytest.mark.django_db
+def test_listing_sets_distinct():
+    _, qs = BooksFilterClass(book_qs).apply_filters('in(status,(planning,writing))')
+    assert qs.query.distinct
+
+
 @pytest.mark.django_db
 def test_non_select_for_select_field():
     with pytest.raises(RQLFilterLookupError):
@@ -370,6 +486,255 @@ def test_too_much_ordering_filters():
     assert e.value.details['error'] == 'Bad ordering filter: max allowed number is 5.'
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query',
+    (
+        'and(ge(id,2),le(id,4))&ordering(-d_id)',
+        'or(and(ge(id,2),le(id,3)),and(ge(id,2),le(id,3)),eq(id,5))',
+        'and(and(and(ne(id,1),ne(id,2)),ne(id,2)),not(eq(id,3)))',
+        'and(or(or(eq(id,1),eq(id,2)),eq(id,4)),select(author))',
+        'author=t(email=author1@example.com,ge(id,1),le(id,3))',
+        'ge(published.at,2020-01-01T10:00:00Z)&le(published.at,2020-01-01T10:00:00Z)',
+        'ge(id,3)&le(id,2)',
+        'in(id,(1,2,2))&out(id,(3,3))',
+    ),
+)
+def test_simplified_q_filtering_equivalence(generate_books, query):
+    class NotSimplifiedBooksFilterClass(BooksFilterClass):
+        SIMPLIFY_Q = False
+
+    generate_books(6)
+    queryset = Book.objects.order_by('id')
+
+    _, qs = BooksFilterClass(queryset).apply_filters(query)
+    _, expected_qs = NotSimplifiedBooksFilterClass(queryset).apply_filters(query)
+
+    assert list(qs) == list(expected_qs)
+
+
+class PagesFilterClass(RQLFilterClass):
+    MODEL = Book
+    FILTERS = (
+        'id',
+        {
+            'namespace': 'page',
+            'source': 'pages',
+            'filters': ('number',),
+        },
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query',
+    (
+        'ne(page,t(ge(number,1),le(number,5)))',
+        'not(page=t(ge(number,1),le(number,5)))',
+        'or(eq(id,0),not(page=t(ge(number,1),le(number,5))))',
+        'not(page=t(ge(number,1),le(number,5),ne(number,3)))',
+        'and(ge(page.number,1),le(page.number,5))',
+        'page=t(ge(number,1),le(number,5))',
+    ),
+)
+def test_simplified_q_to_many_filtering_equivalence(query):
+    class NotSimplifiedPagesFilterClass(PagesFilterClass):
+        SIMPLIFY_Q = False
+
+    books = [Book.objects.create() for _ in range(3)]
+    Page.objects.create(book=books[0], number=0)
+    Page.objects.create(book=books[0], number=10)
+    Page.objects.create(book=books[1], number=3)
+
+    queryset = Book.objects.order_by('id')
+    _, qs = PagesFilterClass(queryset).apply_filters(query)
+    _, expected_qs = NotSimplifiedPagesFilterClass(queryset).apply_filters(query)
+
+    assert list(qs.distinct()) == list(expected_qs.distinct())
+
+
+@pytest.mark.django_db
+def test_simplified_q_with_range():
+    _, qs = BooksFilterClass(Book.objects.all()).apply_filters('ge(id,2)&le(id,4)')
+
+    assert ' BETWEEN 2 AND 4' in str(qs.query)
+
+
+@pytest.mark.parametrize(
+    'query,expected_q,filtered_props',
+    (
+        ('unknown=1', Q(), set()),
+        ('title=abc&unknown=1&limit=10', Q(title__exact='abc'), {'title'}),
+        ('or(title=abc,unknown=1)', Q(title__exact='abc'), {'title'}),
+        ('not(unknown=1)&in(unknown,(1,2))&like(unknown,a*)', Q(), set()),
+        ('author=t(email=a,unknown=1)', Q(author__email__exact='a'), {'author.email'}),
+        ('in(author,(t(unknown=1)))', Q(), {'author'}),
+    ),
+)
+def test_unknown_filters_are_skipped(query, expected_q, filtered_props):
+    plan = BooksFilterClass(book_qs).build_query_plan(query)
+
+    assert plan.q == expected_q
+    assert plan.filtered_props == filtered_props
+
+
+def test_unknown_filters_with_custom_q_building():
+    class CustomBooksFilterClass(BooksFilterClass):
+        def build_q_for_filter(self, data):
+            if data.filter_name == 'unknown':
+                return Q(id=1)
+
+            return super().build_q_for_filter(data)
+
+    plan = CustomBooksFilterClass(book_qs).build_query_plan('unknown=1')
+
+    assert plan.q == Q(id=1)
+    assert plan.filtered_props == {'unknown'}
+
+
+class StrictBooksFilterClass(BooksFilterClass):
+    IGNORE_UNKNOWN_FILTERS = False
+
+
+@pytest.mark.parametrize(
+    'query,error',
+    (
+        ('unknown=1', 'Unknown filters: unknown.'),
+        (
+            'and(x=1,or(title=a,y=1),in(z,(1,2)),not(ilike(author.x,a)))',
+            'Unknown filters: author.x, x, y, z.',
+        ),
+        ('author=t(email=a,x=1)&in(page,(t(y=1)))', 'Unknown filters: author.x, page.y.'),
+    ),
+)
+def test_unknown_filters_error(query, error):
+    with pytest.raises(RQLFilterParsingError) as e:
+        StrictBooksFilterClass(book_qs).apply_filters(query)
+
+    assert e.value.details['error'] == error
+
+
+@pytest.mark.parametrize(
+    'query',
+    ('title=abc', 'search=abc&limit=10&offset=20', 'author=t(email=a)&ordering(-d_id)'),
+)
+def test_unknown_filters_error_for_known_filters(query):
+    StrictBooksFilterClass(book_qs).apply_filters(query)
+
+
+class LimitedBooksFilterClass(BooksFilterClass):
+    MAX_NODES_IN_QUERY = 6
+    MAX_NESTING_DEPTH_IN_QUERY = 2
+    MAX_LIST_LENGTH_IN_QUERY = 3
+    MAX_NAMESPACES_IN_QUERY = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query',
+    (
+        'and(eq(id,1),or(eq(id,2),eq(id,3)))',
+        'not(eq(id,1))&in(id,(1,2,3))',
+        'author.email=a&author.publisher.id=1&ordering(author.email)',
+        'author=t(publisher=t(id=1))',
+        'eq(id,1),eq(id,2),eq(id,3),eq(id,4),eq(id,5)',
+        'search=x',
+    ),
+)
+def test_query_complexity_within_limits(query):
+    LimitedBooksFilterClass(book_qs).apply_filters(query)
+
+
+@pytest.mark.parametrize(
+    'query,error',
+    (
+        (
+            'eq(id,1),eq(id,2),eq(id,3),eq(id,4),eq(id,5),eq(id,6)',
+            'Query is too complex: max allowed number of nodes is 6.',
+        ),
+        (
+            'and(eq(id,1),or(eq(id,2),and(eq(id,3),eq(id,4))))',
+            'Query is too complex: max allowed nesting depth is 2.',
+        ),
+        (
+            'and(eq(id,1),or(eq(id,2),not(eq(id,3))))&title=x',
+            'Query is too complex: max allowed nesting depth is 2.',
+        ),
+        (
+            'author=t(publisher=t(fk1=t(id=1)))',
+            'Query is too complex: max allowed nesting depth is 2.',
+        ),
+        (
+            'in(id,(1,2,3,4))',
+            'Query is too complex: max allowed number of list values is 3.',
+        ),
+        (
+            'out(author,(t(email=a),t(email=b),t(email=c),t(email=d)))',
+            'Query is too complex: max allowed number of list values is 3.',
+        ),
+        (
+            'author.email=a&author.publisher.id=1&page.number=1',
+            'Query is too complex: max allowed number of namespaces is 2.',
+        ),
+        (
+            'author.publisher.id=1&page=t(number=1)',
+            'Query is too complex: max allowed number of namespaces is 2.',
+        ),
+        (
+            'ordering(author.email,page.number,author.publisher.id)',
+            'Query is too complex: max allowed number of namespaces is 2.',
+        ),
+    ),
+)
+def test_query_complexity_limits(query, error):
+    with pytest.raises(RQLFilterParsingError) as e:
+        LimitedBooksFilterClass(book_qs).apply_filters(query)
+
+    assert e.value.details['error'] == error
+
+
+@pytest.mark.parametrize(
+    'transformer_cls',
+    (RQLToDjangoORMTransformer, RQLToDjangoORMIterativeTransformer),
+)
+@pytest.mark.parametrize(
+    'query,error',
+    (
+        (
+            'x=1,x=2,x=3,x=4,x=5,x=6',
+            'Query is too complex: max allowed number of nodes is 6.',
+        ),
+        (
+            'x=t(y=t(z=t(w=1)))',
+            'Query is too complex: max allowed nesting depth is 2.',
+        ),
+        (
+            'in(x,(1,2,3,4))',
+            'Query is too complex: max allowed number of list values is 3.',
+        ),
+        (
+            'x.y.z=1&like(w.v,a)',
+            'Query is too complex: max allowed number of namespaces is 2.',
+        ),
+    ),
+)
+def test_query_complexity_limits_for_unknown_filters(transformer_cls, query, error):
+    class CustomCls(LimitedBooksFilterClass):
+        TRANSFORMER_CLS = transformer_cls
+
+    assert CustomCls.IGNORE_UNKNOWN_FILTERS
+    with pytest.raises(RQLFilterParsingError) as e:
+        CustomCls(book_qs).apply_filters(query)
+
+    assert e.value.details['error'] == error
+
+
+def test_query_complexity_not_limited_by_default():
+    query = 'and({0})'.format(','.join('in(id,({0},{1}))'.format(i, i + 1) for i in range(200)))
+    _, qs = BooksFilterClass(book_qs).apply_filters(query)
+    assert qs.query.where
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'perms, q',
@@ -411,6 +776,39 @@ def test_search():
     assert apply_filters('search=""') == books
 
 
+class PerFilterSearchFilterClass(BooksFilterClass):
+    EXTENDED_SEARCH_ORM_ROUTES = ('author__name',)
+
+    def build_q_for_filter(self, data):
+        return super().build_q_for_filter(data)
+
+
+@pytest.mark.parametrize(
+    'query',
+    ('search=book', 'search=b*k', 'search="*a.b*"', 'search=\\*', 'search=*'),
+)
+def test_search_lookup_and_value_are_shared(query):
+    class SharedSearchFilterClass(BooksFilterClass):
+        EXTENDED_SEARCH_ORM_ROUTES = ('author__name',)
+
+    instance = SharedSearchFilterClass(book_qs)
+    per_filter_instance = PerFilterSearchFilterClass(book_qs)
+
+    plan = instance.build_query_plan(query)
+    per_filter_plan = per_filter_instance.build_query_plan(query)
+    assert plan.q == per_filter_plan.q
+    assert plan.is_distinct == per_filter_plan.is_distinct
+
+
+@pytest.mark.parametrize('filter_cls', (BooksFilterClass, PerFilterSearchFilterClass))
+def test_search_bad_value(filter_cls):
+    with pytest.raises(RQLFilterValueError) as e:
+        filter_cls(book_qs).build_query_plan('search=a**b')
+
+    assert e.value.details['lookup'] == FilterLookups.I_LIKE
+    assert e.value.details['value'] == '*a**b*'
+
+
 def test_search_bad_lookup():
     with pytest.raises(RQLFilterParsingError) as e:
         apply_filters('search=ge=*a*')
@@ -441,6 +839,59 @@ def test_custom_filter_list_lookup_fail(operator):
     assert e.value.details['lookup'] == operator
 
 
+@pytest.mark.django_db
+def test_custom_filter_legacy_state_attributes():
+    class CustomCls(BooksFilterClass):
+        def build_q_for_custom_filter(self, data):
+            assert (self._request, self._view) == ('request', 'view')
+            assert isinstance(self._applied_annotations, set)
+
+            self._is_distinct = True
+            return Q(pages__number=1)
+
+    books = [Book.objects.create() for _ in range(2)]
+    Page.objects.create(book=books[0], number=1)
+    Page.objects.create(book=books[0], number=1)
+
+    _, qs = CustomCls(book_qs).apply_filters('has_list_lookup=1', 'request', 'view')
+
+    assert qs.query.distinct
+    assert list(qs) == [books[0]]
+
+
+@pytest.mark.parametrize('query', ('ne(title,abc)', 'in(title,(a,b))', 'like(title,a*)'))
+def test_overridden_filter_base_item(query):
+    class CustomCls(BooksFilterClass):
+        def get_filter_base_item(self, filter_name):
+            base_item = super().get_filter_base_item(filter_name)
+            if filter_name == 'title':
+                return dict(base_item, lookups={FilterLookups.EQ})
+
+            return base_item
+
+    instance = CustomCls(book_qs)
+    assert instance.build_query_plan('title=abc').q == Q(title__exact='abc')
+
+    with pytest.raises(RQLFilterLookupError):
+        instance.build_query_plan(query)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('github_stars=1', 'in(github_stars,(1,5))'))
+def test_overridden_value_conversion(query):
+    class CustomCls(BooksFilterClass):
+        @classmethod
+        def _convert_value(cls, django_field, str_value, use_repr=False):
+            value = super()._convert_value(django_field, str_value, use_repr=use_repr)
+            return value + 1 if isinstance(value, int) else value
+
+    books = [Book.objects.create(github_stars=stars) for stars in (1, 2)]
+
+    _, qs = CustomCls(book_qs).apply_filters(query)
+
+    assert list(qs) == [books[1]]
+
+
 @pytest.mark.django_db
 def test_custom_filter_ordering(generate_books):
     class CustomCls(BooksFilterClass):
@@ -689,3 +1140,179 @@ def test_distinct_on_field_field_in_ordering():
 def test_distinct_on_field_field_not_in_ordering():
     _, qs = BooksFilterClass(book_qs).apply_filters('ordering(int_choice_field)')
     assert not qs.query.distinct
+
+
+class SubqueryFilterClass(RQLFilterClass):
+    MODEL = Book
+    FILTERS = (
+        'id',
+        {
+            'namespace': 'page',
+            'source': 'pages',
+            'distinct': True,
+            'subquery': True,
+            'filters': (
+                'number',
+                {
+                    'filter': 'id',
+                    'source': 'uuid',
+                    'subquery': False,
+                },
+            ),
+        },
+        {
+            'filter': 'page_number',
+            'sources': ('pages__number', 'author__books__pages__number'),
+            'distinct': True,
+            'subquery': True,
+        },
+    )
+
+
+class JoinFilterClass(SubqueryFilterClass):
+    FILTERS = (
+        'id',
+        {
+            'namespace': 'page',
+            'source': 'pages',
+            'distinct': True,
+            'filters': (
+                {
+                    'filter': 'number',
+                },
+            ),
+        },
+        {
+            'filter': 'page_number',
+            'sources': ('pages__number', 'author__books__pages__number'),
+            'distinct': True,
+        },
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query',
+    (
+        'page.number=1',
+        'ne(page.number,1)',
+        'page.number=null()',
+        'ne(page.number,null())',
+        'in(page.number,(1,2))',
+        'out(page.number,(1,null()))',
+        'or(page.number=2,id=1)',
+        'not(page.number=ge=2)',
+        'page_number=2',
+        'ne(page_number,2)',
+    ),
+)
+def test_subquery_filtering(query):
+    authors = [Author.objects.create() for _ in range(2)]
+    books = [Book.objects.create(author=authors[index % 2]) for index in range(5)]
+    for book, numbers in zip(books, ((1, 2), (1, 1), (None, 3), (), (2,))):
+        for number in numbers:
+            Page.objects.create(book=book, number=number)
+
+    _, qs = SubqueryFilterClass(Book.objects.order_by('id')).apply_filters(query)
+    _, expected_qs = JoinFilterClass(Book.objects.order_by('id')).apply_filters(query)
+
+    assert not qs.query.distinct
+    assert expected_qs.query.distinct
+    assert list(qs) == list(expected_qs)
+
+
+def test_subquery_filter_has_no_joins():
+    _, qs = SubqueryFilterClass(book_qs).apply_filters('page.number=1&page_number=1')
+    sql = str(qs.query)
+
+    assert not qs.query.distinct
+    assert sql.count('EXISTS') == 2
+    assert 'JOIN' not in sql.split('EXISTS')[0]
+
+
+def test_subquery_redefined_in_namespace():
+    _, qs = SubqueryFilterClass(book_qs).apply_filters(
+        'page.id=a3bf04fd-2d44-4a9c-ad5a-f8f77b8e3d47',
+    )
+
+    assert qs.query.distinct
+    assert 'EXISTS' not in str(qs.query)
+
+
+class SearchIndexFilterClass(RQLFilterClass):
+    MODEL = Book
+    DECOMPOSE_SEARCH_PATTERNS = True
+    EXTENDED_SEARCH_ORM_ROUTES = ('author__email',)
+    FILTERS = (
+        {
+            'filter': 'title',
+            'search': True,
+        },
+        {
+            'filter': 'trigram_title',
+            'source': 'title',
+            'search_index': SearchIndexes.TRIGRAM,
+        },
+        {
+            'filter': 'folded_title',
+            'source': 'title',
+            'search_index': SearchIndexes.CASE_FOLDED,
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    'query,expected_q',
+    (
+        ('like(title,ab*c*d)', Q(title__startswith='ab') & Q(title__regex='^ab(.*)c(.*)d$')),
+        ('ilike(title,*a*bcd*e)', Q(title__icontains='bcd') & Q(title__iregex='a(.*)bcd(.*)e$')),
+        ('like(title,*)', Q(title__regex='(.*)')),
+        ('like(title,*ab*)', Q(title__contains='ab')),
+        (
+            'ilike(trigram_title,a*b*)',
+            Q(title__rql_trigram_istartswith='a') & Q(title__iregex='^a(.*)b'),
+        ),
+        ('like(trigram_title,a*b*)', Q(title__startswith='a') & Q(title__regex='^a(.*)b')),
+        (
+            'ilike(folded_title,*AB*c)',
+            Q(title__rql_casefold__contains='ab') & Q(title__iregex='AB(.*)c$'),
+        ),
+        ('ilike(trigram_title,AB)', Q(title__rql_trigram_iexact='AB')),
+        ('ilike(folded_title,*AB)', Q(title__rql_casefold__endswith='ab')),
+        (
+            'search=a*b',
+            (Q(author__email__icontains='a') & Q(author__email__iregex='a(.*)b'))
+            | (Q(title__icontains='a') & Q(title__iregex='a(.*)b')),
+        ),
+    ),
+)
+def test_search_patterns_and_indexes(query, expected_q):
+    plan = SearchIndexFilterClass(book_qs).build_query_plan(query)
+    assert plan.q == expected_q
+
+
+def test_search_patterns_not_decomposed_by_default():
+    class Cls(SearchIndexFilterClass):
+        DECOMPOSE_SEARCH_PATTERNS = False
+
+    plan = Cls(book_qs).build_query_plan('like(title,ab*c*d)')
+    assert plan.q == Q(title__regex='^ab(.*)c(.*)d$')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('filter_name', ('title', 'trigram_title', 'folded_title'))
+@pytest.mark.parametrize(
+    'value',
+    ('a*B*c', '*b*c*', 'AB*', '*bc', '*c\\**', 'aBc', 'abc', '*_*', '"*%*"'),
+)
+def test_search_patterns_and_indexes_filtering(filter_name, value):
+    titles = ('aBc', 'xabcy', 'ab', 'c*d', 'a%_c', 'ABC', None)
+    books = [Book.objects.create(title=title) for title in titles]
+
+    _, qs = SearchIndexFilterClass(book_qs).apply_filters(
+        'ilike({0},{1})'.format(filter_name, value),
+    )
+    _, expected_qs = BooksFilterClass(book_qs).apply_filters('ilike(title,{0})'.format(value))
+
+    assert books
+    assert list(qs.order_by('id')) == list(expected_qs.order_by('id'))
@@ -2,10 +2,15 @@
 #  Copyright © 2023 Ingram Micro Inc. All rights reserved.
 #
 
+import pickle
+from copy import copy
+
 import pytest
 from django.core.exceptions import FieldDoesNotExist
+from django.db.models import IntegerField
 from py_rql.constants import RESERVED_FILTER_NAMES, RQL_NULL, FilterLookups as FL
 
+from dj_rql.constants import FilterTypes, SearchIndexes
 from dj_rql.filter_cls import AutoRQLFilterClass, NestedAutoRQLFilterClass, RQLFilterClass
 from dj_rql.utils import assert_filter_cls
 from tests.data import get_book_filter_cls_ordering_data, get_book_filter_cls_search_data
@@ -151,6 +156,24 @@ def test_wrong_ordering_length_setup(v):
     assert str(e.value) == 'Max ordering length must be integer.'
 
 
+@pytest.mark.parametrize(
+    'limit_name',
+    (
+        'MAX_NODES_IN_QUERY',
+        'MAX_NESTING_DEPTH_IN_QUERY',
+        'MAX_LIST_LENGTH_IN_QUERY',
+        'MAX_NAMESPACES_IN_QUERY',
+    ),
+)
+@pytest.mark.parametrize('v', ('5', 0, -1, 1.23))
+def test_wrong_query_complexity_limit_setup(limit_name, v):
+    Cls = type('Cls', (BooksFilterClass,), {limit_name: v})
+
+    with pytest.raises(AssertionError) as e:
+        Cls(empty_qs)
+    assert str(e.value) == '{0} must be a positive integer or None.'.format(limit_name)
+
+
 @pytest.mark.parametrize(
     'v',
     (
@@ -349,6 +372,23 @@ def test_dynamic_field_not_set():
     assert str(e.value) == "title: dynamic filters must have 'field' set."
 
 
+def test_dynamic_field_in_subquery():
+    class Cls(RQLFilterClass):
+        MODEL = Book
+        FILTERS = [
+            {
+                'filter': 'title',
+                'dynamic': True,
+                'field': IntegerField(),
+                'subquery': True,
+            },
+        ]
+
+    with pytest.raises(AssertionError) as e:
+        Cls(empty_qs)
+    assert str(e.value) == "title: dynamic filters can't be checked in subquery."
+
+
 def test_bad_dynamic_set():
     class Cls(RQLFilterClass):
         MODEL = Book
@@ -385,6 +425,60 @@ def test_bad_search():
     assert str(e.value) == "id: 'search' can be applied only to text filters."
 
 
+@pytest.mark.parametrize(
+    'filter_item,error',
+    (
+        (
+            {'filter': 'title', 'search_index': 'gin'},
+            "title: 'search_index' must be one of: case_folded, trigram.",
+        ),
+        (
+            {'filter': 'id', 'search_index': SearchIndexes.TRIGRAM},
+            "id: 'search_index' can be applied only to text filters.",
+        ),
+    ),
+)
+def test_bad_search_index(filter_item, error):
+    class Cls(RQLFilterClass):
+        MODEL = Book
+        FILTERS = [filter_item]
+
+    with pytest.raises(AssertionError) as e:
+        Cls(empty_qs)
+    assert str(e.value) == error
+
+
+@pytest.mark.parametrize(
+    'filter_item,error',
+    (
+        (
+            {'filter': 'title', 'search': True, 'search_weight': 0},
+            "title: 'search_weight' must be a positive number.",
+        ),
+        (
+            {'filter': 'title', 'search': True, 'search_weight': '2'},
+            "title: 'search_weight' must be a positive number.",
+        ),
+        (
+            {'filter': 'title', 'search': True, 'search_weight': True},
+            "title: 'search_weight' must be a positive number.",
+        ),
+        (
+            {'filter': 'title', 'search_weight': 2},
+            "title: 'search_weight' can be set only for search filters.",
+        ),
+    ),
+)
+def test_bad_search_weight(filter_item, error):
+    class Cls(RQLFilterClass):
+        MODEL = Book
+        FILTERS = [filter_item]
+
+    with pytest.raises(AssertionError) as e:
+        Cls(empty_qs)
+    assert str(e.value) == error
+
+
 def test_get_field():
     class Cls(RQLFilterClass):
         MODEL = Book
@@ -632,3 +726,84 @@ def test_nested_auto_building_filters_depth_3_described_and_exclusions():
         'self.self.self.id',
     }.issubset(filter_set)
     assert {'parent.parent.id', 'related1.id', 'common_int'}.isdisjoint(filter_set)
+
+
+def test_schema_shared_between_instances():
+    instance = BooksFilterClass(Book.objects.none())
+    other = BooksFilterClass(Book.objects.none(), instance=instance)
+
+    assert other._schema is instance._schema
+    assert other.filters is instance.filters
+    assert other._context is not instance._context
+
+
+def test_schema_is_immutable():
+    instance = BooksFilterClass(Book.objects.none())
+    schema = instance._schema
+
+    with pytest.raises(AttributeError):
+        schema.filters = {}
+
+    with pytest.raises(TypeError):
+        instance.filters['new'] = {}
+
+    with pytest.raises(TypeError):
+        instance.filters['title']['orm_route'] = 'id'
+
+    with pytest.raises(AttributeError):
+        instance.filters['title']['lookups'].add(FL.LIKE)
+
+    with pytest.raises(AttributeError):
+        instance.ordering_filters.add('title')
+
+    assert instance.filters['title']['null_values'] == {RQL_NULL, 'NULL_ID'}
+
+
+def test_schema_frozen_containers_are_copyable():
+    filters = BooksFilterClass(Book.objects.none()).filters
+
+    item = copy(filters['title'])
+    item['oa'] = {}
+    assert 'oa' not in filters['title']
+
+    assert pickle.loads(pickle.dumps(filters['title'])) == filters['title']
+
+
+@pytest.mark.django_db
+def test_execution_context_not_shared():
+    instance = BooksFilterClass(Book.objects.none())
+    distinct_instance = BooksFilterClass(Book.objects.all(), instance=instance)
+    common_instance = BooksFilterClass(Book.objects.all(), instance=instance)
+
+    _, distinct_qs = distinct_instance.apply_filters('status=planning')
+    _, common_qs = common_instance.apply_filters('title=abc')
+
+    assert distinct_qs.query.distinct
+    assert not common_qs.query.distinct
+    assert distinct_instance._context.request is None
+
+
+def test_filter_descriptors():
+    instance = BooksFilterClass(Book.objects.none())
+    descriptors = instance.descriptors
+
+    assert set(descriptors.keys()) == set(instance.filters.keys())
+
+    title = descriptors['title']
+    assert title.items == (instance.filters['title'],)
+    assert not title.multiple
+    assert title.filter_type == FilterTypes.STRING
+    assert title.lookups == FL.string()
+    assert title.null_values == {RQL_NULL, 'NULL_ID'}
+    assert title.converter('"abc"') == 'abc'
+
+    assert descriptors['d_id'].multiple
+    assert len(descriptors['d_id'].items) == 2
+    assert descriptors['status'].distinct
+    assert descriptors['rating.blog'].use_repr
+    assert descriptors['published.at'].filter_type == FilterTypes.DATETIME
+    assert descriptors['custom_filter'].custom
+    assert descriptors['custom_filter'].converter is None
+
+    with pytest.raises(AttributeError):
+        title.lookups = frozenset()
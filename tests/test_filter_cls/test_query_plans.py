@@ -0,0 +1,210 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from cachetools import LRUCache
+from django.core.cache import caches
+from django.db.models import Q
+
+from dj_rql._dataclasses import QueryPlan
+from dj_rql.cache import DjangoCacheBackend
+from dj_rql.filter_cls import _QueryPlansCache
+from tests.dj_rf.filters import BooksFilterClass, SelectBooksFilterClass
+from tests.dj_rf.models import Author, Book
+from tests.test_filter_cls.utils import book_qs
+
+
+class PlansCachedFilterClass(BooksFilterClass):
+    QUERY_PLANS_CACHE_BACKEND = LRUCache
+    QUERY_PLANS_CACHE_SIZE = 10
+
+
+@pytest.fixture
+def clear_plans_cache():
+    _QueryPlansCache.clear()
+    yield
+    _QueryPlansCache.clear()
+
+
+def test_build_query_plan():
+    plan = BooksFilterClass(book_qs).build_query_plan(
+        'and(title=abc,status=planning)&ordering(-published.at)&select(author)',
+    )
+
+    assert isinstance(plan, QueryPlan)
+    assert plan.rql_ast is not None
+    assert plan.q == Q(title__exact='abc') & Q(status__exact='planning') & Q()
+    assert plan.filtered_props == frozenset({'title', 'status', 'published.at', 'author'})
+    assert plan.ordering_fields == ('-published_at',)
+    assert plan.is_distinct
+    assert plan.select_data is None
+
+
+def test_build_empty_query_plan():
+    plan = SelectBooksFilterClass(book_qs).build_query_plan('')
+
+    assert plan.rql_ast is None
+    assert plan.q is None
+    assert not plan.is_distinct
+    assert plan.select_data == {
+        'amazon_rating': False,
+        'author': False,
+        'status': False,
+        'select_author': False,
+    }
+
+
+@pytest.mark.django_db
+def test_plan_is_applied_to_different_querysets():
+    authors = [Author.objects.create(name='a1'), Author.objects.create(name='a2')]
+    books = [
+        Book.objects.create(title='abc', author=authors[0]),
+        Book.objects.create(title='abc', author=authors[1]),
+        Book.objects.create(title='def', author=authors[0]),
+    ]
+
+    instance = BooksFilterClass(book_qs)
+    plan = instance.build_query_plan('title=abc&ordering(-d_id)')
+
+    qs = instance.apply_query_plan(plan, book_qs.filter(author=authors[0]))
+    assert list(qs) == [books[0]]
+
+    qs = instance.apply_query_plan(plan, book_qs.filter(author=authors[1]))
+    assert list(qs) == [books[1]]
+
+    assert list(instance.apply_query_plan(plan)) == [books[1], books[0]]
+
+
+@pytest.mark.django_db
+def test_plans_cache(clear_plans_cache, mocker):
+    book = Book.objects.create(title='abc')
+    build_spy = mocker.spy(PlansCachedFilterClass, 'build_query_plan')
+
+    for _ in range(3):
+        _, qs = PlansCachedFilterClass(book_qs).apply_filters('title=abc')
+        assert list(qs) == [book]
+
+        _, qs = PlansCachedFilterClass(book_qs).apply_filters('title=def')
+        assert list(qs) == []
+
+    assert build_spy.call_count == 2
+
+    cache = _QueryPlansCache.CACHE[
+        'tests.test_filter_cls.test_query_plans.PlansCachedFilterClass'
+    ]
+    assert cache.currsize == 2
+    assert cache.maxsize == 10
+
+
+@pytest.mark.django_db
+def test_plans_cache_is_not_used_by_default(clear_plans_cache, mocker):
+    build_spy = mocker.spy(BooksFilterClass, 'build_query_plan')
+
+    for _ in range(2):
+        BooksFilterClass(book_qs).apply_filters('title=abc')
+
+    assert build_spy.call_count == 2
+    assert _QueryPlansCache.CACHE == {}
+
+
+@pytest.mark.django_db
+def test_cached_plan_keeps_distinct(clear_plans_cache):
+    for _ in range(2):
+        _, qs = PlansCachedFilterClass(book_qs).apply_filters('status=planning')
+        assert qs.query.distinct
+
+        _, qs = PlansCachedFilterClass(book_qs).apply_filters('title=abc')
+        assert not qs.query.distinct
+
+
+class SharedPlansCache(DjangoCacheBackend):
+    CACHE_ALIAS = 'rql'
+
+
+class SharedPlansFilterClass(BooksFilterClass):
+    QUERY_PLANS_CACHE_BACKEND = SharedPlansCache
+
+
+@pytest.fixture(params=['locmem', 'filebased'])
+def rql_django_cache(request, settings, tmp_path):
+    backend = {
+        'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'filebased': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        },
+    }[request.param]
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'rql': backend,
+    }
+    yield caches['rql']
+    caches['rql'].clear()
+
+
+@pytest.mark.django_db
+def test_shared_plans_cache(clear_plans_cache, rql_django_cache, mocker):
+    books = [Book.objects.create(title='abc'), Book.objects.create(title='abc')]
+    query = 'and(title=abc,status=planning)&ordering(-d_id)'
+
+    _, qs = SharedPlansFilterClass(book_qs).apply_filters(query)
+    assert list(qs) == [books[1], books[0]]
+
+    # Simulation of another process
+    _QueryPlansCache.clear()
+    build_spy = mocker.spy(SharedPlansFilterClass, 'build_query_plan')
+
+    rql_ast, qs = SharedPlansFilterClass(book_qs).apply_filters(query)
+    assert list(qs) == [books[1], books[0]]
+    assert qs.query.distinct
+    assert rql_ast is not None
+    assert build_spy.call_count == 0
+
+
+@pytest.mark.django_db
+def test_shared_plans_cache_versioning(clear_plans_cache, rql_django_cache, mocker):
+    query = 'title=abc'
+    SharedPlansFilterClass(book_qs).apply_filters(query)
+
+    class SharedPlansFilterClass2(BooksFilterClass):
+        QUERY_PLANS_CACHE_BACKEND = SharedPlansCache
+        FILTERS = ['title']
+
+    SharedPlansFilterClass2.__name__ = SharedPlansFilterClass.__name__
+    _QueryPlansCache.clear()
+    build_spy = mocker.spy(SharedPlansFilterClass2, 'build_query_plan')
+
+    SharedPlansFilterClass2(book_qs).apply_filters(query)
+    SharedPlansFilterClass2(book_qs).apply_filters(query)
+    assert build_spy.call_count == 1
+
+
+@pytest.mark.django_db
+def test_shared_plans_cache_is_unavailable(clear_plans_cache, rql_django_cache, mocker):
+    mocker.patch.object(rql_django_cache, 'get', side_effect=ConnectionError)
+    mocker.patch.object(rql_django_cache, 'set', side_effect=ConnectionError)
+    build_spy = mocker.spy(SharedPlansFilterClass, 'build_query_plan')
+    book = Book.objects.create(title='abc')
+
+    _, qs = SharedPlansFilterClass(book_qs).apply_filters('title=abc')
+
+    assert list(qs) == [book]
+    assert build_spy.call_count == 1
+
+
+def test_query_plans_version_is_stable(clear_plans_cache):
+    version = SharedPlansFilterClass(book_qs)._get_query_plans_version()
+    _QueryPlansCache.clear()
+
+    assert SharedPlansFilterClass(book_qs)._get_query_plans_version() == version
+    assert BooksFilterClass(book_qs)._get_query_plans_version() != version
+
+
+@pytest.mark.parametrize('module_path', ('dj_rql.__version__', 'django.VERSION'))
+def test_query_plans_version_depends_on_libraries(clear_plans_cache, mocker, module_path):
+    version = SharedPlansFilterClass(book_qs)._get_query_plans_version()
+    _QueryPlansCache.clear()
+    mocker.patch(module_path, 'upgraded')
+
+    assert SharedPlansFilterClass(book_qs)._get_query_plans_version() != version
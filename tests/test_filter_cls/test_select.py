@@ -4,7 +4,15 @@
 
 import pytest
 from django.core.exceptions import FieldError
-from django.db.models import CharField, IntegerField, Value
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    IntegerField,
+    QuerySet,
+    Sum,
+    Value,
+)
 from py_rql.exceptions import RQLFilterParsingError
 
 from dj_rql.fields import SelectField
@@ -17,7 +25,7 @@ from dj_rql.qs import (
     PR,
     SR,
 )
-from tests.dj_rf.models import Author, Book
+from tests.dj_rf.models import Author, Book, Page
 from tests.test_filter_cls.utils import book_qs
 
 
@@ -728,6 +736,195 @@ def test_qs_optimization_deep_various_nesting():
     )
 
 
+class CustomPrefetchRelated(PR):
+    def apply(self, queryset):
+        return super().apply(queryset).order_by()
+
+
+class OptimizationPlanCls(SelectFilterCls):
+    FILTERS = (
+        {
+            'filter': 'ft1',
+            'source': 'id',
+            'qs': CH(SR('author'), PR('pages')),
+        },
+        {
+            'filter': 'ft2',
+            'source': 'id',
+            'qs': CustomPrefetchRelated('author__books'),
+        },
+        {
+            'namespace': 'ns',
+            'source': 'author',
+            'qs': NSR('author'),
+            'filters': (
+                {
+                    'filter': 'ft1',
+                    'source': 'id',
+                    'qs': NSR('publisher'),
+                },
+                {
+                    'filter': 'ft2',
+                    'source': 'id',
+                    'qs': NPR('publisher'),
+                },
+                {
+                    'filter': 'ft3',
+                    'source': 'id',
+                    'qs': AN(ns_ft3=F('author__id')),
+                },
+            ),
+        },
+    )
+
+
+def test_optimization_plan():
+    instance = OptimizationPlanCls(book_qs)
+
+    plan = instance._get_optimization_plan(instance._build_select_data([]))
+    assert plan.annotated_filters == {'ns.ft3'}
+    assert plan.optimizations == (instance.select_tree['ft2']['qs'],)
+    assert plan.select_related == ('author', 'author__publisher')
+    assert plan.prefetch_related == ('pages', 'author__publisher')
+
+    plan = instance._get_optimization_plan(instance._build_select_data(['-ns', '-ft2']))
+    assert plan.annotated_filters == set()
+    assert plan.optimizations == ()
+    assert plan.select_related == ('author',)
+    assert plan.prefetch_related == ('pages',)
+
+    assert instance._get_optimization_plan(
+        instance._build_select_data(['-ns', '-ft1', '-ft2']),
+    ) == (frozenset(), (), (), ())
+
+
+def test_optimization_plan_is_cached_in_schema():
+    instance = OptimizationPlanCls(book_qs)
+    other = OptimizationPlanCls(book_qs, instance=instance)
+
+    plan = instance._get_optimization_plan({'ns': False})
+    assert other._get_optimization_plan({'ns': False}) is plan
+    assert other._get_optimization_plan({'ns': True}) is not plan
+    assert OptimizationPlanCls(book_qs)._get_optimization_plan({'ns': False}) is not plan
+
+
+@pytest.mark.django_db
+def test_optimization_plan_merges_calls(mocker):
+    select_related_spy = mocker.spy(QuerySet, 'select_related')
+    prefetch_related_spy = mocker.spy(QuerySet, 'prefetch_related')
+
+    _, qs = OptimizationPlanCls(Book.objects.all()).apply_filters('select(-ns.ft3)')
+
+    assert select_related_spy.call_count == 1
+    assert prefetch_related_spy.call_count == 2
+    assert qs.query.select_related == {'author': {'publisher': {}}}
+    assert qs._prefetch_related_lookups == ('author__books', 'pages', 'author__publisher')
+    assert not qs.query.annotations
+    assert not list(qs)
+
+
+def test_optimization_plan_not_used_with_custom_optimize_field(mocker):
+    class Cls(OptimizationPlanCls):
+        def optimize_field(self, data):
+            if data.filter_path == 'ns.ft1':
+                return data.queryset.select_related('author__publisher__fk1')
+
+    build_plan_spy = mocker.spy(Cls, '_build_optimization_plan')
+
+    _, qs = Cls(book_qs).apply_filters('select(-ft2,-ns.ft3)')
+
+    assert build_plan_spy.call_count == 0
+    assert qs.query.select_related == {'author': {'publisher': {'fk1': {}}}}
+    assert qs._prefetch_related_lookups == ('pages', 'author__publisher')
+
+
+class DeferredFieldsCls(SelectFilterCls):
+    DEFER_UNSELECTED_FIELDS = True
+    FILTERS = (
+        'id',
+        'title',
+        {
+            'filter': 'status',
+            'hidden': True,
+        },
+        {
+            'filter': 'rating',
+            'source': 'amazon_rating',
+        },
+        {
+            'filter': 'amazon_rating',
+            'hidden': True,
+        },
+        {
+            'filter': 'anno',
+            'dynamic': True,
+            'field': IntegerField(),
+            'qs': AN(anno=F('github_stars')),
+            'hidden': True,
+        },
+        {
+            'namespace': 'author',
+            'qs': NSR('author'),
+            'filters': (
+                'id',
+                'email',
+                'name',
+                {
+                    'namespace': 'publisher',
+                    'filters': ('id', 'name'),
+                },
+            ),
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    'query,deferred_fields',
+    (
+        ('', {'status'}),
+        ('select(status)', set()),
+        ('select(-title,-author.email)', {'status', 'title', 'author__email'}),
+        ('select(-rating)', {'status', 'amazon_rating'}),
+        ('select(-author)', {'status'}),
+        ('select(-author.publisher,-id)', {'status'}),
+    ),
+)
+def test_deferred_fields(query, deferred_fields):
+    _, qs = DeferredFieldsCls(book_qs).apply_filters(query)
+
+    assert qs.query.deferred_loading == (deferred_fields, True)
+
+
+def test_deferred_fields_not_used_by_default():
+    class Cls(DeferredFieldsCls):
+        DEFER_UNSELECTED_FIELDS = False
+
+    _, qs = Cls(book_qs).apply_filters('select(-title,-author.email)')
+
+    assert qs.query.deferred_loading == (frozenset(), True)
+
+
+def test_deferred_fields_are_cached_in_schema():
+    instance = DeferredFieldsCls(book_qs)
+    other = DeferredFieldsCls(book_qs, instance=instance)
+
+    deferred_fields = instance._get_deferred_fields({'title': False, 'author.name': False})
+    assert deferred_fields == ('author__name', 'title')
+    assert other._get_deferred_fields({'author.name': False, 'title': False}) is deferred_fields
+
+
+@pytest.mark.django_db
+def test_deferred_fields_are_loaded_on_access():
+    book = Book.objects.create(title='abc', status=Book.WRITING, author=Author.objects.create())
+
+    _, qs = DeferredFieldsCls(Book.objects.all()).apply_filters('select(-title)')
+    result = qs.get()
+
+    assert result.get_deferred_fields() == {'title', 'status'}
+    assert result.title == book.title
+    assert result.status == Book.WRITING
+
+
 @pytest.mark.django_db
 def test_annotations():
     class AnnotationCls(SelectFilterCls):
@@ -782,6 +979,171 @@ def test_annotations():
     assert not list(qs)
 
 
+class AnnotationPlanCls(SelectFilterCls):
+    FILTERS = (
+        {
+            'namespace': 'ns',
+            'source': 'author',
+            'qs': AN(ns=Value(1, IntegerField())),
+            'filters': (
+                {
+                    'filter': 'id',
+                    'ordering': True,
+                },
+                {
+                    'filter': 'ft',
+                    'source': 'id',
+                    'qs': AN(ns_ft=F('ns') + 1),
+                },
+            ),
+        },
+        {
+            'filter': 'ft1',
+            'dynamic': True,
+            'field': IntegerField(),
+            'qs': AN(ft1=Value(1, IntegerField()), ft1_extra=Value(2, IntegerField())),
+        },
+        {
+            'filter': 'ft2',
+            'dynamic': True,
+            'field': IntegerField(),
+            'qs': AN(ft1_extra=Value(3, IntegerField())),
+        },
+    )
+
+
+def test_annotations_plan():
+    instance = AnnotationPlanCls(book_qs)
+
+    plan = instance._get_annotations_plan({'ns.ft', 'ns.id', 'ft1', 'ft2', 'id'})
+    assert [set(step.annotation.extensions) for step in plan] == [
+        {'ft1', 'ft1_extra'},
+        {'ft1_extra', 'ns', 'ns_ft'},
+    ]
+    assert [len(step.sources) for step in plan] == [1, 3]
+    assert plan[0].annotation is instance.annotations['ft1'][0]
+    assert list(plan[1].annotation.extensions) == ['ft1_extra', 'ns', 'ns_ft']
+
+    assert instance._get_annotations_plan({'id'}) == ()
+
+
+def test_annotations_plan_is_cached_in_schema():
+    instance = AnnotationPlanCls(book_qs)
+    other = AnnotationPlanCls(book_qs, instance=instance)
+
+    plan = instance._get_annotations_plan({'ns.ft', 'ft1'})
+    assert other._get_annotations_plan(['ft1', 'ns.ft']) is plan
+    assert AnnotationPlanCls(book_qs)._get_annotations_plan({'ns.ft', 'ft1'}) is not plan
+
+
+@pytest.mark.django_db
+def test_annotations_plan_merges_annotate_calls(mocker):
+    annotate_spy = mocker.spy(QuerySet, 'annotate')
+
+    _, qs = AnnotationPlanCls(Book.objects.all()).apply_filters('ns.ft=2&ft1=1&select(-ft2)')
+
+    assert annotate_spy.call_count == 1
+    assert set(qs.query.annotations.keys()) == {'ns', 'ns_ft', 'ft1', 'ft1_extra'}
+    assert not list(qs)
+
+
+@pytest.mark.django_db
+def test_annotations_plan_partially_applied():
+    instance = AnnotationPlanCls(Book.objects.all())
+    instance._context.applied_annotations = set()
+
+    qs = instance.apply_annotations({'ns.id'})
+    qs = instance.apply_annotations({'ns.ft', 'ns.id'}, qs)
+
+    assert list(qs.query.annotations.keys()) == ['ns', 'ns_ft']
+
+
+def test_annotations_plan_with_custom_annotation():
+    class CustomAnnotation(AN):
+        def apply(self, queryset):
+            return super().apply(queryset).order_by()
+
+    class CustomAnnotationCls(AnnotationPlanCls):
+        FILTERS = AnnotationPlanCls.FILTERS + (
+            {
+                'filter': 'ft3',
+                'dynamic': True,
+                'field': IntegerField(),
+                'qs': CustomAnnotation(ft3=Value(1, IntegerField())),
+            },
+        )
+
+    instance = CustomAnnotationCls(book_qs)
+    plan = instance._get_annotations_plan({'ft1', 'ft3', 'ns.id'})
+
+    assert [set(step.annotation.extensions) for step in plan] == [
+        {'ft1', 'ft1_extra'},
+        {'ft3'},
+        {'ns'},
+    ]
+    assert plan[1].annotation is instance.annotations['ft3'][0]
+
+
+@pytest.mark.django_db
+def test_annotations_plan_with_aggregates():
+    class AggregateAnnotationCls(AnnotationPlanCls):
+        FILTERS = AnnotationPlanCls.FILTERS + (
+            {
+                'filter': 'pages_sum',
+                'dynamic': True,
+                'field': IntegerField(),
+                'qs': AN(pages_sum=Sum('pages__number')),
+            },
+            {
+                'filter': 'author_books',
+                'dynamic': True,
+                'field': IntegerField(),
+                'qs': AN(author_books=Count('author__books')),
+            },
+        )
+
+    author = Author.objects.create()
+    books = [Book.objects.create(author=author) for _ in range(2)]
+    for number in (1, 2, 3):
+        Page.objects.create(book=books[0], number=number)
+
+    instance = AggregateAnnotationCls(Book.objects.all())
+    plan = instance._get_annotations_plan({'ft1', 'ft2', 'pages_sum', 'author_books'})
+    assert [set(step.annotation.extensions) for step in plan] == [
+        {'author_books'},
+        {'ft1', 'ft1_extra'},
+        {'ft1_extra'},
+        {'pages_sum'},
+    ]
+
+    instance._context.applied_annotations = set()
+    qs = instance.apply_annotations({'pages_sum', 'author_books'})
+    expected_qs = Book.objects.annotate(
+        author_books=Count('author__books'),
+    ).annotate(pages_sum=Sum('pages__number'))
+
+    assert str(qs.query) == str(expected_qs.query)
+    assert list(qs.order_by('pk').values_list('pages_sum', 'author_books')) == list(
+        expected_qs.order_by('pk').values_list('pages_sum', 'author_books'),
+    )
+
+
+@pytest.mark.django_db
+def test_query_plan_is_applied_with_call_per_operation(mocker):
+    clone_spy = mocker.spy(QuerySet, '_clone')
+
+    _, qs = AnnotationPlanCls(Book.objects.all()).apply_filters(
+        'ns.ft=2&ft1=1&ordering(ns.id)&select(-ft2)',
+    )
+
+    # annotate(), filter() and order_by()
+    assert clone_spy.call_count == 3
+    assert set(qs.query.annotations.keys()) == {'ns', 'ns_ft', 'ft1', 'ft1_extra'}
+    assert qs.query.order_by == ('author__id',)
+    assert qs.select_data
+    assert not list(qs)
+
+
 def test_annotations_misconfiguration():
     class AnnotationCls(RQLFilterClass):
         MODEL = Book
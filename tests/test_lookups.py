@@ -0,0 +1,43 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from django.db import connection
+
+from dj_rql.lookups import CASE_FOLD_TRANSFORM, TRIGRAM_LOOKUPS
+from tests.dj_rf.models import Book
+
+
+@pytest.mark.parametrize(
+    'lookup,value,param',
+    (
+        ('rql_trigram_iexact', 'a%b', 'a\\%b'),
+        ('rql_trigram_icontains', 'a_b', '%a\\_b%'),
+        ('rql_trigram_istartswith', 'ab', 'ab%'),
+        ('rql_trigram_iendswith', 'ab', '%ab'),
+    ),
+)
+def test_trigram_lookups_postgresql_sql(lookup, value, param):
+    query = Book.objects.filter(**{'title__{0}'.format(lookup): value}).query
+    compiler = query.get_compiler(connection=connection)
+
+    sql, params = query.where.children[0].as_postgresql(compiler, connection)
+
+    assert sql == '"dj_rf_book"."title" ILIKE %s'
+    assert params == [param]
+
+
+@pytest.mark.parametrize('django_lookup,lookup', TRIGRAM_LOOKUPS.items())
+def test_trigram_lookups_fallback_sql(django_lookup, lookup):
+    assert str(Book.objects.filter(**{'title__{0}'.format(lookup): 'a'}).query) == str(
+        Book.objects.filter(**{'title__{0}'.format(django_lookup): 'a'}).query,
+    )
+
+
+def test_case_fold_transform_sql():
+    sql = str(
+        Book.objects.filter(**{'title__{0}__startswith'.format(CASE_FOLD_TRANSFORM): 'ab'}).query,
+    )
+
+    assert 'WHERE LOWER("dj_rf_book"."title") LIKE ab%' in sql
@@ -0,0 +1,149 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from django.db.models import Exists, Q
+
+from dj_rql.q import combine_q, simplify_q
+from tests.dj_rf.models import Book
+
+
+def test_flattening_of_same_connector_nodes():
+    q = Q(Q(a=1), Q(Q(b=2), Q(c=3)))
+
+    assert simplify_q(q) == Q(a=1, b=2, c=3)
+
+
+def test_flattening_of_single_child_nodes():
+    q = Q(Q(Q(a=1) | Q(b=2)), Q(Q(c=3), _connector=Q.OR))
+
+    assert simplify_q(q) == Q(Q(a=1) | Q(b=2), c=3)
+
+
+def test_negated_nodes_are_not_flattened():
+    q = Q(~Q(a=1, b=2), Q(c=3))
+
+    assert simplify_q(q) == Q(~Q(a=1, b=2), c=3)
+
+
+@pytest.mark.parametrize('empty_q', (Q(), ~Q(), Q(Q(), ~Q())))
+def test_empty_nodes_are_dropped(empty_q):
+    assert simplify_q(Q(Q(a=1), empty_q) | Q(empty_q, b=2)) == Q(a=1) | Q(b=2)
+    assert simplify_q(Q(empty_q, empty_q)) == Q()
+
+
+def test_duplicates_are_dropped():
+    q = Q(Q(a=1), Q(a=1), Q(b__in=[1, 2]), Q(b__in=[1, 2]), ~Q(c=3), ~Q(c=3))
+
+    assert simplify_q(q) == Q(a=1) & Q(b__in=[1, 2]) & ~Q(c=3)
+    assert simplify_q(Q(a=1) | Q(a=1)) == Q(a=1)
+
+
+def test_expressions_are_not_deduplicated():
+    exists = [Exists(Book.objects.filter(id=i)) for i in range(2)]
+    querysets = [Book.objects.filter(id=i) for i in range(2)]
+
+    assert simplify_q(Q(exists[0]) & Q(exists[1])).children == exists
+    assert simplify_q(Q(id__in=querysets[0]) & Q(id__in=querysets[1])).children == [
+        ('id__in', querysets[0]),
+        ('id__in', querysets[1]),
+    ]
+
+
+def test_range_merging():
+    q = Q(a__gte=1, b=2) & Q(a__lte=10)
+
+    assert simplify_q(q) == Q(a__range=(1, 10), b=2)
+    assert simplify_q(Q(a__lte=10) & Q(a__gte=1)) == Q(a__range=(1, 10))
+
+
+@pytest.mark.parametrize(
+    'q',
+    (
+        Q(a__gte=1) | Q(a__lte=10),
+        Q(a__gte=1, b__lte=10),
+        Q(a__gte=1) & Q(a__gte=2) & Q(a__lte=10),
+        Q(a__gte=None) & Q(a__lte=10),
+        Q(a__gt=1) & Q(a__lt=10),
+        Q(a__gte=1) & ~Q(a__lte=10),
+        ~Q(a__gte=1, a__lte=10),
+        ~(Q(b=1) | Q(a__gte=1, a__lte=10)),
+    ),
+)
+def test_ranges_are_not_merged(q):
+    assert 'range' not in str(simplify_q(q))
+
+
+def test_negated_nodes_children_are_not_flattened():
+    q = ~Q(Q(a=1), Q(Q(b=2), Q(c=3)))
+
+    assert simplify_q(q) == q
+
+
+@pytest.mark.parametrize(
+    'route,is_merged',
+    (
+        ('title', True),
+        ('written__year', True),
+        ('author__publisher__id', True),
+        ('pages__number', False),
+        ('author__books__title', False),
+        ('unknown_annotation', False),
+    ),
+)
+def test_ranges_merging_by_model(route, is_merged):
+    q = Q(**{'{0}__gte'.format(route): 1, '{0}__lte'.format(route): 5})
+
+    assert ('range' in str(simplify_q(q, model=Book))) == is_merged
+    assert 'range' in str(simplify_q(q))
+
+
+def test_source_q_is_not_changed():
+    q = Q(Q(a=1), Q(a=1), Q(b__gte=1), Q(b__lte=2))
+    children = list(q.children)
+
+    simplify_q(q)
+    assert q.children == children
+
+
+def test_custom_q_class_is_kept():
+    class CustomQ(Q):
+        pass
+
+    q = simplify_q(CustomQ(CustomQ(a=1), CustomQ(CustomQ(b=2))))
+
+    assert type(q) is CustomQ
+    assert q.children == [('a', 1), ('b', 2)]
+
+
+def test_non_q_values_are_kept():
+    assert simplify_q(None) is None
+
+
+@pytest.mark.parametrize(
+    'q_objects',
+    (
+        [Q(a=1), Q(b=2), Q(c=3)],
+        [Q(a=1), Q(), Q(b=2, c=3), ~Q(d=4)],
+        [Q(a=1) | Q(b=2), Q(c=3), Q(d=4) & Q(e=5)],
+        [Q(a=1)],
+        [Q(), Q()],
+        [],
+    ),
+)
+@pytest.mark.parametrize('connector', (Q.AND, Q.OR))
+def test_combine_q(q_objects, connector):
+    expected_q = Q()
+    for q in q_objects:
+        expected_q = expected_q | q if connector == Q.OR else expected_q & q
+
+    assert combine_q(q_objects, connector) == expected_q
+
+
+def test_combine_q_custom_q_class():
+    class CustomQ(Q):
+        pass
+
+    assert type(combine_q([], Q.OR, q_cls=CustomQ)) is CustomQ
+    assert type(combine_q([CustomQ(a=1), CustomQ(b=2)], Q.OR)) is CustomQ
@@ -0,0 +1,270 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from django.db import connection
+from django.db.models import F, Q
+
+from dj_rql.filter_cls import RQLFilterClass
+from dj_rql.search import (
+    LookupSearchStrategy,
+    PostgreSQLSearchStrategy,
+    SearchStrategy,
+    SQLiteFTSSearchStrategy,
+)
+from tests.dj_rf.filters import BooksFilterClass
+from tests.dj_rf.models import Author, Book, Page
+
+
+class BooksFTSSearchStrategy(SQLiteFTSSearchStrategy):
+    TABLE = 'dj_rf_book_fts'
+
+
+class FTSBooksFilterClass(BooksFilterClass):
+    SEARCH_STRATEGY_CLS = BooksFTSSearchStrategy
+
+
+class RankedBooksFilterClass(RQLFilterClass):
+    MODEL = Book
+    FILTERS = (
+        {
+            'filter': 'id',
+            'ordering': True,
+        },
+        {
+            'filter': 'title',
+            'search': True,
+            'search_weight': 3,
+        },
+        {
+            'namespace': 'author',
+            'filters': (
+                {
+                    'filter': 'email',
+                    'search': True,
+                },
+            ),
+        },
+    )
+    RANK_SEARCH_RESULTS = True
+
+
+class RankedExtendedSearchFilterClass(RankedBooksFilterClass):
+    EXTENDED_SEARCH_ORM_ROUTES = ('pages__content',)
+    DISTINCT = True
+
+
+@pytest.fixture
+def books_fts_table():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE dj_rf_book_fts USING fts5("
+            "title, content='dj_rf_book', content_rowid='id')",
+        )
+
+    yield
+
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE dj_rf_book_fts')
+
+
+def rebuild_books_fts_table():
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO dj_rf_book_fts(dj_rf_book_fts) VALUES('rebuild')")
+
+
+@pytest.mark.parametrize(
+    'value,terms',
+    (
+        ('abc', ['abc']),
+        ('*ab*c* d_e', ['ab', 'c', 'd_e']),
+        ('"a" OR b-c NEAR(d)', ['a', 'OR', 'b', 'c', 'NEAR', 'd']),
+        ('*', []),
+    ),
+)
+def test_get_terms(value, terms):
+    assert SearchStrategy.get_terms(value) == terms
+
+
+def test_default_strategy():
+    assert BooksFilterClass.SEARCH_STRATEGY_CLS is LookupSearchStrategy
+
+
+def test_custom_strategy():
+    class CustomSearchStrategy(SearchStrategy):
+        def build_q(self, str_value):
+            return Q(title=str_value)
+
+    class CustomFilterClass(BooksFilterClass):
+        SEARCH_STRATEGY_CLS = CustomSearchStrategy
+
+    plan = CustomFilterClass(Book.objects.none()).build_query_plan('search="a b"')
+    assert plan.q == Q(title='a b')
+
+
+def test_sqlite_fts_strategy_q():
+    q = BooksFTSSearchStrategy(FTSBooksFilterClass(Book.objects.none())).build_q('ab* "c"')
+
+    (lookup, raw_sql), = q.children
+    assert lookup == 'pk__in'
+    assert raw_sql.sql == 'SELECT rowid FROM dj_rf_book_fts WHERE dj_rf_book_fts MATCH %s'
+    assert raw_sql.params == ('"ab"* "c"*',)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query,titles',
+    (
+        ('search=pyth', ['Python cookbook', 'Fluent Python']),
+        ('search=python&search=COOK', ['Python cookbook']),
+        ('search="flu* pyth"', ['Fluent Python']),
+        ('search=ython', []),
+        ('search=*', ['Python cookbook', 'Fluent Python', 'Django']),
+        ('or(search=django,search=fluent)', ['Fluent Python', 'Django']),
+        ('search=python&author.email=a@example.com', ['Fluent Python']),
+    ),
+)
+def test_sqlite_fts_strategy_filtering(books_fts_table, query, titles):
+    author = Author.objects.create(email='a@example.com')
+    Book.objects.create(title='Python cookbook')
+    Book.objects.create(title='Fluent Python', author=author)
+    Book.objects.create(title='Django')
+    rebuild_books_fts_table()
+
+    _, qs = FTSBooksFilterClass(Book.objects.order_by('id')).apply_filters(query)
+
+    assert [book.title for book in qs] == titles
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'query,titles',
+    (
+        ('search=python', ['python 2', 'python 1', 'java']),
+        ('search=python&ordering(-id)', ['java', 'python 2', 'python 1']),
+        ('search=python&search=2', ['python 2']),
+        ('or(search=python,search=java)', ['java', 'python 2', 'python 1']),
+        ('title=python 1', ['python 1']),
+    ),
+)
+def test_lookup_strategy_ranking(query, titles):
+    author = Author.objects.create(email='python@example.com')
+    Book.objects.create(title='python 1')
+    Book.objects.create(title='python 2', author=author)
+    Book.objects.create(title='java', author=author)
+    Book.objects.create(title='go')
+
+    _, qs = RankedBooksFilterClass(Book.objects.order_by('-id')).apply_filters(query)
+
+    assert [book.title for book in qs] == titles
+
+
+@pytest.mark.django_db
+def test_lookup_strategy_rank_annotation():
+    author = Author.objects.create(email='python@example.com')
+    Book.objects.create(title='python 1')
+    Book.objects.create(title='python 2', author=author)
+    Book.objects.create(title='java', author=author)
+
+    _, qs = RankedBooksFilterClass(Book.objects.order_by('id')).apply_filters('search=python')
+
+    assert [(book.title, book.rql_search_rank) for book in qs] == [
+        ('python 2', 4.0),
+        ('python 1', 3.0),
+        ('java', 1.0),
+    ]
+
+
+class RankedPagesFilterClass(RankedBooksFilterClass):
+    FILTERS = RankedBooksFilterClass.FILTERS + (
+        {
+            'namespace': 'pages',
+            'distinct': True,
+            'filters': (
+                {
+                    'filter': 'content',
+                    'search': True,
+                },
+            ),
+        },
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'filter_class,query,expected',
+    (
+        (RankedPagesFilterClass, 'search=python', [('python', 4.0), ('go', 1.0)]),
+        (RankedPagesFilterClass, 'search=java', [('java', 4.0), ('python', 1.0)]),
+        (RankedPagesFilterClass, 'search=python&ordering(id)', [('python', 4.0), ('go', 1.0)]),
+        (RankedExtendedSearchFilterClass, 'search=python', [('python', 4.0), ('go', 1.0)]),
+    ),
+)
+def test_lookup_strategy_ranking_by_to_many_relations(filter_class, query, expected):
+    books = [Book.objects.create(title=title) for title in ('python', 'go', 'java')]
+    for book, contents in zip(books, (('python', 'java'), ('python', 'go'), ('java', 'c'))):
+        for content in contents:
+            Page.objects.create(book=book, content=content)
+
+    _, qs = filter_class(Book.objects.order_by('id')).apply_filters(query)
+
+    assert [(book.title, book.rql_search_rank) for book in qs] == expected
+
+
+def test_search_is_not_ranked_by_default():
+    plan = BooksFilterClass(Book.objects.none()).build_query_plan('search=python')
+    assert plan.search_rank is None
+
+
+@pytest.mark.parametrize('query', ('title=python', 'search=""', ''))
+def test_ranking_without_search(query):
+    plan = RankedBooksFilterClass(Book.objects.none()).build_query_plan(query)
+    assert plan.search_rank is None
+
+
+@pytest.mark.django_db
+def test_sqlite_fts_strategy_ranking(books_fts_table):
+    class RankedFTSBooksFilterClass(FTSBooksFilterClass):
+        RANK_SEARCH_RESULTS = True
+
+    Book.objects.create(title='Python and other languages: a long book about many things')
+    Book.objects.create(title='Python Python')
+    Book.objects.create(title='Django')
+    rebuild_books_fts_table()
+
+    _, qs = RankedFTSBooksFilterClass(Book.objects.order_by('id')).apply_filters('search=pyth')
+
+    assert [book.title for book in qs] == [
+        'Python Python',
+        'Python and other languages: a long book about many things',
+    ]
+    assert qs[0].rql_search_rank > qs[1].rql_search_rank
+
+
+def test_postgresql_strategy_q():
+    search = pytest.importorskip('django.contrib.postgres.search')
+
+    class BooksSearchStrategy(PostgreSQLSearchStrategy):
+        VECTOR_ORM_ROUTE = 'search_vector'
+        CONFIG = 'english'
+
+    q = BooksSearchStrategy(BooksFilterClass(Book.objects.none())).build_q('ab* c')
+
+    assert q == Q(search_vector=search.SearchQuery('ab:* & c:*', config='english', search_type='raw'))
+
+
+def test_postgresql_strategy_rank():
+    # Search rank requires PostgreSQL driver
+    pytest.importorskip('django.contrib.postgres.fields')
+    search = pytest.importorskip('django.contrib.postgres.search')
+
+    class BooksSearchStrategy(PostgreSQLSearchStrategy):
+        VECTOR_ORM_ROUTE = 'search_vector'
+
+    rank = BooksSearchStrategy(BooksFilterClass(Book.objects.none())).build_rank('ab')
+
+    assert rank == search.SearchRank(
+        F('search_vector'),
+        search.SearchQuery('ab:*', search_type='raw'),
+    )
@@ -0,0 +1,161 @@
+#
+#  Copyright © 2023 Ingram Micro Inc. All rights reserved.
+#
+
+import pytest
+from django.db.models import Q
+from py_rql.exceptions import RQLFilterLookupError, RQLFilterParsingError, RQLFilterValueError
+from py_rql.parser import RQLParser
+
+from dj_rql.cache import parse_query
+from dj_rql.transformer import (
+    RQLToDjangoORMIterativeTransformer,
+    RQLToDjangoORMTransformer,
+    iter_filter_nodes,
+)
+from tests.dj_rf.filters import BooksFilterClass, SelectBooksFilterClass
+from tests.dj_rf.models import Book
+
+
+class IterativeBooksFilterClass(BooksFilterClass):
+    TRANSFORMER_CLS = RQLToDjangoORMIterativeTransformer
+
+
+def get_nested_query(depth):
+    query = 'eq(id,1)'
+    for level in range(depth):
+        query = '{0}({1},ne(id,{2}))'.format('and' if level % 2 else 'or', query, level)
+
+    return query
+
+
+def transform(transformer_cls, query, filter_cls=BooksFilterClass):
+    transformer = transformer_cls(filter_cls(Book.objects.none()))
+    q = transformer.transform(parse_query(query))
+    return q, transformer.filtered_props, transformer.ordering_filters, transformer.select_filters
+
+
+@pytest.mark.parametrize(
+    'query',
+    (
+        'id=1',
+        'eq(id,1)&ne(title,abc)&ordering(-d_id,title)',
+        'and(eq(id,1),or(eq(id,2),not(eq(author.email,a))))',
+        '(id=1|id=2)&title=abc',
+        'in(id,(1,2,3))&out(author.email,(a,b))',
+        'in(author,(t(publisher.id=null()),t(email=a)))',
+        'and(title=null(),author=t(is_male=true,publisher=t(id=1)))',
+        'ne(author,t(email=a,is_male=true))',
+        'like(title,*abc*)&ilike(author.email,abc*)&search=abc',
+        'select(-author,+pages)&ordering(title)',
+        get_nested_query(50),
+    ),
+)
+def test_iterative_transformer_result_is_the_same(query):
+    filter_cls = SelectBooksFilterClass if 'select' in query else BooksFilterClass
+
+    assert transform(RQLToDjangoORMIterativeTransformer, query, filter_cls) == transform(
+        RQLToDjangoORMTransformer,
+        query,
+        filter_cls,
+    )
+
+
+def test_iterative_transformer_deep_query():
+    query = get_nested_query(1000)
+
+    q, filtered_props, _, _ = transform(RQLToDjangoORMIterativeTransformer, query)
+    assert q
+    assert filtered_props == {'id'}
+
+    plan = IterativeBooksFilterClass(Book.objects.none()).build_query_plan(query)
+    assert plan.q
+
+
+@pytest.mark.django_db
+def test_iterative_transformer_filtering():
+    books = [Book.objects.create() for _ in range(3)]
+    query = 'and(or(eq(id,{0}),eq(id,{1})),ne(id,{1}))'.format(books[0].pk, books[1].pk)
+
+    _, qs = IterativeBooksFilterClass(Book.objects.all()).apply_filters(query)
+    assert list(qs) == [books[0]]
+
+
+@pytest.mark.parametrize(
+    'query,error',
+    (
+        ('and(eq(id,1),like(id,1))', RQLFilterLookupError),
+        ('or(eq(id,1),eq(id,abc))', RQLFilterValueError),
+        ('ordering(id,title)&ordering(title)', RQLFilterParsingError),
+    ),
+)
+def test_iterative_transformer_errors(query, error):
+    with pytest.raises(error):
+        IterativeBooksFilterClass(Book.objects.none()).apply_filters(query)
+
+
+def test_iterative_transformer_limits():
+    class LimitedFilterClass(IterativeBooksFilterClass):
+        MAX_NESTING_DEPTH_IN_QUERY = 100
+
+    LimitedFilterClass(Book.objects.none()).apply_filters(get_nested_query(100))
+
+    with pytest.raises(RQLFilterParsingError) as e:
+        LimitedFilterClass(Book.objects.none()).apply_filters(get_nested_query(101))
+
+    assert e.value.details['error'] == 'Query is too complex: max allowed nesting depth is 100.'
+
+
+@pytest.mark.parametrize(
+    'query,filter_names',
+    (
+        ('', []),
+        ('id=1', ['id']),
+        ('and(eq(a,1),or(b=ne=2,not(like(c,d))))&ordering(e)&select(f)', ['a', 'b', 'c']),
+        ('in(a,(1,2))&out(b.c,(t(d=1)))', ['a', 'b.c.d']),
+        ('a=t(b=1,c=t(d=1),ilike(e,f))&ne(g,t(h=1))', ['a.b', 'a.c.d', 'a.e', 'g.h']),
+        ('search=abc&limit=10', ['limit', 'search']),
+    ),
+)
+def test_iter_filter_nodes(query, filter_names):
+    nodes = list(iter_filter_nodes(parse_query(query)))
+
+    assert sorted(filter_name for _, filter_name in nodes) == filter_names
+    assert all(tree.data in ('comp', 'listing', 'searching') for tree, _ in nodes)
+
+
+@pytest.mark.parametrize(
+    'transformer_cls',
+    (RQLToDjangoORMTransformer, RQLToDjangoORMIterativeTransformer),
+)
+def test_listing_in_namespaced_tuple(transformer_cls):
+    # Grammar doesn't put listings into tuples, so such AST is built from parsed parts
+    rql_ast = RQLParser.parse_query('author=t(email=a)')
+    listing = RQLParser.parse_query('in(email,(a,b))').children[0].children[0].children[0]
+    tuple_tree = rql_ast.children[0].children[0].children[0].children[1].children[0]
+    tuple_tree.children[0] = listing
+
+    assert [name for _, name in iter_filter_nodes(rql_ast)] == ['author.email']
+
+    transformer = transformer_cls(BooksFilterClass(Book.objects.none()))
+    q = transformer.transform(rql_ast)
+
+    assert q == Q(Q(author__email__in=['a', 'b']))
+    assert transformer.filtered_props == {'author.email'}
+
+
+@pytest.mark.parametrize(
+    'transformer_cls',
+    (RQLToDjangoORMTransformer, RQLToDjangoORMIterativeTransformer),
+)
+def test_skipped_nodes(transformer_cls):
+    rql_ast = parse_query('and(id=1,title=abc)')
+    skipped_nodes = {id(tree) for tree, name in iter_filter_nodes(rql_ast) if name == 'title'}
+
+    transformer = transformer_cls(BooksFilterClass(Book.objects.none()), skipped_nodes)
+    q = transformer.transform(rql_ast)
+
+    assert q == transformer_cls(BooksFilterClass(Book.objects.none())).transform(
+        parse_query('id=1'),
+    )
+    assert transformer.filtered_props == {'id'}